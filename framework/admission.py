@@ -0,0 +1,203 @@
+"""
+file name:			admission.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for admitting new peripherals into a running measurement.
+					While the measurement runs, the nRF device scans with a low duty cycle and connects, discovers and subscribes to newly seen target devices.
+"""
+
+"""
+Import statement
+"""
+import constants
+import customexception
+import queue
+import threading
+import time
+
+from fnmatch import fnmatchcase
+from registry import DeviceSelector, DeviceEntry
+from connection import Connection
+from blatann.gap.scanning import ScanParameters
+
+
+class AdmissionLoop(object):
+	"""
+	Background loop admitting target devices which start advertising while the measurement is running.
+	The target devices are the ones of the ConnectionManager (names, name patterns or registry.DeviceSelector objects).
+	A new peripheral gets an alias from the registry, is connected with the default connection parameters of the ConnectionManager
+	and added to the CollectorManager, see datacollection.CollectorManager.admit_connection.
+
+	The scans take at most arg_scan_budget of the radio time: the scan window is arg_scan_budget * arg_scan_interval_ms.
+	NOTE: 	While connecting the scan is stopped, since the SoftDevice cannot scan and initiate a connection at the same time.
+	"""
+	def __init__(self, arg_connection_manager, arg_collector_manager, arg_scan_budget = constants.DEFAULT_ADMISSION_SCAN_BUDGET, arg_scan_interval_ms = constants.DEFAULT_ADMISSION_SCAN_INTERVAL_MS):
+		"""
+		INPUT PARAMETERS
+
+		param arg_connection_manager:	The ConnectionManager of the measurement
+		type arg_connection_manager:	connection.ConnectionManager
+
+		param arg_collector_manager:	The CollectorManager of the measurement
+		type arg_collector_manager:		datacollection.CollectorManager
+
+		param arg_scan_budget:			The share of the radio time the scans may take from the connections, between 0 and 1
+		type arg_scan_budget:			float
+
+		param arg_scan_interval_ms:		The scan interval in milliseconds
+		type arg_scan_interval_ms:		float
+		"""
+		if arg_connection_manager.registry is None:
+			raise customexception.InvalidStateException("Cannot admit new peripherals without a device registry")
+		if not 0 < arg_scan_budget <= 1:
+			raise customexception.InputException("The scan budget has to be between 0 and 1, got {}".format(arg_scan_budget))
+
+		self.connection_manager = arg_connection_manager
+		self.collector_manager = arg_collector_manager
+		scan_window_ms = max(constants.MIN_SCAN_WINDOW_MS, arg_scan_interval_ms * arg_scan_budget)
+		self.scan_parameters = ScanParameters(arg_scan_interval_ms, scan_window_ms, 0, True)
+
+		self.candidates = queue.Queue()
+		self.retry_times = {}
+		self.stop_event = threading.Event()
+		self.thread = None
+		self.admitted = []
+		"""
+		OTHER PARAMETERS
+
+		param scan_parameters:	The low duty cycle scan parameters
+		type scan_parameters:	blatann.gap.scanning.ScanParameters
+
+		param candidates:		The advertising reports of target devices, filled by the scan callback
+		type candidates:		queue.Queue with blatann.gap.advertise_data.ScanReport elements
+
+		param retry_times:		The time.perf_counter() value before which a peripheral which failed to connect is not tried again
+		type retry_times:		dict
+								Format: {'Address': float}
+
+		param stop_event:		Set to stop the loop
+		type stop_event:		threading.Event
+
+		param thread:			The thread of the loop
+		type thread:			threading.Thread
+
+		param admitted:			The aliases of all admitted peripherals
+		type admitted:			list with str elements
+		"""
+
+	def __str__(self):
+		return("AdmissionLoop scanning {:.1f}ms every {:.1f}ms".format(self.scan_parameters.window_ms, self.scan_parameters.interval_ms))
+
+	"""
+	Private functions
+	"""
+	def _is_target(self, arg_entry):
+		"""
+		Returns True if the peripheral is one of the target devices of the ConnectionManager.
+		A peripheral which is not in the registry yet has no alias, it matches the aliases the registry would assign to it.
+		"""
+		if arg_entry.alias is not None:
+			aliases = {arg_entry.alias}
+		else:
+			aliases = {arg_entry.name, "{}_{}".format(arg_entry.name, arg_entry.address_suffix), self.connection_manager.registry.explicit_aliases.get(arg_entry.address_string)}
+		for target_device in self.connection_manager.target_devices:
+			if isinstance(target_device, DeviceSelector):
+				if target_device.matches(arg_entry):
+					return True
+			elif target_device in aliases or fnmatchcase(arg_entry.name, target_device):
+				return True
+		return False
+
+	def _on_scan_received(self, ble_device, scan_report):
+		"""
+		Callback function whenever an advertising report has been received. Runs within the event thread, thus only filters the report
+		and queues it if it is one of a target device. The registry is updated by the admission thread.
+		"""
+		address = str(scan_report.peer_address)
+		if self.retry_times.get(address, 0) > time.perf_counter():
+			return
+		entry = DeviceEntry(scan_report.peer_address, scan_report.device_name, scan_report.advertise_data.service_uuids)
+		known_entry = self.connection_manager.registry.devices.get(address)
+		if known_entry is not None:
+			entry.alias = known_entry.alias
+		if self._is_target(entry):
+			self.candidates.put(scan_report)
+
+	def _admit(self, arg_entry):
+		"""
+		Connects to the peripheral and adds it to the measurement
+		"""
+		connection_manager = self.connection_manager
+		connection_manager.scan_report_dict[arg_entry.alias] = arg_entry.address
+		try:
+			ble_device = connection_manager._assign_target_devices([arg_entry.alias])[arg_entry.alias]
+			connection = Connection(connection_manager._connect_to(arg_entry.alias, arg_entry.address, ble_device), ble_device, arg_entry.alias)
+		except Exception as e:
+			print("Could not admit '{}': {}".format(arg_entry.alias, e))
+			self.retry_times[arg_entry.address_string] = time.perf_counter() + constants.DEFAULT_ADMISSION_RETRY_S
+			return
+
+		connection_manager.connections.append(connection)
+		self.collector_manager.admit_connection(connection)
+		self.admitted.append(arg_entry.alias)
+
+	def _run(self):
+		"""
+		The loop: scans until a new target device advertises, then stops the scan for connecting to it
+		"""
+		scanner = self.connection_manager.ble_device.scanner
+		scanner.on_scan_received.register(self._on_scan_received)
+		try:
+			# blatann keeps every advertising report of the scan, the names of the peers are looked up in them when connecting.
+			# The reports are cleared whenever the scan is restarted, so that they do not grow for the whole measurement.
+			scanner.start_scan(self.scan_parameters, clear_scan_reports = True)
+			cleared_time = time.perf_counter()
+			while not self.stop_event.is_set():
+				try:
+					scan_report = self.candidates.get(timeout = constants.DEFAULT_ADMISSION_POLL_S)
+				except queue.Empty:
+					if time.perf_counter() - cleared_time > constants.DEFAULT_ADMISSION_SCAN_REPORT_LIFETIME_S:
+						scanner.start_scan(self.scan_parameters, clear_scan_reports = True)
+						cleared_time = time.perf_counter()
+					continue
+				scanner.stop()
+
+				entry = self.connection_manager.registry.add_device(scan_report.peer_address, scan_report.device_name, scan_report.advertise_data.service_uuids)
+				connected_names = {connection.name for connection in self.connection_manager.connections if connection.status is True}
+				if entry.alias not in connected_names and self._is_target(entry):
+					self._admit(entry)
+
+				# Advertising reports received while connecting are outdated
+				while not self.candidates.empty():
+					self.candidates.get_nowait()
+				scanner.start_scan(self.scan_parameters, clear_scan_reports = True)
+				cleared_time = time.perf_counter()
+		finally:
+			scanner.stop()
+			scanner.on_scan_received.deregister(self._on_scan_received)
+
+	"""
+	Public functions
+	"""
+	def start(self):
+		"""
+		Starts admitting new peripherals in the background
+		"""
+		if self.thread is not None and self.thread.is_alive():
+			raise customexception.InvalidStateException("The AdmissionLoop is already running")
+		self.stop_event.clear()
+		self.thread = threading.Thread(target = self._run, name = "AdmissionLoop", daemon = True)
+		self.thread.start()
+		print("Admitting new target devices, {}".format(self))
+
+	def stop(self):
+		"""
+		Stops admitting new peripherals. A peripheral which is being admitted is completed first.
+		"""
+		if self.thread is None:
+			return
+		self.stop_event.set()
+		self.thread.join()
+		self.thread = None
+		print("Stopped admitting new target devices, admitted: {}".format(", ".join(self.admitted) if self.admitted else "none"))
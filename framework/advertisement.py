@@ -0,0 +1,347 @@
+"""
+file name:			advertisement.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for collecting data from beacon-style peripherals without connecting to them.
+					The data is taken from the manufacturer specific data or the service data of their advertising packets.
+"""
+
+"""
+Import statement
+"""
+import timer
+import customexception
+import constants
+
+from pathlib import Path
+from datetime import datetime
+from writer import *
+from blatann.nrf import nrf_events
+from blatann.nrf.nrf_types import BLEAdvData
+from blatann.gap.scanning import ScanParameters
+
+
+class AdvertisementPayload(object):
+	"""
+	A single payload taken from an advertising packet.
+	Mimics the characteristic and the event arguments of a notification, such that the writer.GenericWriter classes can write it.
+	"""
+	def __init__(self, arg_value, arg_timestamp, arg_rssi):
+		"""
+		INPUT PARAMETERS
+
+		param arg_value:		The payload without the company identifier or the service UUID
+		type arg_value:			bytes
+
+		param arg_timestamp:	The time.perf_counter() value when the advertising packet has been received
+		type arg_timestamp:		float
+
+		param arg_rssi:			The RSSI of the advertising packet
+		type arg_rssi:			int
+		"""
+		self.value = arg_value
+		self.timestamp = arg_timestamp
+		self.rssi = arg_rssi
+
+
+class AdvertisementCollector(object):
+	"""
+	Class for collecting data from beacon-style peripherals by continuously scanning for their advertising packets.
+	Every peripheral gets its own Writer, the data is saved in the same directory structure as with connections:
+	Directory: /data/'Peripheral'/'advertisement'/'Company identifier or service UUID'
+
+	Since the SoftDevice does not need a connection for each peripheral, a single nRF device can collect from hundreds of low-rate sensors.
+	Advertising packets are sent on all three advertising channels and usually repeated until the sensor has new data. Therefore duplicates
+	are suppressed per (address, payload counter) if the position of a counter in the payload is known, or per (address, payload) otherwise.
+	"""
+
+	"""
+	Writers supported by the AdvertisementCollector and their callback functions
+	"""
+	WRITER_CALLBACKS = {'Writer': 'on_subscribe_notification_Writer',
+						'PerfWriter': 'on_subscribe_notification_PerfWriter',
+						'PrinterWriter': 'on_subscribe_notification_PrinterWriter',
+						'CounterWriter': 'on_subscribe_notification_CounterWriter',
+						'DummyWriter': 'on_subscribe_notification_DummyWriter'}
+
+	def __init__(self, arg_ble_device):
+		"""
+		INPUT PARAMETERS
+
+		param arg_ble_device:	The nRF device
+		type arg_ble_device:	blatann.BleDevice
+		"""
+		self.ble_device = arg_ble_device
+
+		self.company_id = None
+		self.service_uuid = None
+		self.counter_format = None
+		self.counter_offset = 0
+		self.target_addresses = set()
+		self.names = {}
+		self.writer_type = 'Writer'
+		self.scan_parameters = ScanParameters(constants.DEFAULT_ADV_SCAN_INTERVAL_MS, constants.DEFAULT_ADV_SCAN_WINDOW_MS, 0, False)
+
+		self.writers = {}
+		self.last_payloads = {}
+		self.received = 0
+		self.duplicates = 0
+		self.timestamp = 'n/a'
+		self.offset = 0
+		self.collecting = False
+		"""
+		OTHER PARAMETERS
+
+		param company_id:		Only manufacturer specific data with this company identifier is collected. Either company_id or service_uuid has to be set.
+		type company_id:		int
+
+		param service_uuid:		Only service data with this 16-bit service UUID is collected.
+		type service_uuid:		int
+
+		param counter_format:	The struct format of the payload counter, e.g. '<H'. None if the payload does not contain a counter.
+		type counter_format:	str
+
+		param counter_offset:	The position of the payload counter in bytes, counted from the beginning of the payload.
+		type counter_offset:	int
+
+		param target_addresses:	The addresses of the peripherals to collect from. If empty, all peripherals with a matching payload are collected.
+		type target_addresses:	set with str elements
+								Format: e.g. 'C4:93:27:0A:5B:E1,s'
+
+		param names:			Names of the peripherals, which will be used for the directories. Per default the address without separators.
+		type names:				dict
+								Format: {'Address': 'Name'}
+
+		param writer_type:		The prefered type of the GenericWriter class. Per default: 'Writer'
+		type writer_type:		str
+
+		param scan_parameters:	The scan parameters of the continuous scan. Per default passive scanning with 100% duty cycle and without timeout.
+		type scan_parameters:	blatann.gap.scanning.ScanParameters
+
+		param writers:			The Writer class of each peripheral, instantiated with its first payload.
+		type writers:			dict
+								Format: {'Address': GenericWriter}
+
+		param last_payloads:	The last counter (or payload) received from each peripheral, used for duplicate suppression.
+		type last_payloads:		dict
+								Format: {'Address': int or bytes}
+
+		param received:			Number of collected payloads
+		type received:			int
+
+		param duplicates:		Number of suppressed duplicates
+		type duplicates:		int
+
+		param collecting:		True while the nRF device is scanning for advertising packets
+		type collecting:		bool
+		"""
+
+	def __str__(self):
+		return("AdvertisementCollector class of the nRF Device at port: '{}'".format(self.ble_device))
+
+	"""
+	Private functions
+	"""
+	def _get_payload(self, arg_records):
+		"""
+		Returns the payload of the advertising data if it matches the company identifier or service UUID, otherwise None.
+
+		param arg_records:	The records of the advertising data
+		type arg_records:	dict
+							Format: {BLEAdvData.Types: list with int elements}
+		"""
+		if self.company_id is not None:
+			record = arg_records.get(BLEAdvData.Types.manufacturer_specific_data)
+			identifier = self.company_id
+		else:
+			record = arg_records.get(BLEAdvData.Types.service_data)
+			identifier = self.service_uuid
+
+		if record is None or len(record) < 2 or (record[0] | (record[1] << 8)) != identifier:
+			return None
+		return bytes(record[2:])
+
+	def _is_duplicate(self, arg_address, arg_payload):
+		"""
+		Checks whether the payload has already been received from this peripheral and remembers it otherwise.
+		"""
+		if self.counter_format is None:
+			key = arg_payload
+		else:
+			try:
+				key = struct.unpack_from(self.counter_format, arg_payload, self.counter_offset)[0]
+			except struct.error:
+				key = arg_payload
+
+		if self.last_payloads.get(arg_address) == key:
+			return True
+		self.last_payloads[arg_address] = key
+		return False
+
+	def _create_writer(self, arg_address, arg_peer_addr):
+		"""
+		Sets up the directory and the Writer class of a newly found peripheral.
+		"""
+		name = self.names.get(arg_address, ''.join('%02X' % i for i in arg_peer_addr.addr))
+		service = 'advertisement'
+		characteristic_uuid = '{:04X}'.format(self.company_id if self.company_id is not None else self.service_uuid)
+
+		if self.writer_type != "PrinterWriter" and self.writer_type != "CounterWriter":
+			Path(os.path.join('data', name, service, characteristic_uuid)).mkdir(exist_ok=True, parents=True)
+
+		if self.writer_type == 'Writer':
+			writer = Writer(name, service, characteristic_uuid, None, self.timestamp)
+		elif self.writer_type == 'PerfWriter':
+			writer = PerfWriter(name, service, characteristic_uuid, None, self.timestamp, self.offset)
+		elif self.writer_type == 'PrinterWriter':
+			writer = PrinterWriter(name, service, characteristic_uuid, None, self.timestamp)
+		elif self.writer_type == 'CounterWriter':
+			writer = CounterWriter(name, service, characteristic_uuid, None, self.timestamp)
+		else:
+			writer = DummyWriter(name, service, characteristic_uuid, None, self.timestamp)
+
+		print("Collecting advertisements of device '{}' ({})".format(name, arg_address))
+		return getattr(writer, self.WRITER_CALLBACKS[self.writer_type])
+
+	def _on_adv_report(self, driver, event):
+		"""
+		Callback function whenever the nRF device receives an advertising packet.
+
+		param event:	The advertising report
+		type event:		blatann.nrf.nrf_events.GapEvtAdvReport
+		"""
+		temp_time = time.perf_counter()
+
+		payload = self._get_payload(event.adv_data.records)
+		if payload is None:
+			return
+
+		address = str(event.peer_addr)
+		if self.target_addresses and address not in self.target_addresses:
+			return
+
+		if self._is_duplicate(address, payload):
+			self.duplicates += 1
+			return
+
+		callback = self.writers.get(address)
+		if callback is None:
+			callback = self.writers[address] = self._create_writer(address, event.peer_addr)
+
+		self.received += 1
+		payload = AdvertisementPayload(payload, temp_time, event.rssi)
+		callback(payload, payload)
+
+	"""
+	Public functions
+	"""
+	def set_manufacturer_filter(self, arg_company_id):
+		"""
+		Collects the manufacturer specific data with this company identifier.
+
+		param arg_company_id:	The Bluetooth SIG company identifier, e.g. 0x0059 for Nordic Semiconductor
+		type arg_company_id:	int
+		"""
+		self.company_id = arg_company_id
+		self.service_uuid = None
+
+	def set_service_data_filter(self, arg_service_uuid):
+		"""
+		Collects the service data with this 16-bit service UUID.
+
+		param arg_service_uuid:	The 16-bit service UUID, e.g. 0x181A for the Environmental Sensing service
+		type arg_service_uuid:	int
+		"""
+		self.service_uuid = arg_service_uuid
+		self.company_id = None
+
+	def set_counter_format(self, arg_format, arg_offset = 0):
+		"""
+		Sets the position of the payload counter which is used for duplicate suppression.
+
+		param arg_format:	The struct format of the counter, e.g. '<H' for a little endian uint16
+		type arg_format:	str
+
+		param arg_offset:	The position of the counter in bytes, counted from the beginning of the payload
+		type arg_offset:	int
+		"""
+		struct.calcsize(arg_format)
+		self.counter_format = arg_format
+		self.counter_offset = arg_offset
+
+	def set_target_addresses(self, arg_address_list):
+		"""
+		Only collects the peripherals with these addresses.
+
+		param arg_address_list:	List with addresses, e.g. ['C4:93:27:0A:5B:E1,s']
+		type arg_address_list:	list with str elements
+		"""
+		self.target_addresses = set(arg_address_list)
+
+	def set_device_name(self, arg_address, arg_name):
+		"""
+		Sets the name of a peripheral, which will be used for its directory.
+		"""
+		self.names[arg_address] = arg_name
+
+	def set_writer_type(self, arg_value):
+		"""
+		Sets the writer.GenericWriter class for all peripherals
+		param arg_value:	The type of the Writer.
+		type arg_value:		Currently: 'Writer', 'PerfWriter', 'PrinterWriter', 'CounterWriter', 'DummyWriter' are being supported.
+		"""
+		if arg_value not in self.WRITER_CALLBACKS:
+			raise customexception.InputException("'{}' is not a valid Writer class for advertisements.".format(arg_value))
+		self.writer_type = arg_value
+
+	def set_scan_parameters(self, interval_ms = constants.DEFAULT_ADV_SCAN_INTERVAL_MS, window_ms = constants.DEFAULT_ADV_SCAN_WINDOW_MS, active = False):
+		"""
+		Sets the scan parameters of the continuous scan. Scanning does not time out.
+		"""
+		self.scan_parameters = ScanParameters(interval_ms, window_ms, 0, active)
+
+	def start_collection(self):
+		"""
+		Starts the continuous scan and collects the payloads of all matching advertising packets.
+		"""
+		if self.company_id is None and self.service_uuid is None:
+			raise customexception.InvalidStateException("Set a manufacturer or a service data filter before collecting advertisements")
+		if self.collecting is True:
+			return
+
+		self.timestamp = datetime.now().strftime("%d%m%y_%H%M%S")
+		self.offset = time.perf_counter()
+
+		# The scanner of blatann would keep every single advertising report in its scan report collection.
+		# Detach it while collecting, so that memory does not grow with the collection time.
+		self.ble_device.ble_driver.event_unsubscribe(self.ble_device.scanner._on_adv_report, nrf_events.GapEvtAdvReport)
+		self.ble_device.ble_driver.event_subscribe(self._on_adv_report, nrf_events.GapEvtAdvReport)
+		self.ble_device.ble_driver.ble_gap_scan_start(self.scan_parameters)
+		self.collecting = True
+		print("Collecting advertisements...")
+
+	def stop_collection(self):
+		"""
+		Stops the continuous scan and closes the csv files of all Writers.
+		"""
+		if self.collecting is False:
+			return
+
+		self.ble_device.scanner.stop()
+		self.ble_device.ble_driver.event_unsubscribe(self._on_adv_report, nrf_events.GapEvtAdvReport)
+		self.ble_device.ble_driver.event_subscribe(self.ble_device.scanner._on_adv_report, nrf_events.GapEvtAdvReport)
+		self.collecting = False
+
+		for callback in self.writers.values():
+			csv_file = getattr(callback.__self__, 'csv_file', None)
+			if csv_file is not None:
+				csv_file.close()
+		print("Stopped collecting advertisements")
+		self.show_statistics()
+
+	def show_statistics(self):
+		"""
+		Shows the number of peripherals, collected payloads and suppressed duplicates
+		"""
+		print("Devices: {}; Collected payloads: {}; Suppressed duplicates: {}".format(len(self.writers), self.received, self.duplicates))
@@ -0,0 +1,209 @@
+"""
+file name:			aggregation.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for aggregating the received data on the gateway before storing it.
+					Packets are buffered and decoded in blocks, the statistics of every time window are computed vectorized with NumPy,
+					such that only one row per window has to be stored instead of every raw packet.
+"""
+
+"""
+Import statement
+"""
+import constants
+import customexception
+import payloadformat
+import numpy as np
+
+
+"""
+Supported aggregates
+"""
+AGGREGATES = ['count', 'mean', 'min', 'max', 'first', 'last', 'std']
+
+
+class AggregationSpec(object):
+	"""
+	Configuration of the aggregation of one characteristic, see datacollection.CollectorManager.set_aggregation
+	"""
+	def __init__(self, arg_format, arg_labels = None, arg_window_s = constants.DEFAULT_AGGREGATION_WINDOW_S, arg_aggregates = None,
+				 arg_raw_decimation = 0):
+		"""
+		INPUT PARAMETERS
+
+		param arg_format:			The struct format of the payload with byte order, e.g. '<10h'. Pad bytes 'x' are skipped.
+		type arg_format:			str
+
+		param arg_labels:			The names of the fields, None for 'f0', 'f1', ... Fields labelled None are not aggregated.
+		type arg_labels:			list with str elements
+
+		param arg_window_s:			The window length in seconds
+		type arg_window_s:			float
+
+		param arg_aggregates:		The aggregates of every field, per default constants.DEFAULT_AGGREGATES
+		type arg_aggregates:		list with str elements, see AGGREGATES
+
+		param arg_raw_decimation:	Stores every n-th raw packet alongside the aggregates, 0 for no raw packets
+		type arg_raw_decimation:	int
+		"""
+		fields, offset = payloadformat.parse_format(arg_format)
+
+		labels = arg_labels if arg_labels is not None else ['f{}'.format(position) for position in range(len(fields))]
+		if len(labels) != len(fields):
+			raise customexception.InputException("The format '{}' has {} fields, got {} labels".format(arg_format, len(fields), len(labels)))
+		aggregates = arg_aggregates if arg_aggregates is not None else constants.DEFAULT_AGGREGATES
+		unknown = [aggregate for aggregate in aggregates if aggregate not in AGGREGATES]
+		if unknown:
+			raise customexception.InputException("Unknown aggregates {}, supported: {}".format(unknown, AGGREGATES))
+		if arg_window_s <= 0:
+			raise customexception.InputException("The window length has to be positive, got {}".format(arg_window_s))
+
+		self.format = arg_format
+		self.payload_size = offset
+		self.dtype = np.dtype({'names': [label if label is not None else '_f{}'.format(position) for position, label in enumerate(labels)],
+							   'formats': [dtype for _, dtype in fields], 'offsets': [field_offset for field_offset, _ in fields], 'itemsize': offset})
+		self.labels = [label for label in labels if label is not None]
+		self.window_s = arg_window_s
+		self.aggregates = aggregates
+		self.raw_decimation = arg_raw_decimation
+		"""
+		OTHER PARAMETERS
+
+		param payload_size:	The size of the payload described by the format in bytes, shorter payloads are skipped
+		type payload_size:	int
+
+		param dtype:		The structured NumPy type of the payload
+		type dtype:			np.dtype
+
+		param labels:		The aggregated fields
+		type labels:		list with str elements
+		"""
+
+	def __str__(self):
+		return("{} of {} every {}s{}".format("/".join(self.aggregates), ", ".join(self.labels), self.window_s,
+										   ", every {}. raw packet".format(self.raw_decimation) if self.raw_decimation > 0 else ""))
+
+	def header(self):
+		"""
+		Returns the header of the aggregated csv file
+		"""
+		header = ['Timestamp', 'Count'] if 'count' in self.aggregates else ['Timestamp']
+		return header + ['{}_{}'.format(label, aggregate) for label in self.labels for aggregate in self.aggregates if aggregate != 'count']
+
+
+class WindowAggregator(object):
+	"""
+	Buffers the packets of one characteristic and aggregates them per window. Windows are aligned to multiples of the window length.
+	The buffered block is processed as soon as the first packet of the next window arrives. Thus the per packet work is appending to a list,
+	the decoding and the statistics are vectorized over the block.
+	"""
+	def __init__(self, arg_spec):
+		"""
+		INPUT PARAMETERS
+
+		param arg_spec:			The configuration of the aggregation
+		type arg_spec:			AggregationSpec
+		"""
+		self.spec = arg_spec
+		self.timestamps = []
+		self.payloads = []
+		self.window_end = None
+		self.skipped = 0
+		"""
+		OTHER PARAMETERS
+
+		param timestamps:	The timestamps of the buffered packets
+		type timestamps:	list with float elements
+
+		param payloads:		The buffered payloads
+		type payloads:		list with bytes elements
+
+		param window_end:	The end of the window of the oldest buffered packet
+		type window_end:	float
+
+		param skipped:		The number of packets shorter than the format, they are not aggregated
+		type skipped:		int
+		"""
+
+	"""
+	Private functions
+	"""
+	def _aggregate(self, arg_timestamps, arg_payloads):
+		"""
+		Returns the rows of the windows of the packets, see AggregationSpec.header
+		"""
+		window_ids = np.floor(arg_timestamps / self.spec.window_s).astype(np.int64)
+		starts = np.flatnonzero(np.r_[True, window_ids[1:] != window_ids[:-1]])
+		ends = np.r_[starts[1:], window_ids.size]
+		counts = ends - starts
+
+		columns = [window_ids[starts] * self.spec.window_s]
+		if 'count' in self.spec.aggregates:
+			columns.append(counts)
+		for label in self.spec.labels:
+			values = arg_payloads[label].astype(np.float64)
+			for aggregate in self.spec.aggregates:
+				if aggregate == 'mean':
+					columns.append(np.add.reduceat(values, starts) / counts)
+				elif aggregate == 'min':
+					columns.append(np.minimum.reduceat(values, starts))
+				elif aggregate == 'max':
+					columns.append(np.maximum.reduceat(values, starts))
+				elif aggregate == 'first':
+					columns.append(values[starts])
+				elif aggregate == 'last':
+					columns.append(values[ends - 1])
+				elif aggregate == 'std':
+					mean = np.add.reduceat(values, starts) / counts
+					columns.append(np.sqrt(np.maximum(np.add.reduceat(values * values, starts) / counts - mean * mean, 0)))
+		rows = np.column_stack(columns).tolist()
+		if 'count' in self.spec.aggregates:
+			[row.__setitem__(1, int(row[1])) for row in rows]
+		return rows
+
+	"""
+	Public functions
+	"""
+	def add(self, arg_timestamp, arg_value):
+		"""
+		Buffers a packet. Returns the rows of the completed windows, usually none.
+		"""
+		rows = []
+		if self.window_end is not None and arg_timestamp >= self.window_end:
+			rows = self.process(arg_timestamp)
+		if self.window_end is None:
+			self.window_end = (np.floor(arg_timestamp / self.spec.window_s) + 1) * self.spec.window_s
+		self.timestamps.append(arg_timestamp)
+		self.payloads.append(bytes(arg_value))
+		return rows
+
+	def process(self, arg_until = None):
+		"""
+		Aggregates the buffered packets of the windows ending before arg_until and returns their rows. None for all buffered packets.
+		"""
+		if not self.timestamps:
+			return []
+		timestamps = np.array(self.timestamps)
+		sizes = np.fromiter((len(payload) for payload in self.payloads), dtype = np.int64, count = len(self.payloads))
+
+		# Packets of the window which is not complete yet are kept
+		if arg_until is None:
+			complete = timestamps.size
+		else:
+			complete = int(np.searchsorted(timestamps, np.floor(arg_until / self.spec.window_s) * self.spec.window_s, side = 'left'))
+		kept_timestamps = self.timestamps[complete:]
+		kept_payloads = self.payloads[complete:]
+		valid = sizes[:complete] >= self.spec.payload_size
+		self.skipped += int(complete - valid.sum())
+
+		rows = []
+		if valid.any():
+			size = self.spec.payload_size
+			payloads = np.frombuffer(b''.join(payload[:size] for payload, keep in zip(self.payloads[:complete], valid) if keep), dtype = self.spec.dtype)
+			rows = self._aggregate(timestamps[:complete][valid], payloads)
+
+		self.timestamps = kept_timestamps
+		self.payloads = kept_payloads
+		self.window_end = (np.floor(kept_timestamps[0] / self.spec.window_s) + 1) * self.spec.window_s if kept_timestamps else None
+		return rows
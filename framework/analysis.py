@@ -0,0 +1,393 @@
+"""
+file name:			analysis.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes and functions for analysing the packet arrivals of a recorded session.
+					A session is loaded once into NumPy arrays, independent of the number of devices and of the storage (csv files,
+					segmented recordings or a session container). All statistics are computed vectorized over the whole session.
+"""
+
+"""
+Import statement
+"""
+import constants
+import customexception
+import glob
+import os
+import payloadformat
+import numpy as np
+
+from datetime import datetime
+from cache import load_recording, load_container_stream
+from container import ContainerReader, CONTAINER_FILE_EXTENSION
+from codec import CODEC_FILE_EXTENSION
+
+
+"""
+Timestamps above this value are Unix timestamps (Writer, ReadRequestWriter), below they are relative to the offset (PerfWriter)
+"""
+UNIX_TIMESTAMP_THRESHOLD = 1e9
+
+
+def inter_arrival(arg_timestamps):
+	"""
+	Returns the time between consecutive packets in seconds
+	"""
+	return np.diff(arg_timestamps)
+
+
+def inter_arrival_distribution(arg_timestamps, arg_bins = constants.DEFAULT_ANALYSIS_HISTOGRAM_BINS):
+	"""
+	Returns the statistics and the histogram of the inter-arrival times
+
+	returns:	dict
+				Format: {'mean': float, 'std': float, 'min': float, 'p50': float, 'p90': float, 'p99': float, 'max': float,
+						 'histogram': np.ndarray, 'bin_edges': np.ndarray}, all in seconds
+	"""
+	gaps = inter_arrival(arg_timestamps)
+	if gaps.size == 0:
+		return {'mean': np.nan, 'std': np.nan, 'min': np.nan, 'p50': np.nan, 'p90': np.nan, 'p99': np.nan, 'max': np.nan,
+				'histogram': np.zeros(0, dtype = np.int64), 'bin_edges': np.zeros(0)}
+	p50, p90, p99 = np.percentile(gaps, [50, 90, 99])
+	histogram, bin_edges = np.histogram(gaps, bins = arg_bins)
+	return {'mean': gaps.mean(), 'std': gaps.std(), 'min': gaps.min(), 'p50': p50, 'p90': p90, 'p99': p99, 'max': gaps.max(),
+			'histogram': histogram, 'bin_edges': bin_edges}
+
+
+def connection_events(arg_timestamps, arg_conn_interval_ms, arg_gap_factor = constants.DEFAULT_ANALYSIS_EVENT_GAP_FACTOR):
+	"""
+	Clusters the packet arrivals into connection events. The packets of one connection event arrive within a fraction of the connection interval,
+	thus a new event starts wherever the gap to the previous packet exceeds arg_gap_factor * connection interval.
+	Returns the start time and the number of packets of every connection event.
+
+	param arg_timestamps:		The sorted arrival times in seconds
+	type arg_timestamps:		np.ndarray
+
+	param arg_conn_interval_ms:	The connection interval in milliseconds
+	type arg_conn_interval_ms:	float
+
+	param arg_gap_factor:		The gap starting a new event, relative to the connection interval
+	type arg_gap_factor:		float
+
+	returns:					tuple (np.ndarray with the start times, np.ndarray with the packet counts)
+	"""
+	if arg_timestamps.size == 0:
+		return np.zeros(0), np.zeros(0, dtype = np.int64)
+	new_event = np.empty(arg_timestamps.size, dtype = bool)
+	new_event[0] = True
+	new_event[1:] = np.diff(arg_timestamps) > arg_conn_interval_ms / 1000 * arg_gap_factor
+	event_ids = np.cumsum(new_event) - 1
+	return arg_timestamps[new_event], np.bincount(event_ids)
+
+
+def counter_loss(arg_counters, arg_counter_bits = 32):
+	"""
+	Returns the loss computed from the counter field of the payloads. The counter may wrap around at 2**arg_counter_bits.
+	A step of 0 is a duplicate, a step back is a packet arriving out of order. The counters are unwrapped, a packet is lost
+	if its counter between the smallest and the largest one has never been received, so a reordered packet does not count as lost.
+
+	returns:	dict
+				Format: {'received': int, 'expected': int, 'lost': int, 'loss_rate': float, 'out_of_order': int, 'duplicates': int}
+	"""
+	if arg_counters.size == 0:
+		return {'received': 0, 'expected': 0, 'lost': 0, 'loss_rate': np.nan, 'out_of_order': 0, 'duplicates': 0}
+	half_range = 1 << (arg_counter_bits - 1)
+	# Steps beyond half the range are steps back
+	steps = (np.diff(arg_counters.astype(np.int64)) + half_range) % (1 << arg_counter_bits) - half_range
+	unwrapped = np.concatenate(([0], np.cumsum(steps)))
+	expected = int(unwrapped.max() - unwrapped.min()) + 1
+	lost = expected - np.unique(unwrapped).size
+	return {'received': int(arg_counters.size), 'expected': expected, 'lost': lost, 'loss_rate': lost / expected,
+			'out_of_order': int((steps < 0).sum()), 'duplicates': int((steps == 0).sum())}
+
+
+def throughput(arg_timestamps, arg_sizes, arg_window_s = constants.DEFAULT_ANALYSIS_WINDOW_S, arg_start = None, arg_end = None):
+	"""
+	Returns the throughput over time, in windows of arg_window_s
+
+	param arg_timestamps:	The arrival times in seconds
+	type arg_timestamps:	np.ndarray
+
+	param arg_sizes:		The payload sizes in bytes, None for counting packets only
+	type arg_sizes:			np.ndarray
+
+	returns:				tuple (np.ndarray with the window starts, np.ndarray with packets/s, np.ndarray with bytes/s)
+	"""
+	start = arg_timestamps.min() if arg_start is None else arg_start
+	end = arg_timestamps.max() if arg_end is None else arg_end
+	edges = np.arange(start, end + arg_window_s, arg_window_s)
+	if edges.size < 2:
+		edges = np.array([start, start + arg_window_s])
+	packets, _ = np.histogram(arg_timestamps, bins = edges)
+	data = np.histogram(arg_timestamps, bins = edges, weights = arg_sizes)[0] if arg_sizes is not None else np.zeros(packets.size)
+	return edges[:-1], packets / arg_window_s, data / arg_window_s
+
+
+class Stream(object):
+	"""
+	The packets of one characteristic of one peripheral, with the timestamps relative to the start of the session.
+	The payloads are concatenated into one array, the payload of packet i is payload_data[payload_offsets[i]:payload_offsets[i + 1]].
+	"""
+	def __init__(self, arg_device, arg_service, arg_characteristic, arg_timestamps, arg_payload_data, arg_payload_offsets):
+		"""
+		INPUT PARAMETERS
+
+		param arg_device:			The name of the peripheral
+		type arg_device:			str
+
+		param arg_service:			The UUID of the service
+		type arg_service:			str
+
+		param arg_characteristic:	The UUID of the characteristic
+		type arg_characteristic:	str
+
+		param arg_timestamps:		The arrival times in seconds
+		type arg_timestamps:		np.ndarray
+
+		param arg_payload_data:		The concatenated payloads
+		type arg_payload_data:		np.ndarray with uint8 elements
+
+		param arg_payload_offsets:	The start of every payload and the end of the last one
+		type arg_payload_offsets:	np.ndarray with int64 elements
+		"""
+		self.device = arg_device
+		self.service = arg_service
+		self.characteristic = arg_characteristic
+		self.timestamps = arg_timestamps
+		self.payload_data = arg_payload_data
+		self.payload_offsets = arg_payload_offsets
+		# The ReadRequestWriter and restarted measurements may append out of order
+		if np.any(np.diff(arg_timestamps) < 0):
+			self._sort()
+
+	def __str__(self):
+		return("{} {}: {} packets".format(self.device, self.characteristic, self.timestamps.size))
+
+	def __len__(self):
+		return self.timestamps.size
+
+	"""
+	Private functions
+	"""
+	def _sort(self):
+		"""
+		Sorts the packets by their timestamps
+		"""
+		order = np.argsort(self.timestamps, kind = 'stable')
+		sizes = self.sizes()[order]
+		offsets = np.zeros(sizes.size + 1, dtype = np.int64)
+		offsets[1:] = np.cumsum(sizes)
+		positions = np.repeat(self.payload_offsets[:-1][order] - offsets[:-1], sizes) + np.arange(offsets[-1])
+		self.timestamps = self.timestamps[order]
+		self.payload_data = self.payload_data[positions]
+		self.payload_offsets = offsets
+
+	"""
+	Public functions
+	"""
+	def payloads(self):
+		"""
+		Returns the payloads as bytes. Values which are no bytes, e.g. of the ReadRequestWriter, are encoded as text.
+		"""
+		data = self.payload_data.tobytes()
+		return [data[start:end] for start, end in zip(self.payload_offsets[:-1].tolist(), self.payload_offsets[1:].tolist())]
+
+	def sizes(self):
+		"""
+		Returns the payload sizes in bytes
+		"""
+		return np.diff(self.payload_offsets)
+
+	def counters(self, arg_format = constants.DEFAULT_ANALYSIS_COUNTER_FORMAT, arg_field = 0):
+		"""
+		Returns the counter field of the payloads, e.g. of the CounterService. Payloads of a different size are skipped.
+
+		param arg_format:	The struct format of the payload
+		type arg_format:	str
+
+		param arg_field:	The position of the counter within the payload
+		type arg_field:		int
+		"""
+		fields, size = payloadformat.parse_format(arg_format)
+		starts = self.payload_offsets[:-1][self.sizes() == size]
+		if starts.size == 0:
+			return np.zeros(0, dtype = np.int64)
+		dtype = np.dtype({'names': ['f{}'.format(position) for position in range(len(fields))], 'formats': [field_dtype for _, field_dtype in fields],
+						  'offsets': [offset for offset, _ in fields], 'itemsize': size})
+		payloads = np.ascontiguousarray(self.payload_data[starts[:, None] + np.arange(size)])
+		return payloads.view(dtype).reshape(-1)['f{}'.format(arg_field)].astype(np.int64)
+
+
+class Session(object):
+	"""
+	All recorded streams of a session, found by the session id in the data directory:
+		data/'Peripheral'/'Service'/'Characteristic_UUID'/'Session id'.csv		(Writers without storage)
+		data/'Peripheral'/'Service'/'Characteristic_UUID'/'Session id'/		(storage.SegmentedStorage)
+		data/'Peripheral'/'Service'/'Characteristic_UUID'/'Session id'.dlx	(codec.CodecStorage)
+		data/'Session id'.blec													(container.SessionContainer)
+	Unix timestamps are converted to seconds since the start of the session, as the PerfWriter timestamps are.
+	"""
+	def __init__(self, arg_session_id, arg_data_directory = 'data', arg_catalog = None, arg_cache = True):
+		"""
+		INPUT PARAMETERS
+
+		param arg_session_id:		The id of the session, e.g. '150521_104646'
+		type arg_session_id:		str
+
+		param arg_data_directory:	The data directory
+		type arg_data_directory:	str
+
+		param arg_catalog:			The catalog providing the connection intervals, see catalog.SessionCatalog
+		type arg_catalog:			catalog.SessionCatalog
+
+		param arg_cache:			Loads the recordings from the .npy cache next to them, see cache.py
+		type arg_cache:				bool
+		"""
+		self.session_id = arg_session_id
+		self.data_directory = arg_data_directory
+		self.start_time = datetime.strptime(arg_session_id, "%d%m%y_%H%M%S").timestamp()
+		self.streams = []
+		self.conn_intervals_ms = {}
+
+		self._load(arg_cache)
+		if arg_catalog is not None:
+			self.conn_intervals_ms = {(stream['device'], stream['characteristic']): stream['conn_interval_ms'] for stream in arg_catalog.get_streams(arg_session_id)
+									  if stream['conn_interval_ms'] is not None}
+		if not self.streams:
+			raise customexception.InputException("No recordings of the session {} in '{}'".format(arg_session_id, arg_data_directory))
+		"""
+		OTHER PARAMETERS
+
+		param start_time:			The start of the session as Unix timestamp, taken from the session id
+		type start_time:			float
+
+		param streams:				All streams of the session
+		type streams:				list with Stream elements
+
+		param conn_intervals_ms:	The connection interval per stream from the catalog
+		type conn_intervals_ms:		dict
+									Format: {('Device', 'Characteristic_UUID'): float}
+		"""
+
+	def __str__(self):
+		return("Session {}: {} devices, {} streams, {} packets".format(self.session_id, len(self.devices()), len(self.streams), sum(len(stream) for stream in self.streams)))
+
+	"""
+	Private functions
+	"""
+	def _add_stream(self, arg_device, arg_service, arg_characteristic, arg_arrays):
+		"""
+		Adds the loaded arrays as Stream, see cache.parse_rows
+		"""
+		timestamps, payload_data, payload_offsets = arg_arrays
+		if timestamps.size > 0 and timestamps.min() > UNIX_TIMESTAMP_THRESHOLD:
+			timestamps = timestamps - self.start_time
+		self.streams.append(Stream(arg_device, arg_service, arg_characteristic, timestamps, payload_data, payload_offsets))
+
+	def _load(self, arg_cache):
+		"""
+		Loads the streams of all storages
+		"""
+		pattern = os.path.join(self.data_directory, '*', '*', '*', self.session_id)
+		for path in sorted(glob.glob(pattern + '.csv') + glob.glob(pattern + CODEC_FILE_EXTENSION) + [directory for directory in glob.glob(pattern) if os.path.isdir(directory)]):
+			directory, _ = os.path.split(path)
+			directory, characteristic = os.path.split(directory)
+			directory, service = os.path.split(directory)
+			self._add_stream(os.path.basename(directory), service, characteristic, load_recording(path, arg_cache))
+
+		container_path = os.path.join(self.data_directory, self.session_id + CONTAINER_FILE_EXTENSION)
+		if os.path.exists(container_path):
+			with ContainerReader(container_path) as reader:
+				for stream_id, stream in enumerate(reader.streams):
+					self._add_stream(stream['device'], stream['service'], stream['characteristic'], load_container_stream(reader, stream_id, arg_cache))
+
+	"""
+	Public functions
+	"""
+	def devices(self):
+		"""
+		Returns the names of all recorded peripherals
+		"""
+		return sorted({stream.device for stream in self.streams})
+
+	def get_streams(self, arg_device = None, arg_characteristic = None):
+		"""
+		Returns the streams of a device and/or characteristic, per default all
+		"""
+		return [stream for stream in self.streams if (arg_device is None or stream.device == arg_device)
+				and (arg_characteristic is None or stream.characteristic == arg_characteristic)]
+
+	def device_timestamps(self, arg_device):
+		"""
+		Returns the sorted arrival times of all streams of a device
+		"""
+		return np.sort(np.concatenate([stream.timestamps for stream in self.get_streams(arg_device)]))
+
+	def conn_interval_ms(self, arg_stream, arg_conn_interval_ms = None):
+		"""
+		Returns the connection interval of a stream: the given one, else the one of the catalog, else estimated as the median spacing of the connection event starts.
+		A packet starts a connection event if the gap before it is longer than half of the typical gap between two events, which is the median of the gaps
+		longer than the mean gap. The gaps within an event are shorter, since the packets of an event fit into the connection interval.
+		"""
+		if arg_conn_interval_ms is not None:
+			return arg_conn_interval_ms
+		if (arg_stream.device, arg_stream.characteristic) in self.conn_intervals_ms:
+			return self.conn_intervals_ms[(arg_stream.device, arg_stream.characteristic)]
+		gaps = inter_arrival(arg_stream.timestamps)
+		if gaps.size == 0:
+			return constants.DEFAULT_MIN_CONN_INT_MS
+		threshold = np.median(gaps[gaps >= gaps.mean()]) / 2
+		event_starts = arg_stream.timestamps[1:][gaps > threshold]
+		event_spacing = np.diff(event_starts)
+		return float(np.median(event_spacing)) * 1000 if event_spacing.size > 0 and np.median(event_spacing) > 0 else constants.DEFAULT_MIN_CONN_INT_MS
+
+	def throughput_per_device(self, arg_window_s = constants.DEFAULT_ANALYSIS_WINDOW_S):
+		"""
+		Returns the throughput over time of every device on a common time axis
+
+		returns:	tuple (np.ndarray with the window starts, dict {'Device': (np.ndarray with packets/s, np.ndarray with bytes/s)})
+		"""
+		start = min(stream.timestamps.min() for stream in self.streams if len(stream) > 0)
+		end = max(stream.timestamps.max() for stream in self.streams if len(stream) > 0)
+		result = {}
+		windows = None
+		for device in self.devices():
+			streams = [stream for stream in self.get_streams(device) if len(stream) > 0]
+			if not streams:
+				continue
+			timestamps = np.concatenate([stream.timestamps for stream in streams])
+			sizes = np.concatenate([stream.sizes() for stream in streams])
+			windows, packets, data = throughput(timestamps, sizes, arg_window_s, start, end)
+			result[device] = (packets, data)
+		return windows, result
+
+	def summary(self, arg_conn_interval_ms = None, arg_counter_format = None, arg_counter_field = 0):
+		"""
+		Prints the inter-arrival statistics, the packets per connection event and, with a counter format, the loss of every stream
+
+		param arg_conn_interval_ms:	The configured connection interval in milliseconds, per default from the catalog or estimated
+		type arg_conn_interval_ms:	float
+
+		param arg_counter_format:	The struct format of counter payloads, e.g. '<5I', None for no loss analysis
+		type arg_counter_format:	str
+
+		param arg_counter_field:	The position of the counter within the payload
+		type arg_counter_field:		int
+		"""
+		print("################ {} #################".format(self))
+		for stream in self.streams:
+			if len(stream) < 2:
+				print("{}: {} packets".format(stream.device, len(stream)))
+				continue
+			distribution = inter_arrival_distribution(stream.timestamps)
+			conn_interval_ms = self.conn_interval_ms(stream, arg_conn_interval_ms)
+			_, per_event = connection_events(stream.timestamps, conn_interval_ms)
+			duration = stream.timestamps[-1] - stream.timestamps[0]
+			print("{} {}: {} packets, {:.1f} packets/s".format(stream.device, stream.characteristic, len(stream), (len(stream) - 1) / duration if duration > 0 else np.nan))
+			print("\tInter-arrival [ms]: mean {:.3f}, std {:.3f}, p50 {:.3f}, p90 {:.3f}, p99 {:.3f}, max {:.3f}".format(
+				*(distribution[key] * 1000 for key in ['mean', 'std', 'p50', 'p90', 'p99', 'max'])))
+			print("\tConnection events ({:.2f}ms): {}, packets per event: mean {:.2f}, max {}".format(conn_interval_ms, per_event.size, per_event.mean(), per_event.max()))
+			if arg_counter_format is not None:
+				loss = counter_loss(stream.counters(arg_counter_format, arg_counter_field), 8 * payloadformat.parse_format(arg_counter_format)[0][arg_counter_field][1].itemsize)
+				print("\tLoss: {} of {} packets ({:.3%}), {} out of order, {} duplicates".format(loss['lost'], loss['expected'], loss['loss_rate'], loss['out_of_order'], loss['duplicates']))
@@ -0,0 +1,174 @@
+"""
+file name:			cache.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains functions for loading recordings into NumPy arrays with a cache.
+					The first load parses the recording and stores the timestamps and the payloads as .npy files next to it,
+					later loads memory-map them, as long as the recording has not changed since.
+"""
+
+"""
+Import statement
+"""
+import codecs
+import json
+import os
+import shutil
+import numpy as np
+
+from storage import read_recording, _read_manifest, MANIFEST_FILE_NAME
+from codec import load_codec_recording, CODEC_FILE_EXTENSION
+
+
+CACHE_DIRECTORY_EXTENSION = '.npycache'
+CACHE_KEY_FILE_NAME = 'source.json'
+CACHE_ARRAYS = ['timestamps', 'payload_data', 'payload_offsets']
+"""
+Part of the cache key, increased whenever the parsing changes so that older caches are parsed again
+"""
+CACHE_VERSION = 2
+
+
+def _parse_value(arg_value):
+	"""
+	Returns the bytes of a value as written by the csv writer, e.g. "b'Q!\\x00\\x00'". Other values, e.g. of the ReadRequestWriter, are encoded as text.
+	"""
+	if arg_value.startswith("b'") or arg_value.startswith('b"'):
+		return codecs.escape_decode(arg_value[2:-1])[0]
+	if arg_value.startswith("bytearray(b"):
+		return codecs.escape_decode(arg_value[len("bytearray(b'"):-2])[0]
+	return arg_value.encode('utf-8')
+
+
+def parse_rows(arg_rows):
+	"""
+	Converts the rows of a recording into arrays, skipping comments and header rows.
+	The payloads are concatenated, the payload of packet i is payload_data[payload_offsets[i]:payload_offsets[i + 1]].
+
+	returns:	tuple (np.ndarray timestamps, np.ndarray payload_data with uint8 elements, np.ndarray payload_offsets with int64 elements)
+	"""
+	timestamps = []
+	payloads = []
+	for row in arg_rows:
+		try:
+			timestamp = float(row[0])
+		except (ValueError, IndexError):
+			continue
+		timestamps.append(timestamp)
+		payloads.append(_parse_value(row[1]) if len(row) > 1 else b'')
+
+	payload_offsets = np.zeros(len(payloads) + 1, dtype = np.int64)
+	payload_offsets[1:] = np.cumsum(np.fromiter((len(payload) for payload in payloads), dtype = np.int64, count = len(payloads)))
+	return np.array(timestamps, dtype = np.float64), np.frombuffer(b''.join(payloads), dtype = np.uint8), payload_offsets
+
+
+def _source_key(arg_sources):
+	"""
+	Returns the modification times and the sizes of the files the cache depends on
+
+	param arg_sources:	The path of the file, or the paths of all files
+	type arg_sources:	str or list with str elements
+	"""
+	sources = [arg_sources] if isinstance(arg_sources, str) else arg_sources
+	return {'version': CACHE_VERSION, 'sources': [[os.stat(source).st_mtime_ns, os.stat(source).st_size] for source in sources]}
+
+
+def _segment_sources(arg_directory):
+	"""
+	Returns the files the cache of a segmented recording depends on: the manifest, which is rewritten on every rotation and compression,
+	and the last segment, which grows while the recording is running without the manifest changing.
+	"""
+	sources = [os.path.join(arg_directory, MANIFEST_FILE_NAME)]
+	segments = _read_manifest(arg_directory)['segments']
+	if segments:
+		path = os.path.join(arg_directory, segments[-1]['file'])
+		# The segment may have been compressed after reading the manifest
+		sources.append(path if os.path.exists(path) else path + '.gz')
+	return sources
+
+
+def _load_cache(arg_cache_directory, arg_key):
+	"""
+	Returns the memory-mapped arrays of the cache, or None if there is no valid cache
+	"""
+	try:
+		with open(os.path.join(arg_cache_directory, CACHE_KEY_FILE_NAME), 'r') as key_file:
+			if json.load(key_file) != arg_key:
+				return None
+		return tuple(np.load(os.path.join(arg_cache_directory, name + '.npy'), mmap_mode = 'r') for name in CACHE_ARRAYS)
+	except (OSError, ValueError):
+		return None
+
+
+def _store_cache(arg_cache_directory, arg_key, arg_arrays):
+	"""
+	Stores the arrays. The key is written last, thus an interrupted store is never taken for a valid cache.
+	"""
+	temporary_directory = arg_cache_directory + '.tmp{}'.format(os.getpid())
+	try:
+		shutil.rmtree(temporary_directory, ignore_errors = True)
+		os.makedirs(temporary_directory)
+		[np.save(os.path.join(temporary_directory, name + '.npy'), array) for name, array in zip(CACHE_ARRAYS, arg_arrays)]
+		with open(os.path.join(temporary_directory, CACHE_KEY_FILE_NAME), 'w') as key_file:
+			json.dump(arg_key, key_file)
+		shutil.rmtree(arg_cache_directory, ignore_errors = True)
+		os.replace(temporary_directory, arg_cache_directory)
+	except OSError as e:
+		# E.g. a read-only data directory, the recording is parsed again next time
+		print("Could not cache '{}': {}".format(arg_cache_directory, e))
+		shutil.rmtree(temporary_directory, ignore_errors = True)
+
+
+def _cached(arg_cache_directory, arg_source, arg_parse, arg_cache):
+	"""
+	Returns the cached arrays if the sources have not changed, else parses and caches them
+	"""
+	if arg_cache is False:
+		return arg_parse()
+	key = _source_key(arg_source)
+	arrays = _load_cache(arg_cache_directory, key)
+	if arrays is None:
+		arrays = arg_parse()
+		_store_cache(arg_cache_directory, key, arrays)
+	return arrays
+
+
+def load_recording(arg_path, arg_cache = True):
+	"""
+	Returns the timestamps and the payloads of a recording, see parse_rows. Works for plain csv files, segmented recordings and codec files.
+	The cache of 'Session id'.csv or of the directory 'Session id'/ is 'Session id'.npycache/ and depends on the csv file, or on the manifest and the last segment.
+	Codec files, see codec.CodecStorage, are decoded faster than parsed and are not cached.
+
+	param arg_path:		The path of the csv file, of the directory of the segments or of the codec file
+	type arg_path:		str
+
+	param arg_cache:	Uses and updates the cache
+	type arg_cache:		bool
+	"""
+	if arg_path.endswith(CODEC_FILE_EXTENSION):
+		return load_codec_recording(arg_path)
+	base = os.path.splitext(arg_path)[0] if arg_path.endswith('.csv') else arg_path
+	source = _segment_sources(base) if os.path.isdir(base) else arg_path
+	return _cached(base + CACHE_DIRECTORY_EXTENSION, source, lambda: parse_rows(read_recording(arg_path)), arg_cache)
+
+
+def load_container_stream(arg_reader, arg_stream_id, arg_cache = True):
+	"""
+	Returns the timestamps and the payloads of a stream of a session container, see parse_rows.
+	The cache of 'Session id'.blec is 'Session id'.blec.npycache/'Stream id'/ and depends on the container file.
+
+	param arg_reader:		The reader of the container file
+	type arg_reader:		container.ContainerReader
+
+	param arg_stream_id:	The position of the stream in the stream table
+	type arg_stream_id:		int
+
+	param arg_cache:		Uses and updates the cache
+	type arg_cache:			bool
+	"""
+	stream = arg_reader.streams[arg_stream_id]
+	cache_directory = os.path.join(arg_reader.path + CACHE_DIRECTORY_EXTENSION, str(arg_stream_id))
+	if arg_cache is True:
+		os.makedirs(os.path.dirname(cache_directory), exist_ok = True)
+	return _cached(cache_directory, arg_reader.path, lambda: parse_rows(arg_reader.read(stream['device'], stream['characteristic'])), arg_cache)
@@ -0,0 +1,375 @@
+"""
+file name:			catalog.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for indexing the recorded measurements.
+					Every measurement session and every recorded characteristic is stored in a SQLite database next to the data/ directory,
+					such that recordings can be found by their properties instead of their '%d%m%y_%H%M%S' file name.
+"""
+
+"""
+Import statement
+"""
+import constants
+import csv
+import os
+import sqlite3
+import threading
+
+from datetime import datetime
+from storage import _read_manifest
+from container import ContainerReader, CONTAINER_FILE_EXTENSION
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+	session_id		TEXT PRIMARY KEY,
+	started			REAL,
+	ended			REAL,
+	device_count	INTEGER,
+	stream_count	INTEGER,
+	comment			TEXT
+);
+CREATE TABLE IF NOT EXISTS streams (
+	session_id			TEXT,
+	device				TEXT,
+	address				TEXT,
+	service				TEXT,
+	characteristic		TEXT,
+	writer_type			TEXT,
+	path				TEXT,
+	conn_interval_ms	REAL,
+	slave_latency		INTEGER,
+	timeout_ms			REAL,
+	started				REAL,
+	ended				REAL,
+	packet_count		INTEGER,
+	byte_count			INTEGER,
+	comment				TEXT,
+	PRIMARY KEY (session_id, device, characteristic)
+);
+CREATE INDEX IF NOT EXISTS streams_device ON streams (device);
+CREATE INDEX IF NOT EXISTS streams_characteristic ON streams (characteristic);
+"""
+
+
+def _is_session_id(arg_name):
+	"""
+	Returns True if the name is a session id in the format '%d%m%y_%H%M%S'
+	"""
+	try:
+		datetime.strptime(arg_name, "%d%m%y_%H%M%S")
+	except ValueError:
+		return False
+	return True
+
+
+class SessionCatalog(object):
+	"""
+	SQLite catalog of all measurement sessions. A session corresponds to one call of CollectorManager.set_writers_for_all_devices,
+	its id is the timestamp used in the file names of its csv files. A stream corresponds to one Writer, i.e. one characteristic of one peripheral.
+	Times are Unix timestamps.
+	"""
+	def __init__(self, arg_path = constants.DEFAULT_CATALOG_PATH):
+		"""
+		INPUT PARAMETERS
+
+		param arg_path:		The path of the SQLite database
+		type arg_path:		str
+		"""
+		self.path = arg_path
+		directory = os.path.dirname(arg_path)
+		if directory:
+			os.makedirs(directory, exist_ok = True)
+
+		self.database = sqlite3.connect(arg_path, check_same_thread = False)
+		self.database.row_factory = sqlite3.Row
+		self.database.executescript(SCHEMA)
+		self.lock = threading.Lock()
+		"""
+		OTHER PARAMETERS
+
+		param database:		The connection to the SQLite database
+		type database:		sqlite3.Connection
+
+		param lock:			Serializes the access of the main thread and the AdmissionLoop
+		type lock:			threading.Lock
+		"""
+
+	def __str__(self):
+		return("SessionCatalog at '{}'".format(self.path))
+
+	def __del__(self):
+		self.close()
+
+	"""
+	Private functions
+	"""
+	def _execute(self, arg_statement, arg_values = ()):
+		"""
+		Executes a modifying statement and commits it
+		"""
+		with self.lock:
+			self.database.execute(arg_statement, arg_values)
+			self.database.commit()
+
+	def _query(self, arg_statement, arg_values = ()):
+		"""
+		Executes a query and returns all rows
+		"""
+		with self.lock:
+			return self.database.execute(arg_statement, arg_values).fetchall()
+
+	def _import_stream(self, arg_session_id, arg_device, arg_service, arg_characteristic, arg_path, arg_first, arg_last, arg_packet_count):
+		"""
+		Adds a stream found by import_directory. The start is taken from the session id, the end from the span of its timestamps.
+		"""
+		started = datetime.strptime(arg_session_id, "%d%m%y_%H%M%S").timestamp()
+		self._execute("INSERT OR IGNORE INTO sessions (session_id, started, device_count, stream_count) VALUES (?, ?, 0, 0)", (arg_session_id, started))
+		self._execute("INSERT OR IGNORE INTO streams (session_id, device, service, characteristic, path, started, ended, packet_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+					  (arg_session_id, arg_device, arg_service, arg_characteristic, arg_path, started,
+					   started + (arg_last - arg_first if arg_packet_count > 0 else 0), arg_packet_count))
+		self._execute("UPDATE sessions SET device_count = (SELECT COUNT(DISTINCT device) FROM streams WHERE session_id = ?), stream_count = (SELECT COUNT(*) FROM streams WHERE session_id = ?), "
+					  "ended = (SELECT MAX(ended) FROM streams WHERE session_id = ?) WHERE session_id = ?", (arg_session_id, arg_session_id, arg_session_id, arg_session_id))
+
+	def _import_container(self, arg_session_id, arg_path):
+		"""
+		Adds all streams of a container file of a container.SessionContainer. Returns the number of added streams.
+		"""
+		with ContainerReader(arg_path) as reader:
+			for stream_id, stream in enumerate(reader.streams):
+				index = reader.index[stream_id]
+				first = last = index[0][0] if index else 0
+				# Only the rows after the last index entry have to be read for the last timestamp
+				for row in (reader.read(stream['device'], stream['characteristic'], index[-1][0]) if index else []):
+					last = row[0]
+				self._import_stream(arg_session_id, stream['device'], stream['service'], stream['characteristic'], arg_path, first, last, stream['rows'])
+			return len(reader.streams)
+
+	"""
+	Public functions
+	"""
+	def close(self):
+		"""
+		Closes the SQLite database
+		"""
+		if getattr(self, 'database', None) is not None:
+			self.database.close()
+			self.database = None
+
+	def start_session(self, arg_session_id, arg_started):
+		"""
+		Adds a session
+
+		param arg_session_id:	The id of the session, e.g. '150521_104646'
+		type arg_session_id:	str
+
+		param arg_started:		The start of the session
+		type arg_started:		float
+		"""
+		self._execute("INSERT OR REPLACE INTO sessions (session_id, started, device_count, stream_count) VALUES (?, ?, 0, 0)", (arg_session_id, arg_started))
+
+	def add_stream(self, arg_session_id, arg_writer, arg_address = None, arg_connection_params = None):
+		"""
+		Adds the stream of a Writer to a session
+
+		param arg_session_id:			The id of the session
+		type arg_session_id:			str
+
+		param arg_writer:				The Writer of the stream
+		type arg_writer:				writer.GenericWriter
+
+		param arg_address:				The address of the peripheral
+		type arg_address:				str
+
+		param arg_connection_params:	The active connection parameters of the peripheral
+		type arg_connection_params:		blatann.peer.ActiveConnectionParameters
+		"""
+		csv_file = getattr(arg_writer, 'csv_file', None)
+		self._execute("INSERT OR REPLACE INTO streams (session_id, device, address, service, characteristic, writer_type, path, conn_interval_ms, slave_latency, timeout_ms, packet_count, byte_count) "
+					  "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)",
+					  (arg_session_id, arg_writer.name, arg_address, arg_writer.service, arg_writer.characteristic_uuid, type(arg_writer).__name__,
+					   csv_file.name if csv_file is not None else None,
+					   arg_connection_params.interval_ms if arg_connection_params is not None else None,
+					   arg_connection_params.slave_latency if arg_connection_params is not None else None,
+					   arg_connection_params.timeout_ms if arg_connection_params is not None else None))
+		self._execute("UPDATE sessions SET device_count = (SELECT COUNT(DISTINCT device) FROM streams WHERE session_id = ?), stream_count = (SELECT COUNT(*) FROM streams WHERE session_id = ?) WHERE session_id = ?",
+					  (arg_session_id, arg_session_id, arg_session_id))
+
+	def end_stream(self, arg_session_id, arg_writer, arg_ended):
+		"""
+		Stores the start, the end and the packet and byte count of the stream of a Writer
+
+		param arg_session_id:	The id of the session
+		type arg_session_id:	str
+
+		param arg_writer:		The Writer of the stream
+		type arg_writer:		writer.GenericWriter
+
+		param arg_ended:		The end of the stream
+		type arg_ended:			float
+		"""
+		started = arg_writer.subscribed_time + arg_writer.clock_offset if arg_writer.subscribed_time is not None else None
+		self._execute("UPDATE streams SET started = ?, ended = ?, packet_count = ?, byte_count = ? WHERE session_id = ? AND device = ? AND characteristic = ?",
+					  (started, arg_ended, arg_writer.packet_count, arg_writer.byte_count, arg_session_id, arg_writer.name, arg_writer.characteristic_uuid))
+
+	def end_session(self, arg_session_id, arg_ended, arg_comment = None):
+		"""
+		Stores the end and the comment of a session
+
+		param arg_session_id:	The id of the session
+		type arg_session_id:	str
+
+		param arg_ended:		The end of the session
+		type arg_ended:			float
+
+		param arg_comment:		The comment of the measurement
+		type arg_comment:		str
+		"""
+		self._execute("UPDATE sessions SET ended = ?, comment = ? WHERE session_id = ?", (arg_ended, arg_comment, arg_session_id))
+		self._execute("UPDATE streams SET comment = ? WHERE session_id = ?", (arg_comment, arg_session_id))
+
+	def import_directory(self, arg_data_directory = 'data'):
+		"""
+		Adds the recordings of the data directory which are not in the catalog yet, e.g. the ones recorded before the catalog existed:
+			data/'Peripheral'/'Service'/'Characteristic_UUID'/'Session id'.csv	csv files
+			data/'Peripheral'/'Service'/'Characteristic_UUID'/'Session id'/		segmented recordings of a storage.SegmentedStorage
+			data/'Session id'.blec												container files of a container.SessionContainer
+			data/'Peripheral'/'Service'/'Characteristic_UUID'/'Session id'.dlx	codec files of a codec.CodecStorage, only if NumPy is installed
+		The start is taken from the session id and the end from the timestamps of the recording, the byte count is unknown. Returns the number of added streams.
+
+		param arg_data_directory:	The data directory
+		type arg_data_directory:	str
+		"""
+		try:
+			import codec
+		except ImportError:
+			codec = None
+
+		known_paths = {row['path'] for row in self._query("SELECT path FROM streams WHERE path IS NOT NULL")}
+		added = 0
+		for directory, directory_names, file_names in os.walk(arg_data_directory):
+			parts = os.path.relpath(directory, arg_data_directory).split(os.sep)
+			if parts == [os.curdir]:
+				for file_name in sorted(file_names):
+					path = os.path.join(directory, file_name)
+					session_id, extension = os.path.splitext(file_name)
+					if extension == CONTAINER_FILE_EXTENSION and path not in known_paths and _is_session_id(session_id):
+						added += self._import_container(session_id, path)
+			if len(parts) != 3:
+				continue
+
+			device, service, characteristic = parts
+			for file_name in sorted(file_names + directory_names):
+				path = os.path.join(directory, file_name)
+				session_id, extension = os.path.splitext(file_name)
+				if path in known_paths or not _is_session_id(session_id):
+					continue
+
+				if extension == '.csv':
+					timestamps = []
+					with open(path, 'r', newline = '') as csv_file:
+						for row in csv.reader(csv_file):
+							try:
+								timestamps.append(float(row[0]))
+							except (ValueError, IndexError):
+								continue
+					first, last, packet_count = (timestamps[0], timestamps[-1], len(timestamps)) if timestamps else (0, 0, 0)
+				elif extension == '' and os.path.isdir(path):
+					segments = [segment for segment in _read_manifest(path)['segments'] if segment['rows'] > 0]
+					if len(segments) == 0:
+						continue
+					first, last, packet_count = float(segments[0]['first_timestamp']), float(segments[-1]['last_timestamp']), sum(segment['rows'] for segment in segments)
+				elif codec is not None and extension == codec.CODEC_FILE_EXTENSION:
+					timestamps = codec.load_codec_recording(path)[0]
+					first, last, packet_count = (float(timestamps[0]), float(timestamps[-1]), len(timestamps)) if len(timestamps) > 0 else (0, 0, 0)
+				else:
+					continue
+				self._import_stream(session_id, device, service, characteristic, path, first, last, packet_count)
+				added += 1
+		print("Imported {} recordings from '{}'".format(added, arg_data_directory))
+		return added
+
+	def find_sessions(self, device_count = None, rate_hz = None, rate_tolerance = constants.DEFAULT_CATALOG_RATE_TOLERANCE, device = None, characteristic = None,
+					  writer_type = None, conn_interval_ms = None, comment = None):
+		"""
+		Returns the sessions matching all given criteria, the latest first, e.g. find_sessions(device_count = 4, rate_hz = 200) for all 4-device 200 Hz runs.
+
+		param device_count:		The number of recorded peripherals
+		type device_count:		int
+
+		param rate_hz:			The notification rate of at least one stream, packet count divided by duration
+		type rate_hz:			float
+
+		param rate_tolerance:	The relative tolerance of rate_hz, e.g. 0.1 for +-10%
+		type rate_tolerance:	float
+
+		param device:			The name of a recorded peripheral, may contain SQL wildcards, e.g. 'CounterTester%'
+		type device:			str
+
+		param characteristic:	The UUID of a recorded characteristic
+		type characteristic:	str
+
+		param writer_type:		The type of the Writer, e.g. 'PerfWriter'
+		type writer_type:		str
+
+		param conn_interval_ms:	The connection interval of at least one stream
+		type conn_interval_ms:	float
+
+		param comment:			A part of the comment of the session
+		type comment:			str
+
+		returns:				list with sqlite3.Row elements with the columns of the sessions table
+		"""
+		conditions = []
+		values = []
+		if device_count is not None:
+			conditions.append("sessions.device_count = ?")
+			values.append(device_count)
+		if rate_hz is not None:
+			conditions.append("streams.ended > streams.started AND ABS(streams.packet_count / (streams.ended - streams.started) - ?) <= ?")
+			values += [rate_hz, rate_hz * rate_tolerance]
+		if device is not None:
+			conditions.append("streams.device LIKE ?")
+			values.append(device)
+		if characteristic is not None:
+			conditions.append("streams.characteristic = ?")
+			values.append(characteristic)
+		if writer_type is not None:
+			conditions.append("streams.writer_type = ?")
+			values.append(writer_type)
+		if conn_interval_ms is not None:
+			conditions.append("streams.conn_interval_ms = ?")
+			values.append(conn_interval_ms)
+		if comment is not None:
+			conditions.append("sessions.comment LIKE ?")
+			values.append("%{}%".format(comment))
+
+		statement = "SELECT DISTINCT sessions.* FROM sessions JOIN streams ON streams.session_id = sessions.session_id"
+		if conditions:
+			statement += " WHERE " + " AND ".join(conditions)
+		return self._query(statement + " ORDER BY sessions.started DESC", values)
+
+	def get_streams(self, arg_session_id):
+		"""
+		Returns all streams of a session
+
+		param arg_session_id:	The id of the session
+		type arg_session_id:	str
+
+		returns:				list with sqlite3.Row elements with the columns of the streams table
+		"""
+		return self._query("SELECT * FROM streams WHERE session_id = ? ORDER BY device, characteristic", (arg_session_id,))
+
+	def show_sessions(self, arg_sessions = None):
+		"""
+		Prints the sessions, per default all sessions
+
+		param arg_sessions:		The sessions, e.g. the result of find_sessions
+		type arg_sessions:		list with sqlite3.Row elements
+		"""
+		if arg_sessions is None:
+			arg_sessions = self._query("SELECT * FROM sessions ORDER BY started DESC")
+		[print("{}: {} devices, {} streams, {:.1f}s, '{}'".format(session['session_id'], session['device_count'], session['stream_count'],
+				(session['ended'] or session['started']) - session['started'], session['comment'] or '')) for session in arg_sessions]
@@ -0,0 +1,528 @@
+"""
+file name:			codec.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for storing the recordings of the Writers in a compressed binary format.
+					Timestamps are nearly periodic and counter payloads increase monotonically, thus the rows are encoded in blocks, column by column,
+					as XOR, delta or delta-of-delta of the previous value (Gorilla-style), and the residuals are bit-packed with one width per column.
+					Encoding and decoding work on whole blocks with NumPy.
+"""
+
+"""
+Import statement
+"""
+import constants
+import customexception
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+
+"""
+Codec format, all numbers little endian:
+	File header:	MAGIC, VERSION (uint16)
+	Record:			type (uint8), payload length (uint32), payload
+	STREAM record:	JSON with the header of the csv file and the ticks per second of the timestamps, null for the raw float64 timestamps
+	BLOCK record:	rows (uint32), payload word size (uint8, 0 for the raw payloads), then the columns:
+					timestamps, payload sizes, and for a word size of w bytes one column per w bytes of the payload, else the raw payloads
+	Column:			method (uint8), width (uint8), shift (uint8), first value (uint64), first delta (int64),
+					the residuals of the method shifted right by shift, every one packed into width bits
+A file without the end of its last record, e.g. after a crash, is read up to the last complete record.
+"""
+MAGIC = b'BLED'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+RECORD_HEADER = struct.Struct('<BI')
+BLOCK_HEADER = struct.Struct('<IB')
+COLUMN_HEADER = struct.Struct('<BBBQq')
+
+RECORD_STREAM = 1
+RECORD_BLOCK = 2
+RECORD_COMMENT = 3
+
+METHOD_XOR = 0
+METHOD_DELTA = 1
+METHOD_DELTA_OF_DELTA = 2
+
+PAYLOAD_WORD_SIZES = [1, 2, 4]
+
+CODEC_FILE_EXTENSION = '.dlx'
+
+
+def _zigzag(arg_values):
+	"""
+	Maps the signed values to unsigned ones, small magnitudes to small values: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...
+	"""
+	return ((arg_values << 1) ^ (arg_values >> 63)).view(np.uint64)
+
+
+def _unzigzag(arg_values):
+	"""
+	Inverse of _zigzag
+	"""
+	return (arg_values >> np.uint64(1)).view(np.int64) ^ -(arg_values & np.uint64(1)).view(np.int64)
+
+
+def _wrap(arg_values, arg_bits):
+	"""
+	Returns the signed values modulo 2^arg_bits, e.g. the delta of a 16 bit counter wrapping from 65535 to 0 is 1
+	"""
+	if arg_bits == 64:
+		return arg_values
+	values = arg_values & ((1 << arg_bits) - 1)
+	return values - ((values >> (arg_bits - 1)) << arg_bits)
+
+
+def _pack(arg_values, arg_width):
+	"""
+	Returns the lowest arg_width bits of every value, concatenated
+	"""
+	if arg_width == 0 or arg_values.size == 0:
+		return b''
+	bits = np.unpackbits(arg_values.astype('>u8').view(np.uint8).reshape(-1, 8), axis = 1)[:, 64 - arg_width:]
+	return np.packbits(bits).tobytes()
+
+
+def _unpack(arg_data, arg_count, arg_width):
+	"""
+	Inverse of _pack
+	"""
+	if arg_width == 0 or arg_count == 0:
+		return np.zeros(arg_count, dtype = np.uint64)
+	bits = np.zeros((arg_count, 64), dtype = np.uint8)
+	bits[:, 64 - arg_width:] = np.unpackbits(np.frombuffer(arg_data, dtype = np.uint8), count = arg_count * arg_width).reshape(arg_count, arg_width)
+	return np.packbits(bits, axis = 1).view('>u8').reshape(-1).astype(np.uint64)
+
+
+def _residuals(arg_values, arg_method, arg_bits):
+	"""
+	Returns the first value, the first delta and the residuals of the values for a method
+	"""
+	if arg_method == METHOD_XOR:
+		return int(arg_values[0]), 0, arg_values[1:] ^ arg_values[:-1]
+	deltas = _wrap(np.diff(arg_values.view(np.int64)), arg_bits)
+	if arg_method == METHOD_DELTA:
+		return int(arg_values[0]), 0, _zigzag(deltas)
+	return int(arg_values[0]), int(deltas[0]) if deltas.size > 0 else 0, _zigzag(_wrap(np.diff(deltas), arg_bits))
+
+
+def _encode_column(arg_values, arg_bits):
+	"""
+	Encodes a column with the method giving the fewest bits, see the codec format
+
+	param arg_values:	The values, at least one
+	type arg_values:	np.ndarray with uint64 elements
+
+	param arg_bits:		The width of the values, the deltas are taken modulo 2^arg_bits
+	type arg_bits:		int
+	"""
+	best = None
+	for method in [METHOD_DELTA_OF_DELTA, METHOD_DELTA, METHOD_XOR]:
+		first, first_delta, residuals = _residuals(arg_values, method, arg_bits)
+		used_bits = int(np.bitwise_or.reduce(residuals)) if residuals.size > 0 else 0
+		# Bits which are zero in all residuals, e.g. the low mantissa bits of the XOR of floats, are not stored
+		shift = (used_bits & -used_bits).bit_length() - 1 if used_bits > 0 else 0
+		width = (used_bits >> shift).bit_length()
+		if best is None or width * residuals.size < best[0]:
+			best = (width * residuals.size, method, width, shift, first, first_delta, residuals)
+	_, method, width, shift, first, first_delta, residuals = best
+	return COLUMN_HEADER.pack(method, width, shift, first, first_delta) + _pack(residuals >> np.uint64(shift), width)
+
+
+def _decode_column(arg_data, arg_offset, arg_rows, arg_bits):
+	"""
+	Returns the values of the column at arg_offset and the offset after it
+
+	returns:	tuple (np.ndarray with uint64 elements, int)
+	"""
+	method, width, shift, first, first_delta = COLUMN_HEADER.unpack_from(arg_data, arg_offset)
+	offset = arg_offset + COLUMN_HEADER.size
+	count = max(arg_rows - (2 if method == METHOD_DELTA_OF_DELTA else 1), 0)
+	length = (count * width + 7) // 8
+	residuals = _unpack(arg_data[offset:offset + length], count, width) << np.uint64(shift)
+	first = np.array([first], dtype = np.uint64)
+
+	if method == METHOD_XOR:
+		return np.bitwise_xor.accumulate(np.concatenate((first, residuals))), offset + length
+	if method == METHOD_DELTA:
+		deltas = _unzigzag(residuals)
+	else:
+		deltas = np.concatenate(([first_delta], first_delta + np.cumsum(_unzigzag(residuals))))[:arg_rows - 1]
+	values = np.concatenate((first.view(np.int64), first.view(np.int64) + np.cumsum(deltas)))
+	if arg_bits < 64:
+		values &= (1 << arg_bits) - 1
+	return values.view(np.uint64), offset + length
+
+
+def encode_block(arg_timestamps, arg_payloads, arg_ticks_per_second = constants.DEFAULT_CODEC_TICKS_PER_S):
+	"""
+	Encodes rows into the payload of a BLOCK record. Payloads of equal size are split into columns of 1, 2 or 4 bytes,
+	the word size giving the smallest block is taken. Payloads of different sizes are stored raw.
+
+	param arg_timestamps:			The timestamps of the rows
+	type arg_timestamps:			np.ndarray with float64 elements
+
+	param arg_payloads:				The payloads of the rows
+	type arg_payloads:				list with bytes elements
+
+	param arg_ticks_per_second:		The timestamps are rounded to ticks of this rate, None to keep the float64 timestamps unchanged
+	type arg_ticks_per_second:		int
+	"""
+	rows = len(arg_payloads)
+	if arg_ticks_per_second is None:
+		timestamps = np.ascontiguousarray(arg_timestamps, dtype = np.float64).view(np.uint64)
+	else:
+		timestamps = np.rint(np.asarray(arg_timestamps, dtype = np.float64) * arg_ticks_per_second).astype(np.int64).view(np.uint64)
+	sizes = np.fromiter((len(payload) for payload in arg_payloads), dtype = np.int64, count = rows)
+	columns = _encode_column(timestamps, 64) + _encode_column(sizes.view(np.uint64), 64)
+
+	data = b''.join(arg_payloads)
+	size = int(sizes[0])
+	best = (0, data)
+	if size > 0 and (sizes == size).all():
+		for word_size in [word_size for word_size in PAYLOAD_WORD_SIZES if size % word_size == 0]:
+			words = np.frombuffer(data, dtype = '<u{}'.format(word_size)).reshape(rows, -1).astype(np.uint64)
+			encoded = b''.join(_encode_column(np.ascontiguousarray(words[:, column]), 8 * word_size) for column in range(words.shape[1]))
+			if len(encoded) < len(best[1]):
+				best = (word_size, encoded)
+	return BLOCK_HEADER.pack(rows, best[0]) + columns + best[1]
+
+
+def decode_block(arg_data, arg_ticks_per_second = constants.DEFAULT_CODEC_TICKS_PER_S):
+	"""
+	Decodes the payload of a BLOCK record, see encode_block
+
+	returns:	tuple (np.ndarray timestamps, np.ndarray payload sizes with int64 elements, np.ndarray payload data with uint8 elements)
+	"""
+	rows, word_size = BLOCK_HEADER.unpack_from(arg_data, 0)
+	timestamps, offset = _decode_column(arg_data, BLOCK_HEADER.size, rows, 64)
+	sizes, offset = _decode_column(arg_data, offset, rows, 64)
+	sizes = sizes.view(np.int64)
+	if arg_ticks_per_second is None:
+		timestamps = timestamps.view(np.float64)
+	else:
+		timestamps = timestamps.view(np.int64) / arg_ticks_per_second
+
+	if word_size == 0:
+		return timestamps, sizes, np.frombuffer(arg_data, dtype = np.uint8, count = int(sizes.sum()), offset = offset)
+	words = np.empty((rows, int(sizes[0]) // word_size), dtype = '<u{}'.format(word_size))
+	for column in range(words.shape[1]):
+		words[:, column], offset = _decode_column(arg_data, offset, rows, 8 * word_size)
+	return timestamps, sizes, words.view(np.uint8).reshape(-1)
+
+
+def _read_records(arg_path):
+	"""
+	Yields the type and the payload of every complete record of a codec file
+	"""
+	with open(arg_path, 'rb') as codec_file:
+		data = codec_file.read()
+	if len(data) < FILE_HEADER.size or FILE_HEADER.unpack_from(data, 0) != (MAGIC, VERSION):
+		raise customexception.InputException("'{}' is not a codec file of version {}".format(arg_path, VERSION))
+	offset = FILE_HEADER.size
+	while offset + RECORD_HEADER.size <= len(data):
+		record_type, length = RECORD_HEADER.unpack_from(data, offset)
+		offset += RECORD_HEADER.size
+		if offset + length > len(data):
+			print("'{}' ends within a record, it has been read up to the last complete record".format(arg_path))
+			return
+		yield record_type, data[offset:offset + length]
+		offset += length
+
+
+def load_codec_recording(arg_path):
+	"""
+	Returns the timestamps and the payloads of a codec file, in the format of cache.parse_rows
+
+	param arg_path:		The path of the codec file, e.g. 'data/P&SNode/Service/Characteristic_UUID/150521_104646.dlx'
+	type arg_path:		str
+
+	returns:	tuple (np.ndarray timestamps, np.ndarray payload_data with uint8 elements, np.ndarray payload_offsets with int64 elements)
+	"""
+	ticks_per_second = None
+	timestamps = [np.zeros(0)]
+	sizes = [np.zeros(0, dtype = np.int64)]
+	payloads = [np.zeros(0, dtype = np.uint8)]
+	for record_type, payload in _read_records(arg_path):
+		if record_type == RECORD_STREAM:
+			ticks_per_second = json.loads(payload.decode('utf-8'))['ticks_per_second']
+		elif record_type == RECORD_BLOCK:
+			block_timestamps, block_sizes, block_payloads = decode_block(payload, ticks_per_second)
+			timestamps.append(block_timestamps)
+			sizes.append(block_sizes)
+			payloads.append(block_payloads)
+
+	sizes = np.concatenate(sizes)
+	payload_offsets = np.zeros(sizes.size + 1, dtype = np.int64)
+	payload_offsets[1:] = np.cumsum(sizes)
+	return np.concatenate(timestamps), np.concatenate(payloads), payload_offsets
+
+
+def read_codec_comments(arg_path):
+	"""
+	Returns the comments of a codec file
+	"""
+	return [payload.decode('utf-8') for record_type, payload in _read_records(arg_path) if record_type == RECORD_COMMENT]
+
+
+class CodecStorage(object):
+	"""
+	Storage handed over to the Writers, see datacollection.CollectorManager.set_all_storage.
+	The recording 'data/Peripheral/Service/Characteristic_UUID/Session id.csv' is stored encoded in 'data/Peripheral/Service/Characteristic_UUID/Session id.dlx'.
+	Only recordings with the rows 'Timestamp', 'Value' are supported, e.g. not the ones of the AggregationWriter.
+	"""
+	per_stream_directories = True
+
+	def __init__(self, arg_ticks_per_second = constants.DEFAULT_CODEC_TICKS_PER_S, arg_block_rows = constants.DEFAULT_CODEC_BLOCK_ROWS):
+		"""
+		INPUT PARAMETERS
+
+		param arg_ticks_per_second:		The timestamps are rounded to ticks of this rate, None to keep the float64 timestamps unchanged
+		type arg_ticks_per_second:		int
+
+		param arg_block_rows:			The number of rows encoded together. A flush encodes the rows so far into a shorter block.
+		type arg_block_rows:			int
+		"""
+		self.ticks_per_second = arg_ticks_per_second
+		self.block_rows = arg_block_rows
+		self.files = {}
+		"""
+		OTHER PARAMETERS
+
+		param files:	The codec files opened by the storage
+		type files:		dict
+						Format: {'Path of the codec file': CodecFile}
+		"""
+
+	def __str__(self):
+		return("CodecStorage with blocks of {} rows, {}".format(self.block_rows, "timestamps in ticks of 1/{}s".format(self.ticks_per_second) if self.ticks_per_second is not None else "lossless timestamps"))
+
+	"""
+	Public functions
+	"""
+	def open(self, arg_path, arg_header):
+		"""
+		Returns a CodecFile for the recording which would otherwise be stored in arg_path
+
+		param arg_path:		The path of the csv file, e.g. 'data/P&SNode/Service/Characteristic_UUID/150521_104646.csv'
+		type arg_path:		str
+
+		param arg_header:	The header row of the csv file
+		type arg_header:	list
+		"""
+		if list(arg_header[:2]) != ['Timestamp', 'Value']:
+			raise customexception.InputException("The CodecStorage stores rows of 'Timestamp', 'Value', got {}".format(arg_header))
+		path = os.path.splitext(arg_path)[0] + CODEC_FILE_EXTENSION
+		self.files[path] = CodecFile(path, arg_header, self.ticks_per_second, self.block_rows)
+		return self.files[path]
+
+	def comment(self, arg_path, arg_comment):
+		"""
+		Appends a comment to the recording, also after it has been closed
+
+		param arg_path:		The path of the csv file, as given to open
+		type arg_path:		str
+
+		param arg_comment:	The comment
+		type arg_comment:	str
+		"""
+		path = os.path.splitext(arg_path)[0] + CODEC_FILE_EXTENSION
+		codec_file = self.files.get(path)
+		if codec_file is None:
+			raise customexception.InvalidStateException("No codec file '{}'".format(path))
+		codec_file.comment(arg_comment)
+
+
+class CodecFile(object):
+	"""
+	Replacement for the csv file and the csv writer of a Writer, which buffers the rows and appends them encoded block by block.
+	The rows are buffered within the event thread, comments may come from another thread, thus the file is written under a lock.
+	"""
+	def __init__(self, arg_path, arg_header, arg_ticks_per_second, arg_block_rows):
+		"""
+		INPUT PARAMETERS
+
+		param arg_path:					The path of the codec file
+		type arg_path:					str
+
+		param arg_header:				The header row of the csv file
+		type arg_header:				list
+
+		param arg_ticks_per_second:		The timestamps are rounded to ticks of this rate, None to keep the float64 timestamps unchanged
+		type arg_ticks_per_second:		int
+
+		param arg_block_rows:			The number of rows encoded together
+		type arg_block_rows:			int
+		"""
+		self.name = arg_path
+		self.ticks_per_second = arg_ticks_per_second
+		self.block_rows = arg_block_rows
+		self.timestamps = []
+		self.payloads = []
+		self.lock = threading.Lock()
+		self.closed = False
+
+		new_file = not os.path.exists(arg_path) or os.path.getsize(arg_path) == 0
+		self.file = open(arg_path, 'ab')
+		if new_file is True:
+			self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+		self._write_record(RECORD_STREAM, json.dumps({'header': list(arg_header), 'ticks_per_second': arg_ticks_per_second}).encode('utf-8'))
+		"""
+		OTHER PARAMETERS
+
+		param timestamps:	The timestamps of the buffered rows
+		type timestamps:	list with float elements
+
+		param payloads:		The payloads of the buffered rows
+		type payloads:		list with bytes elements
+
+		param lock:			Serializes the blocks and the comments
+		type lock:			threading.Lock
+
+		param closed:		True if the file has been closed
+		type closed:		bool
+
+		param file:			The codec file
+		type file:			file object
+		"""
+
+	"""
+	Private functions
+	"""
+	def _write_record(self, arg_type, arg_payload):
+		"""
+		Appends a record. Has to be called with the lock held, or before the file is shared.
+		"""
+		self.file.write(RECORD_HEADER.pack(arg_type, len(arg_payload)) + arg_payload)
+
+	def _write_block(self):
+		"""
+		Encodes the buffered rows into a block. Has to be called with the lock held.
+		"""
+		if not self.timestamps:
+			return
+		self._write_record(RECORD_BLOCK, encode_block(np.array(self.timestamps), self.payloads, self.ticks_per_second))
+		self.timestamps = []
+		self.payloads = []
+
+	"""
+	Public functions
+	"""
+	def writerow(self, arg_row):
+		"""
+		Buffers a row and writes a block as soon as block_rows rows are buffered. Values which are no bytes, e.g. of the ReadRequestWriter, are stored as text.
+		"""
+		value = arg_row[1]
+		payload = bytes(value) if isinstance(value, (bytes, bytearray)) else str(value).encode('utf-8')
+		with self.lock:
+			self.timestamps.append(float(arg_row[0]))
+			self.payloads.append(payload)
+			if len(self.timestamps) >= self.block_rows:
+				self._write_block()
+
+	def comment(self, arg_comment):
+		"""
+		Appends a comment, after the rows received so far
+		"""
+		with self.lock:
+			if self.closed is False:
+				self._write_block()
+				self._write_record(RECORD_COMMENT, arg_comment.encode('utf-8'))
+				self.file.flush()
+				return
+			with open(self.name, 'ab') as codec_file:
+				codec_file.write(RECORD_HEADER.pack(RECORD_COMMENT, len(arg_comment.encode('utf-8'))) + arg_comment.encode('utf-8'))
+
+	def flush(self):
+		"""
+		Writes the buffered rows as a block, such that they are on the disk after the next fsync
+		"""
+		with self.lock:
+			if self.closed is False:
+				self._write_block()
+				self.file.flush()
+
+	def fileno(self):
+		return self.file.fileno()
+
+	def close(self):
+		with self.lock:
+			if self.closed is True:
+				return
+			self._write_block()
+			self.file.close()
+			self.closed = True
+
+
+def main(arg_data_directory = 'data'):
+	"""
+	Benchmark of the codec on the recordings in the data directory: compares the size and the load time with the csv files
+	and with a plain binary format (timestamp float64, payload size uint16, payload), and checks that the decoded rows are equal.
+	"""
+	# Imported here, cache.py imports this module to load codec files
+	import glob
+	from cache import load_recording
+
+	paths = sorted(glob.glob(os.path.join(arg_data_directory, '*', '*', '*', '*.csv')))
+	if not paths:
+		print("No recordings in '{}'".format(arg_data_directory))
+		return
+
+	print("{:<70} {:>9} {:>12} {:>12} {:>12} {:>12}".format("Recording", "Rows", "CSV", "Binary", "Codec us", "Codec exact"))
+	totals = np.zeros(4, dtype = np.int64)
+	load_times = np.zeros(4)
+	with tempfile.TemporaryDirectory() as temporary_directory:
+		for path in paths:
+			start = time.perf_counter()
+			timestamps, payload_data, payload_offsets = load_recording(path, False)
+			load_times[0] += time.perf_counter() - start
+			if timestamps.size == 0:
+				continue
+			payloads = [payload_data[payload_offsets[row]:payload_offsets[row + 1]].tobytes() for row in range(timestamps.size)]
+
+			binary_path = os.path.join(temporary_directory, 'recording.bin')
+			with open(binary_path, 'wb') as binary_file:
+				binary_file.write(b''.join(struct.pack('<dH', timestamp, len(payload)) + payload for timestamp, payload in zip(timestamps.tolist(), payloads)))
+			start = time.perf_counter()
+			with open(binary_path, 'rb') as binary_file:
+				data = binary_file.read()
+			offset = 0
+			while offset < len(data):
+				_, size = struct.unpack_from('<dH', data, offset)
+				offset += 10 + size
+			load_times[1] += time.perf_counter() - start
+			sizes = [os.path.getsize(path), os.path.getsize(binary_path)]
+
+			for position, ticks_per_second in enumerate([constants.DEFAULT_CODEC_TICKS_PER_S, None]):
+				codec_path = os.path.join(temporary_directory, 'recording{}'.format(CODEC_FILE_EXTENSION))
+				if os.path.exists(codec_path):
+					os.remove(codec_path)
+				codec_file = CodecFile(codec_path, ['Timestamp', 'Value', 'Comments'], ticks_per_second, constants.DEFAULT_CODEC_BLOCK_ROWS)
+				[codec_file.writerow(row) for row in zip(timestamps.tolist(), payloads)]
+				codec_file.close()
+				start = time.perf_counter()
+				decoded_timestamps, decoded_data, decoded_offsets = load_codec_recording(codec_path)
+				load_times[2 + position] += time.perf_counter() - start
+				sizes.append(os.path.getsize(codec_path))
+
+				tolerance = 0.5 / ticks_per_second if ticks_per_second is not None else 0
+				if not (np.array_equal(decoded_data, payload_data) and np.array_equal(decoded_offsets, payload_offsets)
+						and np.abs(decoded_timestamps - timestamps).max() <= tolerance * (1 + 1e-9)):
+					raise customexception.InvalidStateException("The codec changed the rows of '{}'".format(path))
+
+			totals += sizes
+			print("{:<70} {:>9} {:>12} {:>12} {:>12} {:>12}".format(os.path.relpath(path, arg_data_directory)[-70:], timestamps.size, *sizes))
+
+	print("{:<70} {:>9} {:>12} {:>12} {:>12} {:>12}".format("Total", "", *totals.tolist()))
+	print("{:<70} {:>9} {:>12} {:>12.1f} {:>12.1f} {:>12.1f}".format("Size relative to the csv files in %", "", 100, *(100 * totals[1:] / totals[0]).tolist()))
+	print("{:<70} {:>9} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f}".format("Load time in s", "", *load_times.tolist()))
+
+
+if __name__ == "__main__":
+	main(sys.argv[1] if len(sys.argv) > 1 else 'data')
@@ -12,31 +12,42 @@ Import statement
 import timer
 import customexception
 import constants
+import queue
 
 from datacollection import *
+from registry import DeviceSelector
+from discovery import TargetedDiscovery
 from blatann.peer import ConnectionParameters
+from blatann.gap.scanning import ScanParameters
 
 class Connection(object):
 	"""
 	Class which corresponds to a single connection with a peripheral. 
 	"""
-	def __init__(self, arg_peer):
+	def __init__(self, arg_peer, arg_ble_device = None, arg_name = None):
 		"""
 		INPUT PARAMETERS
 
-		param arg_peer: 	The connection/peer corresponding the peripheral
-		type arg_peer:		blatann.peer.Peer
+		param arg_peer: 		The connection/peer corresponding the peripheral
+		type arg_peer:			blatann.peer.Peer
+
+		param arg_ble_device: 	The nRF device which holds this connection
+		type arg_ble_device:	blatann.BleDevice
+
+		param arg_name: 		The alias of the peripheral from the registry.DeviceRegistry. Per default the name of the peer.
+		type arg_name:			str
 		"""
 		self.peer = arg_peer
+		self.ble_device = arg_ble_device
 
-		self.name = self.peer.name
+		self.name = arg_name if arg_name is not None else self.peer.name
 		self.discovered = False
 		self._collector = None
 
 		"""
 		OTHER PARAMETERS:
 
-		param name: 		The name of the peripheral
+		param name: 		The name of the peripheral, unique among all connections. Used for the Collector and the data paths.
 		type name: 			str
 
 		param discovered: 	Attribute which tells whether the database of this connection has been discovered
@@ -57,6 +68,14 @@ class Connection(object):
 			self.peer.disconnect()
 			print("Disconnected from '{}'.".format(self.peer.name))
 		return
+
+	def disconnect_async(self):
+		"""
+		Starts disconnecting this peer connection without waiting for it. Returns the waitable of the disconnection, or None if not connected.
+		"""
+		if self.status is True:
+			return self.peer.disconnect()
+		return None
 	
 	@property
 	def this_connection(self):
@@ -85,17 +104,27 @@ class Connection(object):
 		self._collector = arg_value
 
 
-	def discover_services(self):
+	def discover_services(self, arg_targets = None):
 		"""
 		Discover services which the current connection offers. peer.database will be updated.
 		Note: If called more than once, the database will be extended with the same values as before
+
+		param arg_targets:	The target characteristics, see discovery.TargetedDiscovery. If given, only these characteristics are discovered,
+							which saves most round trips on peripherals with many services. None discovers the whole database.
+		type arg_targets:	list with str elements or dict
+							Format: ['Characteristic UUID'] or {'Service UUID': ['Characteristic UUID']}
 		"""
 		if self.discovered is True:
 			print("Device '{}' has already discovered.".format(self.name))
 			return
 		else:	
 			print("Discover Services...")
-			_, event_args = self.peer.discover_services().wait(10, exception_on_timeout=False)
+			if arg_targets and self.ble_device is not None:
+				targeted_discovery = TargetedDiscovery(self.peer, self.ble_device, arg_targets)
+				found = targeted_discovery.discover()
+				print("Discovered {} target characteristics of peripheral '{}' in {} round trips.".format(found, self.name, targeted_discovery.round_trips))
+			else:
+				_, event_args = self.peer.discover_services().wait(10, exception_on_timeout=False)
 			print("Service discovery for peripheral '{}' complete!".format(self.name))
 
 			# Instantiates the Collector class with the database and reference it with attribute self._collector
@@ -108,28 +137,51 @@ class ConnectionManager(object):
 	Main Class for maintaining and handling all connections with peripherals.
 	"""
 
-	def __init__(self, arg_ble_device, arg_scan_report_dict):
+	def __init__(self, arg_ble_device, arg_scan_report_dict, arg_max_connections_per_device = None, arg_registry = None):
 		"""
 		INPUT PARAMETERS 
 
-		param	arg_ble_device: The ble_device operating
-		type	arg_ble_device: blatann.device.BleDevice
-		param	arg_scan_report_dict: The formatted collection of all scanned nearby devices.
-		type	arg_scan_report_dict: Dict with format: {"str:Name": Address}
-		"""
-		self.ble_device = arg_ble_device
+		param	arg_ble_device: 					The ble_device operating. In the multi-adapter mode a list of all opened ble_devices.
+		type	arg_ble_device: 					blatann.device.BleDevice or list with blatann.device.BleDevice elements
+		param	arg_scan_report_dict: 				The formatted collection of all scanned nearby devices.
+		type	arg_scan_report_dict: 				Dict with format: {"str:Name": Address}
+		param	arg_max_connections_per_device: 	The maximum number of peripherals a single ble_device can be connected to. None if unlimited.
+		type	arg_max_connections_per_device: 	int
+		param	arg_registry: 						All scanned peripherals keyed by their address, used for resolving the target devices.
+		type	arg_registry: 						registry.DeviceRegistry
+		"""
+		if isinstance(arg_ble_device, (list, tuple)):
+			self.ble_devices = list(arg_ble_device)
+		else:
+			self.ble_devices = [arg_ble_device]
+		self.ble_device = self.ble_devices[0]
 		self.scan_report_dict = arg_scan_report_dict
+		self.max_connections_per_device = arg_max_connections_per_device
+		self.registry = arg_registry
 
 		self.target_devices = set()							
+		self.expected_notification_rates = {}
+		self.target_characteristics = {}
 		self.connections = []		
 		self.connection_parameter = ConnectionParameters(constants.DEFAULT_MIN_CONN_INT_MS, constants.DEFAULT_MAX_CONN_INT_MS, constants.DEFAULT_TIMEOUT_MS, constants.DEFAULT_SLAVE_LATENCY)
 			
 		"""
 		OTHER PARAMETERS
 
-		param target_devices:		A set which contains all name of target devices		
+		param ble_devices:					All ble_devices the peripherals can be assigned to
+		type ble_devices:					list with blatann.device.BleDevice elements
+
+		param target_devices:		A set which contains all names (or registry.DeviceSelector objects) of target devices		
 		type target_devices:		set
 
+		param expected_notification_rates:	The expected notification rate of the target devices in Hz, used as load for assigning them to the ble_devices
+		type expected_notification_rates:	dict
+											Format: {'Name': float}
+
+		param target_characteristics:		The target characteristics per peripheral, only these are discovered by the CollectorManager
+		type target_characteristics:		dict
+											Format: {'Name': ['Characteristic UUID']}
+
 		param connections:			List which contains Connections object
 		type connections:			list
 		
@@ -138,10 +190,10 @@ class ConnectionManager(object):
 		"""
 
 	def __str__(self):
-		return("ConnectionManager class of: '{}'".format(self.ble_device)) 
+		return("ConnectionManager class of: '{}'".format(", ".join(str(ble_device) for ble_device in self.ble_devices))) 
 
 	def __del__(self):
-		if self.ble_device.ble_driver.is_open is False:
+		if all(ble_device.ble_driver.is_open is False for ble_device in self.ble_devices):
 			return
 		else:
 			self.disconnect_all()
@@ -159,32 +211,108 @@ class ConnectionManager(object):
 		"""
 		self.target_devices.add(arg_target_device)
 
-	def _connect_to(self, arg_target_name, arg_target_address):
+	def _connect_to(self, arg_target_name, arg_target_address, arg_ble_device = None):
 		"""
 		Connects the nRF device with the respective peripheral
 		param arg_target_name: 		The name of the target device
 		type arg_target_name: 		str
 		param arg_target_address: 	The address of the corresponding target device
 		type arg_target_address: 	blatann.BLEAddr
+		param arg_ble_device: 		The nRF device establishing the connection. Per default self.ble_device
+		type arg_ble_device: 		blatann.BleDevice
 		returns: 					the peer of the corresponding connection (blatann.peer.Peer)
 		"""
-		# NOTE: arg_target_name might not necessarily be the same as peer.name. If that is the case, adjust restore_connections: 
-		#		- Replace peer.name with target_name from the scan_report_dict
-		
+		# NOTE: arg_target_name might not necessarily be the same as peer.name. The Connection keeps arg_target_name as its name, 
+		#		so that restore_connections can look up the address in the scan_report_dict again.
+		if arg_ble_device is None:
+			arg_ble_device = self.ble_device
+
 		print("Connecting to '{}'...".format(str(arg_target_name)))
-		peer = self.ble_device.connect(arg_target_address, self.connection_parameter).wait(5)
-		print("Successfully connected to '{}'".format(str(peer.name)))
+		peer = arg_ble_device.connect(arg_target_address, self.connection_parameter).wait(5)
+		print("Successfully connected to '{}'".format(str(arg_target_name)))
 		return peer
 
+	def _resolve_target_devices(self):
+		"""
+		Resolves the target devices into the aliases of the scanned peripherals.
+		A name which several peripherals advertise resolves into all of them, as does a registry.DeviceSelector.
+		returns: 					The aliases of the target devices, sorted
+		"""
+		aliases = set()
+		for target_device in self.target_devices:
+			if isinstance(target_device, DeviceSelector):
+				if self.registry is None:
+					raise customexception.InvalidStateException("Cannot resolve '{}' without a device registry".format(target_device))
+				entries = self.registry.select([target_device])
+			elif target_device in self.scan_report_dict or self.registry is None:
+				aliases.add(target_device)
+				continue
+			else:
+				entries = self.registry.select([DeviceSelector(name_pattern = target_device)])
+
+			if len(entries) == 0:
+				print("Could not find '{}' in the scan report".format(target_device))
+				input_value = input("Continue? (y/n)")
+				if input_value == 'n':
+					raise customexception.UserException("Stopped by User")
+
+			for entry in entries:
+				aliases.add(entry.alias)
+				# The expected notification rate may be given for the name instead of the alias
+				if target_device in self.expected_notification_rates:
+					self.expected_notification_rates.setdefault(entry.alias, self.expected_notification_rates[target_device])
+
+		return sorted(aliases)
+
+	def _assign_target_devices(self, arg_target_names):
+		"""
+		Assigns the target devices to the ble_devices by load. The devices with the highest expected notification rate are assigned first,
+		each to the ble_device with the lowest accumulated notification rate which has still a free connection.
+
+		param arg_target_names: 	The names of the target devices
+		type arg_target_names: 		list with str elements
+		returns: 					The assignment with format {'Name': blatann.BleDevice}
+		"""
+		load = {id(ble_device): 0 for ble_device in self.ble_devices}
+		count = {id(ble_device): 0 for ble_device in self.ble_devices}
+		for connection in self.connections:
+			if connection.ble_device is not None and id(connection.ble_device) in load:
+				load[id(connection.ble_device)] += self.expected_notification_rates.get(connection.name, constants.DEFAULT_EXPECTED_NOTIFICATION_RATE_HZ)
+				count[id(connection.ble_device)] += 1
+
+		assignment = {}
+		for target_name in sorted(arg_target_names, key = lambda name: self.expected_notification_rates.get(name, constants.DEFAULT_EXPECTED_NOTIFICATION_RATE_HZ), reverse = True):
+			candidates = [ble_device for ble_device in self.ble_devices if self.max_connections_per_device is None or count[id(ble_device)] < self.max_connections_per_device]
+			if len(candidates) == 0:
+				raise customexception.InvalidStateException("Not enough free connections on the nRF devices for '{}'".format(target_name))
+
+			ble_device = min(candidates, key = lambda candidate: (load[id(candidate)], count[id(candidate)]))
+			load[id(ble_device)] += self.expected_notification_rates.get(target_name, constants.DEFAULT_EXPECTED_NOTIFICATION_RATE_HZ)
+			count[id(ble_device)] += 1
+			assignment[target_name] = ble_device
+		return assignment
+
 	"""
 	Public functions
 	"""
 
-	def disconnect_all(self):
+	def disconnect_all(self, arg_timeout_s = constants.DEFAULT_DISCONNECT_TIMEOUT_S):
 		"""
-		Disconnects all peripherals
+		Disconnects all peripherals at once and waits for all disconnections together.
+
+		param arg_timeout_s:	The time in seconds to wait for all disconnections
+		type arg_timeout_s:		float
 		"""
-		[connection.disconnect() for connection in self.connections]
+		pending = [(connection, connection.disconnect_async()) for connection in self.connections]
+		deadline = time.perf_counter() + arg_timeout_s
+		for connection, waitable in pending:
+			if waitable is None:
+				continue
+			waitable.wait(max(deadline - time.perf_counter(), 0), exception_on_timeout = False)
+			if connection.status is True:
+				print("'{}' has not been disconnected within {}s.".format(connection.name, arg_timeout_s))
+			else:
+				print("Disconnected from '{}'.".format(connection.name))
 		self.connections.clear()
 
 
@@ -199,8 +327,8 @@ class ConnectionManager(object):
 		"""
 		Set all devices which the nRF device should connect to.
 		
-		param arg_list_target_devices: Target devices
-		type arg_list_target_devices: list with str elements
+		param arg_list_target_devices: Target devices, either by name/alias or by a registry.DeviceSelector
+		type arg_list_target_devices: list with str or registry.DeviceSelector elements
 		"""
 		for target_device in arg_list_target_devices:
 			self._add_target_device(target_device)
@@ -213,6 +341,34 @@ class ConnectionManager(object):
 		self.target_devices = set()
 
 
+	def set_target_characteristic_on_device(self, name, arg_characteristic_list):
+		"""
+		Selects specific characteristics of a peripheral before the CollectorManager is created. Only these characteristics are discovered,
+		which saves most of the discovery round trips with many services, and they are set as target characteristics of its Collector.
+		Peripherals without target characteristics are discovered completely.
+
+		param name: 					Name of the peripheral. Either its alias, or its advertised name which selects all peripherals advertising it.
+		type name: 						str
+		param arg_characteristic_list: 	A list with all specified characteristics
+		type arg_characteristic_list: 	list with str elements
+		"""
+		self.target_characteristics.setdefault(name, [])
+		self.target_characteristics[name] += [characteristic for characteristic in arg_characteristic_list if characteristic not in self.target_characteristics[name]]
+
+
+	def set_expected_notification_rate(self, arg_target_device, arg_rate_hz):
+		"""
+		Sets the expected notification rate of a target device, summed up over all its characteristics. 
+		Only relevant in the multi-adapter mode, where the target devices are assigned to the nRF devices by their load.
+
+		param arg_target_device: 	Target device
+		type arg_target_device: 	str
+		param arg_rate_hz: 			The expected notification rate in Hz
+		type arg_rate_hz: 			float
+		"""
+		self.expected_notification_rates[arg_target_device] = arg_rate_hz
+
+
 	def set_default_connection_parameters(self, min_conn_interval_ms = constants.DEFAULT_MIN_CONN_INT_MS, max_conn_interval_ms = constants.DEFAULT_MAX_CONN_INT_MS, timeout_ms = constants.DEFAULT_TIMEOUT_MS, slave_latency = constants.DEFAULT_SLAVE_LATENCY):
 		"""
 		Sets the preferred connection parameters which are going to be negotiated with the peripherals
@@ -240,9 +396,12 @@ class ConnectionManager(object):
 		if len(self.target_devices) == 0:
 			raise customexception.InputException("No target devices selected")
 
-		for target_name in self.target_devices:
+		target_names = self._resolve_target_devices()
+		assignment = self._assign_target_devices([target_name for target_name in target_names if target_name in self.scan_report_dict])
+
+		for target_name in target_names:
 			try:
-				self.connections.append(Connection(self._connect_to(target_name, self.scan_report_dict[target_name])))
+				self.connections.append(Connection(self._connect_to(target_name, self.scan_report_dict[target_name], assignment[target_name]), assignment[target_name], target_name))
 			except KeyError:
 				print("Could not find '{}' in the scan report".format(target_name))
 				input_value = input("Continue? (y/n)")
@@ -252,14 +411,87 @@ class ConnectionManager(object):
 					continue
 
 
+	def connect_with_known_devices(self, arg_timeout_s = constants.DEFAULT_KNOWN_DEVICES_TIMEOUT_S):
+		"""
+		Connects with the known devices of the registry (see scanner.Scanner.load_known_devices) without scanning for all devices first.
+		The nRF device scans continuously and connects to whichever known device advertises first, then continues with the next one.
+		Thus reconnecting after a restart takes about as long as the advertising intervals of the peripherals.
+		If target devices are set, only those are connected, otherwise all known devices.
+
+		NOTE: 	blatann does not expose the whitelist of the SoftDevice, therefore the advertising reports are filtered by address on the host.
+
+		param arg_timeout_s:	Stops waiting for the remaining known devices after this duration in seconds
+		type arg_timeout_s:		float
+		"""
+		if self.registry is None or len(self.registry) == 0:
+			raise customexception.InvalidStateException("No known devices loaded")
+
+		target_names = self._resolve_target_devices() if len(self.target_devices) > 0 else sorted(self.scan_report_dict)
+		connected_names = {connection.name for connection in self.connections if connection.status is True}
+		pending = {str(self.scan_report_dict[target_name]): target_name for target_name in target_names if target_name not in connected_names}
+		assignment = self._assign_target_devices(list(pending.values()))
+
+		advertising_queue = queue.Queue()
+		def on_scan_received(ble_device, scan_report):
+			advertising_queue.put(str(scan_report.peer_address))
+
+		scanner = self.ble_device.scanner
+		scan_parameters = ScanParameters(constants.DEFAULT_ADV_SCAN_INTERVAL_MS, constants.DEFAULT_ADV_SCAN_WINDOW_MS, 0, False)
+		scanner.on_scan_received.register(on_scan_received)
+		print("Waiting for {} known devices to advertise...".format(len(pending)))
+		deadline = time.perf_counter() + arg_timeout_s
+		try:
+			scanner.start_scan(scan_parameters)
+			while len(pending) > 0 and time.perf_counter() < deadline:
+				try:
+					address = advertising_queue.get(timeout = deadline - time.perf_counter())
+				except queue.Empty:
+					break
+				if address not in pending:
+					continue
+
+				# The SoftDevice cannot scan while it initiates a connection
+				scanner.stop()
+				target_name = pending.pop(address)
+				try:
+					self.connections.append(Connection(self._connect_to(target_name, self.scan_report_dict[target_name], assignment[target_name]), assignment[target_name], target_name))
+				except Exception as e:
+					print("Could not connect to '{}': {}".format(target_name, e))
+					pending[address] = target_name
+
+				# Advertising reports received while connecting are outdated
+				while not advertising_queue.empty():
+					advertising_queue.get_nowait()
+				if len(pending) > 0:
+					scanner.start_scan(scan_parameters)
+		finally:
+			scanner.stop()
+			scanner.on_scan_received.deregister(on_scan_received)
+
+		if len(pending) > 0:
+			print("Known devices not found within {} seconds: {}".format(arg_timeout_s, ", ".join(sorted(pending.values()))))
+
+
+	def save_known_devices(self, arg_file_path):
+		"""
+		Saves the connected devices as known devices, such that a later session can connect to them with connect_with_known_devices.
+
+		param arg_file_path:	The path of the .json file
+		type arg_file_path:		str
+		"""
+		if self.registry is None:
+			raise customexception.InvalidStateException("Cannot save known devices without a device registry")
+		self.registry.save(arg_file_path, [connection.name for connection in self.connections])
+
+
 	def restore_connections(self):
 		"""
 		Iterates and checks through all connection and reestablish them if disconnected. Not fully tested yet.
 		Would NOT recommend to restore connections in general or else the central scheduling will be a mess. The central will have a hard time re-scheduling all connections.
 		
-		NOTE: connection_name does not necessarily be the same as target_name from self.connect_with_all_devices
+		NOTE: connection.name is the alias of the peripheral from the scan_report_dict, not necessarily its advertised name
 		"""
-		self.connections[:] = [Connection(self._connect_to(connection.name, self.scan_report_dict[connection.name])) if connection.status is False else connection for connection in self.connections]
+		self.connections[:] = [Connection(self._connect_to(connection.name, self.scan_report_dict[connection.name], connection.ble_device), connection.ble_device, connection.name) if connection.status is False else connection for connection in self.connections]
 
 
 	def show_connected_devices(self):
@@ -271,14 +503,15 @@ class ConnectionManager(object):
 
 	def create_collectorManager(self):
 		"""
-		Creates an datacollection.CollectorManager class from the current connections
+		Creates an datacollection.CollectorManager class from the current connections.
+		Only the target characteristics set with set_target_characteristic_on_device are discovered.
 		exception: If no devices have been connected yet, raises InvalidStateException
 		"""
 		if len(self.connections) == 0:
 			raise customexception.InvalidStateException("Cannot create CollectorManager if no devices are connected")
 
 		else:
-			return CollectorManager(self.connections)
+			return CollectorManager(self.connections, self.target_characteristics)
 
 
 
@@ -16,6 +16,106 @@ DEFAULT_NUMBER_PERIPHERALS = 2
 DEFAULT_HW_QUEUE_NOTIFICATION = 16
 DEFAULT_HW_QUEUE_WRITE_COMMANDS = 16
 DEFAULT_ATTRIBUTE_TABLE_SIZE = 4096
+DEFAULT_ATT_MTU_MAX_SIZE = 247
+DEFAULT_EVENT_LENGTH = 6
+
+"""
+Configuration of the SoftDevice RAM solver
+"""
+DEFAULT_SOLVER_MAX_PROBES = 50
+
+"""
+Configuration of the multi-adapter mode
+"""
+DEFAULT_EXPECTED_NOTIFICATION_RATE_HZ = 1
+
+"""
+Configuration of the advertisement collection
+"""
+DEFAULT_ADV_SCAN_INTERVAL_MS = 100
+DEFAULT_ADV_SCAN_WINDOW_MS = 100
+
+"""
+Configuration of the connection to known devices
+"""
+DEFAULT_KNOWN_DEVICES_TIMEOUT_S = 30
+
+
+"""
+Configuration of the admission of new peripherals during a measurement
+"""
+MIN_SCAN_WINDOW_MS = 2.5
+DEFAULT_ADMISSION_SCAN_INTERVAL_MS = 1000
+DEFAULT_ADMISSION_SCAN_BUDGET = 0.05
+DEFAULT_ADMISSION_POLL_S = 0.5
+DEFAULT_ADMISSION_RETRY_S = 30
+DEFAULT_ADMISSION_SCAN_REPORT_LIFETIME_S = 60
+
+"""
+Configuration of the data collection
+"""
+DEFAULT_SUBSCRIBE_TIMEOUT_S = 10
+DEFAULT_READ_DRAIN_TIMEOUT_S = 3
+DEFAULT_WRITE_TIMEOUT_S = 5
+
+"""
+Configuration of the session catalog
+"""
+DEFAULT_CATALOG_PATH = 'data/catalog.sqlite'
+DEFAULT_CATALOG_RATE_TOLERANCE = 0.1
+
+"""
+Configuration of the segmented storage
+"""
+DEFAULT_SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_SEGMENT_MAX_S = 3600
+
+"""
+Configuration of the session container
+"""
+DEFAULT_CONTAINER_INDEX_INTERVAL = 256
+
+"""
+Configuration of the codec storage
+"""
+DEFAULT_CODEC_TICKS_PER_S = 1000000
+DEFAULT_CODEC_BLOCK_ROWS = 1024
+
+"""
+Configuration of the analysis
+"""
+DEFAULT_ANALYSIS_HISTOGRAM_BINS = 100
+DEFAULT_ANALYSIS_EVENT_GAP_FACTOR = 0.5
+DEFAULT_ANALYSIS_WINDOW_S = 1
+DEFAULT_ANALYSIS_COUNTER_FORMAT = '<5I'
+
+"""
+Configuration of the in-memory ring store
+"""
+DEFAULT_RING_RETENTION_S = 10
+DEFAULT_RING_CAPACITY = 16384
+DEFAULT_RING_PAYLOAD_WIDTH = 40
+DEFAULT_RING_HEADROOM_DIVISOR = 8
+
+"""
+Configuration of the live view
+"""
+DEFAULT_LIVE_WINDOW_S = 10
+DEFAULT_LIVE_REFRESH_S = 0.5
+DEFAULT_LIVE_POINTS = 1000
+DEFAULT_LIVE_RATE_BIN_S = 0.25
+
+"""
+Configuration of the aggregation
+"""
+DEFAULT_AGGREGATION_WINDOW_S = 1
+DEFAULT_AGGREGATES = ['count', 'mean', 'min', 'max', 'last']
+
+"""
+Configuration of the shutdown
+"""
+DEFAULT_SHUTDOWN_TIMEOUT_S = 5
+DEFAULT_DISCONNECT_TIMEOUT_S = 5
 
 
 """
@@ -0,0 +1,549 @@
+"""
+file name:			container.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for storing all recordings of a session in a single file.
+					Instead of one open csv file per characteristic, the rows of all Writers are interleaved into one append-only container file.
+					A stream table and a sparse index of timestamp -> offset per stream allow to read a time range of one stream without reading the whole file.
+"""
+
+"""
+Import statement
+"""
+import bisect
+import constants
+import csv
+import customexception
+import io
+import json
+import os
+import struct
+import threading
+
+
+"""
+Container format, all numbers little endian:
+	File header:	MAGIC, VERSION (uint16)
+	Record:			type (uint8), stream id (uint16), timestamp (float64), payload length (uint32), payload
+	Footer:			FOOTER record with the stream table and the index as JSON payload, followed by the trailer:
+					offset of the FOOTER record (uint64), TRAILER_MAGIC
+The payload of a DATA record is the csv encoded row without the timestamp, thus read rows look like the rows of the csv files.
+A container without footer, e.g. after a crash, is indexed again by skipping from record header to record header.
+"""
+MAGIC = b'BLEC'
+TRAILER_MAGIC = b'BLEX'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+RECORD_HEADER = struct.Struct('<BHdI')
+TRAILER = struct.Struct('<Q4s')
+
+RECORD_STREAM = 1
+RECORD_DATA = 2
+RECORD_COMMENT = 3
+RECORD_FOOTER = 4
+
+CONTAINER_FILE_EXTENSION = '.blec'
+
+
+def _encode_row(arg_values):
+	"""
+	Returns the csv encoded values
+	"""
+	buffer = io.StringIO()
+	csv.writer(buffer).writerow(arg_values)
+	return buffer.getvalue().encode('utf-8')
+
+
+def _decode_row(arg_payload):
+	"""
+	Returns the values of a csv encoded row
+	"""
+	return next(csv.reader(io.StringIO(arg_payload.decode('utf-8'))), [])
+
+
+class SessionContainer(object):
+	"""
+	Storage handed over to the Writers, see datacollection.CollectorManager.set_all_storage.
+	All recordings of a session, which would otherwise be stored in 'data/Peripheral/Service/Characteristic_UUID/Session id.csv',
+	are stored in the single file 'data/Session id.blec'. A new session, e.g. after set_writers_for_all_devices, gets a new file.
+	"""
+	per_stream_directories = False
+
+	def __init__(self, arg_directory = 'data', arg_index_interval = constants.DEFAULT_CONTAINER_INDEX_INTERVAL):
+		"""
+		INPUT PARAMETERS
+
+		param arg_directory:		The directory of the container files
+		type arg_directory:			str
+
+		param arg_index_interval:	Every arg_index_interval-th row of a stream gets an index entry
+		type arg_index_interval:	int
+		"""
+		self.directory = arg_directory
+		self.index_interval = arg_index_interval
+		self.files = {}
+		self.lock = threading.Lock()
+		"""
+		OTHER PARAMETERS
+
+		param files:	The open container files per session
+		type files:		dict
+						Format: {'Session id': ContainerFile}
+
+		param lock:		Serializes the opening of the container files
+		type lock:		threading.Lock
+		"""
+
+	def __str__(self):
+		return("SessionContainer in '{}' with an index entry every {} rows".format(self.directory, self.index_interval))
+
+	"""
+	Private functions
+	"""
+	def _split_path(self, arg_path):
+		"""
+		Returns the session id, device, service and characteristic of the path 'data/Peripheral/Service/Characteristic_UUID/Session id.csv'
+		"""
+		directory, file_name = os.path.split(arg_path)
+		directory, characteristic = os.path.split(directory)
+		directory, service = os.path.split(directory)
+		device = os.path.basename(directory)
+		return os.path.splitext(file_name)[0], device, service, characteristic
+
+	def _file(self, arg_session_id):
+		"""
+		Returns the container file of the session, opens it if needed
+		"""
+		with self.lock:
+			container_file = self.files.get(arg_session_id)
+			if container_file is None:
+				path = os.path.join(self.directory, arg_session_id + CONTAINER_FILE_EXTENSION)
+				if os.path.exists(path):
+					raise customexception.InvalidStateException("The container file {} already exists and would be overwritten".format(path))
+				os.makedirs(self.directory, exist_ok = True)
+				container_file = ContainerFile(path, self.index_interval)
+				self.files[arg_session_id] = container_file
+			return container_file
+
+	"""
+	Public functions
+	"""
+	def open(self, arg_path, arg_header):
+		"""
+		Adds a stream to the container of the session and returns it. The stream replaces the csv file and the csv writer of a Writer.
+
+		param arg_path:		The path of the csv file, e.g. 'data/P&SNode/Service/Characteristic_UUID/150521_104646.csv'
+		type arg_path:		str
+
+		param arg_header:	The header row of the csv file
+		type arg_header:	list
+		"""
+		session_id, device, service, characteristic = self._split_path(arg_path)
+		return self._file(session_id).add_stream(device, service, characteristic, arg_header)
+
+	def comment(self, arg_path, arg_comment):
+		"""
+		Adds a comment to the stream, as the comment row of the csv file would
+
+		param arg_path:		The path of the csv file, as given to open
+		type arg_path:		str
+
+		param arg_comment:	The comment
+		type arg_comment:	str
+		"""
+		session_id, device, service, characteristic = self._split_path(arg_path)
+		container_file = self.files.get(session_id)
+		if container_file is None:
+			raise customexception.InvalidStateException("No container file of the session {}".format(session_id))
+		container_file.comment(device, characteristic, arg_comment)
+
+
+class ContainerFile(object):
+	"""
+	An append-only container file. The streams are written from the event thread and the ReadRequestWriter threads, thus every record is written under a lock.
+	The file is completed with the footer as soon as all its streams have been closed.
+	"""
+	def __init__(self, arg_path, arg_index_interval):
+		"""
+		INPUT PARAMETERS
+
+		param arg_path:				The path of the container file
+		type arg_path:				str
+
+		param arg_index_interval:	Every arg_index_interval-th row of a stream gets an index entry
+		type arg_index_interval:	int
+		"""
+		self.path = arg_path
+		self.index_interval = arg_index_interval
+		self.file = open(arg_path, 'wb')
+		self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+		self.lock = threading.Lock()
+		self.streams = []
+		self.closed = False
+		self.footer_offset = None
+		"""
+		OTHER PARAMETERS
+
+		param file:		The container file
+		type file:		file object
+
+		param lock:		Serializes the records of all streams
+		type lock:		threading.Lock
+
+		param streams:	All streams of the container, the stream id is the position in the list
+		type streams:	list with ContainerStream elements
+
+		param closed:	True if the footer has been written and the file has been closed
+		type closed:	bool
+
+		param footer_offset:	The offset of the footer once the file has been closed
+		type footer_offset:		int
+		"""
+
+	"""
+	Private functions
+	"""
+	def _write_record(self, arg_type, arg_stream_id, arg_timestamp, arg_payload):
+		"""
+		Appends a record and returns its offset. Has to be called with the lock held.
+		"""
+		offset = self.file.tell()
+		self.file.write(RECORD_HEADER.pack(arg_type, arg_stream_id, arg_timestamp, len(arg_payload)))
+		self.file.write(arg_payload)
+		return offset
+
+	def _write_footer(self):
+		"""
+		Appends the stream table and the index. Has to be called with the lock held.
+		"""
+		footer = {'streams': [stream.description() for stream in self.streams], 'index': [stream.index for stream in self.streams]}
+		self.footer_offset = self._write_record(RECORD_FOOTER, 0, 0.0, json.dumps(footer).encode('utf-8'))
+		self.file.write(TRAILER.pack(self.footer_offset, TRAILER_MAGIC))
+
+	def _complete(self):
+		"""
+		Writes the footer, forces the file to the disk and closes it. Has to be called with the lock held.
+		"""
+		self._write_footer()
+		self.file.flush()
+		os.fsync(self.file.fileno())
+		self.file.close()
+		self.closed = True
+
+	def _reopen(self):
+		"""
+		Reopens the completed file for appending: the footer is cut off and written again once the file is completed. Has to be called with the lock held.
+		"""
+		self.file = open(self.path, 'r+b')
+		self.file.seek(self.footer_offset)
+		self.file.truncate()
+		self.closed = False
+
+	def _stream(self, arg_device, arg_characteristic):
+		"""
+		Returns the stream of the characteristic of the device
+		"""
+		for stream in self.streams:
+			if stream.device == arg_device and stream.characteristic == arg_characteristic:
+				return stream
+		raise customexception.InputException("No stream of characteristic {} of device {} in {}".format(arg_characteristic, arg_device, self.path))
+
+	"""
+	Public functions
+	"""
+	def add_stream(self, arg_device, arg_service, arg_characteristic, arg_header):
+		"""
+		Adds a stream and returns it. A stream of the same characteristic of the device which has been closed before is continued,
+		e.g. when the Writers of a session are created again. A completed file is reopened for it.
+		"""
+		with self.lock:
+			if self.closed is True:
+				self._reopen()
+			for stream in self.streams:
+				if stream.closed is True and stream.device == arg_device and stream.characteristic == arg_characteristic:
+					stream.closed = False
+					return stream
+			stream = ContainerStream(self, len(self.streams), arg_device, arg_service, arg_characteristic, arg_header)
+			self.streams.append(stream)
+			self._write_record(RECORD_STREAM, stream.stream_id, 0.0, json.dumps(stream.description()).encode('utf-8'))
+		return stream
+
+	def write_row(self, arg_stream, arg_row):
+		"""
+		Appends a row of a stream and adds an index entry every index_interval rows
+		"""
+		timestamp = float(arg_row[0])
+		payload = _encode_row(arg_row[1:])
+		with self.lock:
+			offset = self._write_record(RECORD_DATA, arg_stream.stream_id, timestamp, payload)
+			if arg_stream.rows % self.index_interval == 0:
+				arg_stream.index.append([timestamp, offset])
+			arg_stream.rows += 1
+
+	def comment(self, arg_device, arg_characteristic, arg_comment):
+		"""
+		Appends a comment of a stream. The measurement is commented after the files have been closed,
+		in this case the footer is replaced by the comment and written again.
+		"""
+		stream = self._stream(arg_device, arg_characteristic)
+		with self.lock:
+			if self.closed is False:
+				self._write_record(RECORD_COMMENT, stream.stream_id, 0.0, arg_comment.encode('utf-8'))
+				self.file.flush()
+				return
+			self._reopen()
+			self._write_record(RECORD_COMMENT, stream.stream_id, 0.0, arg_comment.encode('utf-8'))
+			self._complete()
+
+	def flush(self):
+		with self.lock:
+			if self.closed is False:
+				self.file.flush()
+
+	def fileno(self):
+		return self.file.fileno()
+
+	def close_stream(self, arg_stream):
+		"""
+		Closes a stream. Writes the footer and closes the file after the last stream.
+		"""
+		with self.lock:
+			arg_stream.closed = True
+			if self.closed is True or not all(stream.closed for stream in self.streams):
+				return
+			self._complete()
+
+
+class ContainerStream(object):
+	"""
+	Replacement for the csv file and the csv writer of a Writer, which writes the rows into the shared ContainerFile
+	"""
+	def __init__(self, arg_container_file, arg_stream_id, arg_device, arg_service, arg_characteristic, arg_header):
+		self.container_file = arg_container_file
+		self.stream_id = arg_stream_id
+		self.device = arg_device
+		self.service = arg_service
+		self.characteristic = arg_characteristic
+		self.header = arg_header
+		self.name = arg_container_file.path
+		self.rows = 0
+		self.index = []
+		self.closed = False
+		"""
+		OTHER PARAMETERS
+
+		param name:		The path of the container file
+		type name:		str
+
+		param rows:		The number of written rows
+		type rows:		int
+
+		param index:	The sparse index of the stream
+		type index:		list with list elements
+						Format: [[Timestamp, Offset of the DATA record], ...]
+
+		param closed:	True if the stream has been closed
+		type closed:	bool
+		"""
+
+	def description(self):
+		"""
+		Returns the entry of the stream table
+		"""
+		return {'device': self.device, 'service': self.service, 'characteristic': self.characteristic, 'header': self.header, 'rows': self.rows}
+
+	def writerow(self, arg_row):
+		self.container_file.write_row(self, arg_row)
+
+	def flush(self):
+		self.container_file.flush()
+
+	def fileno(self):
+		return self.container_file.fileno()
+
+	def close(self):
+		if self.closed is False:
+			self.container_file.close_stream(self)
+
+
+class ContainerReader(object):
+	"""
+	Reads a container file. The stream table and the index are taken from the footer, or rebuilt by a scan if the footer is missing.
+	"""
+	def __init__(self, arg_path, arg_index_interval = constants.DEFAULT_CONTAINER_INDEX_INTERVAL):
+		"""
+		INPUT PARAMETERS
+
+		param arg_path:				The path of the container file, e.g. 'data/150521_104646.blec'
+		type arg_path:				str
+
+		param arg_index_interval:	The index interval used when rebuilding the index of a container without footer
+		type arg_index_interval:	int
+		"""
+		self.path = arg_path
+		self.file = open(arg_path, 'rb')
+		magic, version = FILE_HEADER.unpack(self.file.read(FILE_HEADER.size))
+		if magic != MAGIC:
+			raise customexception.InputException("{} is not a container file".format(arg_path))
+		if version != VERSION:
+			raise customexception.InputException("Unsupported container version {} of {}".format(version, arg_path))
+
+		self.complete = self._read_footer()
+		if self.complete is False:
+			self._scan(arg_index_interval)
+		"""
+		OTHER PARAMETERS
+
+		param streams:	The stream table, the stream id is the position in the list
+		type streams:	list with dict elements
+						Format: {'device': str, 'service': str, 'characteristic': str, 'header': list, 'rows': int}
+
+		param index:	The sparse index per stream
+		type index:		list with list elements
+						Format: [[[Timestamp, Offset], ...], ...]
+
+		param complete:	False if the container has no footer, e.g. since the measurement has not been stopped properly
+		type complete:	bool
+		"""
+
+	def __str__(self):
+		return("ContainerReader of '{}' with {} streams{}".format(self.path, len(self.streams), "" if self.complete else ", without footer"))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	"""
+	Private functions
+	"""
+	def _read_footer(self):
+		"""
+		Reads the stream table and the index from the footer. Returns False if there is no footer.
+		"""
+		size = os.path.getsize(self.path)
+		if size < FILE_HEADER.size + TRAILER.size:
+			return False
+		self.file.seek(size - TRAILER.size)
+		offset, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+		if magic != TRAILER_MAGIC:
+			return False
+		self.file.seek(offset)
+		record_type, _, _, length = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+		if record_type != RECORD_FOOTER:
+			return False
+		footer = json.loads(self.file.read(length).decode('utf-8'))
+		self.streams = footer['streams']
+		self.index = footer['index']
+		return True
+
+	def _scan(self, arg_index_interval):
+		"""
+		Rebuilds the stream table and the index from the record headers. A truncated last record is ignored.
+		"""
+		self.streams = []
+		self.index = []
+		offset = FILE_HEADER.size
+		self.file.seek(offset)
+		while True:
+			header = self.file.read(RECORD_HEADER.size)
+			if len(header) < RECORD_HEADER.size:
+				break
+			record_type, stream_id, timestamp, length = RECORD_HEADER.unpack(header)
+			if record_type == RECORD_STREAM:
+				payload = self.file.read(length)
+				if len(payload) < length:
+					break
+				self.streams.append(json.loads(payload.decode('utf-8')))
+				self.index.append([])
+			else:
+				self.file.seek(length, os.SEEK_CUR)
+				if record_type == RECORD_DATA:
+					stream = self.streams[stream_id]
+					if stream['rows'] % arg_index_interval == 0:
+						self.index[stream_id].append([timestamp, offset])
+					stream['rows'] += 1
+			offset += RECORD_HEADER.size + length
+
+	def _stream_id(self, arg_device, arg_characteristic):
+		"""
+		Returns the stream id of the characteristic of the device
+		"""
+		for stream_id, stream in enumerate(self.streams):
+			if stream['device'] == arg_device and stream['characteristic'] == arg_characteristic:
+				return stream_id
+		raise customexception.InputException("No stream of characteristic {} of device {} in {}".format(arg_characteristic, arg_device, self.path))
+
+	def _records(self, arg_offset):
+		"""
+		Yields the type, stream id, timestamp and payload of all records from the offset on, up to the footer
+		"""
+		self.file.seek(arg_offset)
+		while True:
+			header = self.file.read(RECORD_HEADER.size)
+			if len(header) < RECORD_HEADER.size:
+				return
+			record_type, stream_id, timestamp, length = RECORD_HEADER.unpack(header)
+			if record_type == RECORD_FOOTER:
+				return
+			payload = self.file.read(length)
+			if len(payload) < length:
+				return
+			yield record_type, stream_id, timestamp, payload
+
+	"""
+	Public functions
+	"""
+	def close(self):
+		self.file.close()
+
+	def show_streams(self):
+		"""
+		Prints the stream table
+		"""
+		[print("{}: {} {} {}, {} rows".format(stream_id, stream['device'], stream['service'], stream['characteristic'], stream['rows']))
+		 for stream_id, stream in enumerate(self.streams)]
+
+	def read(self, arg_device, arg_characteristic, arg_start = None, arg_end = None):
+		"""
+		Streams the rows [Timestamp, Value, ...] of a stream with arg_start <= Timestamp <= arg_end, without the comments.
+		Seeks to the last index entry before arg_start, thus only the records of the index interval before arg_start are skipped.
+		The timestamps of a stream have to be increasing, as they are for all Writers.
+
+		param arg_device:			The name of the peripheral
+		type arg_device:			str
+
+		param arg_characteristic:	The UUID of the characteristic
+		type arg_characteristic:	str
+
+		param arg_start:			The first timestamp, None for the beginning of the stream
+		type arg_start:				float
+
+		param arg_end:				The last timestamp, None for the end of the stream
+		type arg_end:				float
+		"""
+		stream_id = self._stream_id(arg_device, arg_characteristic)
+		index = self.index[stream_id]
+		if not index:
+			return
+		position = 0
+		if arg_start is not None:
+			position = max(bisect.bisect_right([timestamp for timestamp, _ in index], arg_start) - 1, 0)
+
+		for record_type, record_stream_id, timestamp, payload in self._records(index[position][1]):
+			if record_stream_id != stream_id or record_type != RECORD_DATA:
+				continue
+			if arg_end is not None and timestamp > arg_end:
+				return
+			if arg_start is None or timestamp >= arg_start:
+				yield [timestamp] + _decode_row(payload)
+
+	def comments(self, arg_device, arg_characteristic):
+		"""
+		Returns the comments of a stream
+		"""
+		stream_id = self._stream_id(arg_device, arg_characteristic)
+		return [payload.decode('utf-8') for record_type, record_stream_id, _, payload in self._records(FILE_HEADER.size)
+				if record_type == RECORD_COMMENT and record_stream_id == stream_id]
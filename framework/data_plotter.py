@@ -19,6 +19,8 @@ from datetime import datetime
 import time
 
 from matplotlib.ticker import AutoMinorLocator
+from analysis import Session
+from cache import load_recording
 
 """
 Definitions
@@ -162,26 +164,20 @@ def convert_unixtime(str_datetime):
 
 """
 Returns a numpy array with timestamps as elements, which can be further processed to be plotted
+The csv file is parsed once and cached as .npy next to it, see cache.py, thus replotting e.g. a zoomed in window takes milliseconds.
 param arg_file: The csv file containing the datas
 type arg_file: The location of the csv file.
 
+param arg_header: Not needed anymore, rows which do not start with a timestamp (header and comment rows) are skipped
+type arg_header: None or 'infer'
+
 returns: numpy array with timestamp from csv file as elements
 """
 def data_to_numpy(arg_file, arg_filename, arg_header, unix_offset):
-
-	def convert_unixtime_func(value):
-		return value - offset
-
-	raw_dataframe = pandas.read_csv(arg_file, header = arg_header, usecols=[n for n in range(2)])
-	raw_dataframe_timestamp = raw_dataframe.iloc[:,0]
+	numpy_timestamp, _, _ = load_recording(arg_file)
 
 	if unix_offset == True:
-		offset = convert_unixtime(arg_filename)
-		dataframe_timestamp = raw_dataframe_timestamp.apply(convert_unixtime_func)
-	else:
-		dataframe_timestamp = raw_dataframe_timestamp
-
-	numpy_timestamp = dataframe_timestamp.to_numpy()
+		numpy_timestamp = numpy_timestamp - convert_unixtime(arg_filename)
 
 	return numpy_timestamp
 
@@ -615,6 +611,37 @@ def plot_eight_device(filename):
 
 
 
+"""
+For any measurement: plots the packet arrivals of all streams of a session, independent of the number of devices and the Writer.
+Loaded and analysed with analysis.Session, see analysis.py for the statistics.
+"""
+def plot_session(filename, arg_left = None, arg_right = None):
+	session = Session(filename)
+	session.summary()
+
+	fig, ax = plot.subplots()
+	plot.title("{}".format(filename))
+
+	labels = ['Overlap']
+	for position, stream in enumerate(session.streams):
+		line, = ax.plot(stream.timestamps, np.zeros_like(stream.timestamps) + position + 1, '.', label="Device: {}, {}".format(stream.device, stream.characteristic))
+		ax.plot(stream.timestamps, np.zeros_like(stream.timestamps), '.', color=line.get_color())
+		labels.append(str(position + 1))
+
+	plot.yticks(range(len(labels)), labels)
+
+	minor_locator = AutoMinorLocator(5)
+	ax.xaxis.set_minor_locator(minor_locator)
+	plot.grid(axis='x', which='major', linestyle='-')
+	plot.grid(axis='x', which='minor', linestyle='-', alpha=0.5)
+
+	plot.xlabel("Time in seconds")
+	plot.xlim(left=arg_left, right=arg_right)
+
+	plot.legend()
+	plot.show()
+
+
 def restore_raw_data():
 	arg_file = "070521_145200"
 	csv_file = os.path.join('data', COUNTERDEVICE1, COUNTERSERVICE, COUNTERCHAR1, "{}.csv".format(arg_file))
@@ -643,6 +670,7 @@ def main():
 	# plot_perfwriter(five37_100)  
 	# plot_eight_device('030621_102316')
 	# restore_raw_data()
+	# plot_session(four37_200_30, 11, 11.06)
 
 if __name__ == "__main__":
 	main()
@@ -10,7 +10,9 @@ brief:				This file contains classes which are responsible for setting up data c
 Import statement
 """
 import timer
+import timestamping
 import customexception
+import constants
 
 from pathlib import Path
 from datetime import datetime
@@ -40,9 +42,12 @@ class Collector(object):
 		self.target_characteristics = set()
 		self.writer_list = []
 		self.writer_type = 'PerfWriter'
+		self.storage = None
+		self.aggregation_specs = {}
 
 		self.timestamp = 'n/a'
 		self.offset = 0
+		self.characteristic_index = None
 		"""
 		OTHER PARAMETERS
 
@@ -63,11 +68,22 @@ class Collector(object):
 		param writer_type:				The prefered type of the GenericWriter class. Per default: 'PerfWriter'
 		type writer_type:				str
 
+		param storage:					Stores the csv files of the Writers in rolling, compressed segments or in a single file per session. Per default None, a single csv file per characteristic.
+		type storage:					storage.SegmentedStorage, container.SessionContainer or codec.CodecStorage
+
+		param aggregation_specs:		The aggregation of the characteristics stored by the AggregationWriter.
+		type aggregation_specs:			dict
+										Format: {Characteristic UUID: aggregation.AggregationSpec}
+
 		param timestamp:				The timestamp when the measurement/subscription has begun.
 		type timestamp:					str
 
 		param offset:					The offset for PerfWriter. time.perf_counter() is relative to the time when the script runs.
 		type offset:					float
+
+		param characteristic_index:		All characteristics of the database, built on first use by get_characteristic.
+		type characteristic_index:		dict
+										Format: {Characteristic UUID: Characteristic}
 		"""
 
 	def __str__(self):
@@ -177,18 +193,44 @@ class Collector(object):
 		"""
 		Sets the writer.GenericWriter class for this Collector object
 		param arg_value:	The type of the Writer.
-		type arg_value:		Currently: 'Writer', 'PerfWriter', 'PrinterWriter', 'CounterWriter', 'DummyWriter', 'ReadRequestWriter' are being supported.
+		type arg_value:		Currently: 'Writer', 'PerfWriter', 'AggregationWriter', 'PrinterWriter', 'CounterWriter', 'DummyWriter', 'ReadRequestWriter' are being supported.
 		"""
 		self.writer_type = arg_value
 
 
+	def set_storage(self, arg_storage):
+		"""
+		Sets the storage of the csv files of this Collector object
+		param arg_storage:	The storage, None for a single csv file per characteristic
+		type arg_storage:	storage.SegmentedStorage, container.SessionContainer or codec.CodecStorage
+		"""
+		self.storage = arg_storage
+
+
+	def set_aggregation(self, arg_characteristic_uuid, arg_spec):
+		"""
+		Sets the aggregation of a characteristic for the AggregationWriter
+		param arg_characteristic_uuid:	The UUID of the characteristic
+		type arg_characteristic_uuid:	str
+		param arg_spec:					The aggregation, None to store every packet
+		type arg_spec:					aggregation.AggregationSpec
+		"""
+		if arg_spec is None:
+			self.aggregation_specs.pop(arg_characteristic_uuid, None)
+		else:
+			self.aggregation_specs[arg_characteristic_uuid] = arg_spec
+
+
 	def set_directories(self):
 		"""
 		Sets up all relevant directories for measuring data.
 		Directory: /data/'Peripheral'/'Services'/'Characteristic_UUID'
+		A storage which keeps all recordings in one file, see container.SessionContainer, needs none.
 		"""
 		if self.writer_type == "PrinterWriter" or self.writer_type == "CounterWriter":
 			return
+		elif self.storage is not None and self.storage.per_stream_directories is False:
+			return
 		else:
 			for service in self.target_dict:
 				for characteristic_uuid in self.target_dict[service].keys():
@@ -203,12 +245,22 @@ class Collector(object):
 		if self.writer_type == 'Writer':
 			for service in self.target_dict:
 				for characteristic_uuid in self.target_dict[service].keys():
-					self.writer_list.append(Writer(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp))
+					self.writer_list.append(Writer(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp, self.storage))
 
 		elif self.writer_type == 'PerfWriter':
 			for service in self.target_dict:
 				for characteristic_uuid in self.target_dict[service].keys():
-					self.writer_list.append(PerfWriter(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp, self.offset))
+					self.writer_list.append(PerfWriter(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp, self.offset, self.storage))
+
+		elif self.writer_type == 'AggregationWriter':
+			for service in self.target_dict:
+				for characteristic_uuid in self.target_dict[service].keys():
+					spec = self.aggregation_specs.get(str(characteristic_uuid))
+					if spec is not None:
+						self.writer_list.append(AggregationWriter(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp, self.offset, spec, self.storage))
+					else:
+						print("Device: {}: No aggregation set for characteristic {}, storing every packet".format(self.name, characteristic_uuid))
+						self.writer_list.append(PerfWriter(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp, self.offset, self.storage))
 		
 		elif self.writer_type == 'PrinterWriter':
 			for service in self.target_dict:
@@ -228,7 +280,7 @@ class Collector(object):
 		elif self.writer_type == 'ReadRequestWriter':
 			for service in self.target_dict:
 				for characteristic_uuid in self.target_dict[service].keys():
-					self.writer_list.append(ReadRequestWriter(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp))
+					self.writer_list.append(ReadRequestWriter(self.name, str(service), str(characteristic_uuid), self.target_dict[service][characteristic_uuid], self.timestamp, self.storage))
 
 		else:
 			raise customexception.InputException("'{}' is not a valid Writer class.".format(self.writer_type))
@@ -252,12 +304,51 @@ class Collector(object):
 		if status_found_characteristic is False:
 			print("'{}' could not be found on device '{}'".format(characteristic, self.name))
 
+	def get_characteristic(self, arg_characteristic_uuid):
+		"""
+		Returns the characteristic of the database with this UUID, or None. Unlike the writer_list, this also contains characteristics which are neither readable nor subscribable.
+
+		param arg_characteristic_uuid:	The UUID of the characteristic
+		type arg_characteristic_uuid:	str
+		"""
+		if self.characteristic_index is None:
+			self.characteristic_index = {str(characteristic.value_attribute.uuid): characteristic for service in self.database.services for characteristic in service.characteristics}
+		return self.characteristic_index.get(arg_characteristic_uuid)
+
+	def write_characteristic_async(self, characteristic, value):
+		"""
+		Writes a value to a characteristic without waiting for its completion. Uses a write command if the characteristic supports it, otherwise a write request.
+		Returns the waitable of the write, or None if the characteristic could not be found or is not writable.
+
+		param characteristic:	The UUID of the characteristic
+		type characteristic:	str
+		param value:			The value to be written
+		type value:				str or int
+		"""
+		target = self.get_characteristic(characteristic)
+		if target is None:
+			print("'{}' could not be found on device '{}'".format(characteristic, self.name))
+			return None
+		if target.writable_without_response is True:
+			return target.write_without_response(value)
+		if target.writable is True:
+			return target.write(value)
+		print("Characteristic '{}' in device '{}' is not writable".format(characteristic, self.name))
+		return None
+
 	def subscribe_all_characteristic(self):
 		"""
 		Subscribes to all characteristic within the writer_list
 		"""
 		[writer.subscribe_to_characteristic() for writer in self.writer_list]
 
+	def subscribe_all_characteristic_async(self):
+		"""
+		Subscribes to all characteristic within the writer_list without waiting in between. The CCCD writes are queued back-to-back on the connection.
+		Returns a list with format [(Writer, Waitable)], where the waitable is None if there is nothing to wait for.
+		"""
+		return [(writer, writer.subscribe_to_characteristic_async()) for writer in self.writer_list]
+
 	def unsubscribe_all_characteristic(self):
 		"""
 		Unsubscribes to all Characteristics within the writer_list
@@ -279,22 +370,41 @@ class CollectorManager(object):
 	"""
 	Class for handling the data collection of all peripheral devices
 	"""
-	def __init__(self, arg_connection_list):
+	def __init__(self, arg_connection_list, arg_targets = None):
 		"""
 		INPUT PARAMETERS 
 
 		param collectors:	A list of all Collector classes, where each entry corresponds to a connection.
 		type collectors: 	List with format ["Collector: collector"]
+
+		param arg_targets:	The target characteristics per peripheral, keyed by its alias or its advertised name. Only these characteristics are discovered
+							and set as target characteristics, see set_target_characteristic_on_device. Peripherals without an entry are discovered completely.
+		type arg_targets:	dict
+							Format: {'Name': ['Characteristic UUID']}
 		"""
 		self.connections = arg_connection_list
+		self.targets = arg_targets if arg_targets is not None else {}
 
 		self.collectors = {}	
+		self.session_id = None
+		self.catalog = None
 		"""
 		OTHER PARAMETERS
 
+		param targets:		The target characteristics per peripheral which are discovered
+		type targets:		dict
+							Format: {'Name': ['Characteristic UUID']}
+
 		param collectors: 	A dictionary with all Collector objects corresponding to all connected peripherals
 		type collectors:	dict
 							Format: {'Name': Collector}
+
+		param session_id:	The id of the measurement session, the timestamp used in the file names of all Writers
+		type session_id:	str
+							Format: e.g. '030821_081500' corresponds to 03. August 2021 at 08:15:00
+
+		param catalog:		The catalog the measurement session is recorded in. None if no catalog is used.
+		type catalog:		catalog.SessionCatalog
 		"""
 		# Starting off with discovering all services and
 		self._discover_all_services()
@@ -307,7 +417,11 @@ class CollectorManager(object):
 		"""
 		Discovers services from all connections. And sets up the Collector classes.
 		"""
-		[connection.discover_services() for connection in self.connections]
+		for connection in self.connections:
+			targets = self.targets.get(connection.name, self.targets.get(connection.peer.name))
+			connection.discover_services(targets)
+			if targets:
+				connection.collector.set_target_characteristics(targets)
 		self._set_collectors()
 
 
@@ -346,15 +460,36 @@ class CollectorManager(object):
 			self.collectors[name].show_target_dict()
 		print("#########################################################")
 
+	def _resolve_names(self, name):
+		"""
+		Returns the names of the Collectors of a peripheral: either its alias, or its advertised name which selects all peripherals advertising it.
+		"""
+		names = [name] if name in self.collectors else [connection.name for connection in self.connections if connection.peer.name == name]
+		if len(names) == 0:
+			print("Could not find Collector instance of peripheral '{}'".format(name))
+		return names
+
 	def _comment_data(self):
 		"""
-		In case user wants to comment the data.
+		In case user wants to comment the data. Returns the comment.
 		"""
 		input_val = input("Comment: ")
 		if input_val == '':
-			return
+			return input_val
 		else:
 			[self.collectors[name].collector_comment(input_val) for name in self.collectors]
+			return input_val
+
+	def _catalog_add_streams(self, name):
+		"""
+		Adds the streams of all Writers of a peripheral to the catalog
+		"""
+		if self.catalog is None:
+			return
+		connection = next((connection for connection in self.connections if connection.name == name), None)
+		address = str(connection.peer.peer_address) if connection is not None else None
+		connection_params = connection.peer.active_connection_params if connection is not None else None
+		[self.catalog.add_stream(self.session_id, writer, address, connection_params) for writer in self.collectors[name].writer_list]
 	
 	"""
 	Public functions
@@ -363,15 +498,12 @@ class CollectorManager(object):
 		"""
 		Function which allows to select specific characteristic from a peripheral device.
 
-		param name: 					Name of the peripheral
+		param name: 					Name of the peripheral. Either its alias, or its advertised name which selects all peripherals advertising it.
 		type name: 						str
 		param arg_characteristic_list: 	A list with all specified characteristics
 		type arg_characteristic_list: 	list with str elements		
 		"""
-		try:
-			self.collectors[name].set_target_characteristics(arg_characteristic_list)
-		except KeyError:
-			print("Could not find Collector instance of peripheral '{}'".format(name))
+		[self.collectors[collector_name].set_target_characteristics(arg_characteristic_list) for collector_name in self._resolve_names(name)]
 
 
 	def show_base_dict_all(self):
@@ -400,11 +532,38 @@ class CollectorManager(object):
 	def set_all_writer_types(self, arg_type):
 		"""
 		Sets the type of the GenericWriter class. See writer.py
-		Currently supports: 'Writer', 'PerfWriter', 'PrinterWriter', 'CounterWriter', 'DummyWriter', 'ReadRequestWriter'
+		Currently supports: 'Writer', 'PerfWriter', 'AggregationWriter', 'PrinterWriter', 'CounterWriter', 'DummyWriter', 'ReadRequestWriter'
 		"""
 		[self.collectors[name].set_writer_type(arg_type) for name in self.collectors]
 
 
+	def set_aggregation(self, name, characteristic_uuid, spec):
+		"""
+		Aggregates a characteristic of a peripheral on the gateway, only the statistics of every window are stored. Needs the 'AggregationWriter' type.
+		Has to be set before set_writers_for_all_devices.
+
+		param name:					Name of the peripheral. Either its alias, or its advertised name which selects all peripherals advertising it.
+		type name:					str
+		param characteristic_uuid:	The UUID of the characteristic
+		type characteristic_uuid:	str
+		param spec:					The aggregation, None to store every packet
+		type spec:					aggregation.AggregationSpec
+		"""
+		[self.collectors[collector_name].set_aggregation(characteristic_uuid, spec) for collector_name in self._resolve_names(name)]
+
+
+	def set_all_storage(self, arg_storage):
+		"""
+		Sets the storage of the csv files for all devices. Has to be set before set_writers_for_all_devices.
+
+		param arg_storage:	Stores the csv files in rolling, compressed segments, see storage.SegmentedStorage, or all in a single file per session, see container.SessionContainer,
+							or delta/XOR encoded in a binary file per characteristic, see codec.CodecStorage.
+							None for a single csv file per characteristic.
+		type arg_storage:	storage.SegmentedStorage, container.SessionContainer or codec.CodecStorage
+		"""
+		[self.collectors[name].set_storage(arg_storage) for name in self.collectors]
+
+
 	def set_writers_for_all_devices(self):
 		"""
 		Sets all directories and Writer classes within each Collector for all devices
@@ -423,8 +582,9 @@ class CollectorManager(object):
 		# Setting up all measurement directories. 
 		self._set_all_directories()
 
-		# Set the timestamp for all devices
-		[self.collectors[name].set_timestamp(datetime.now().strftime("%d%m%y_%H%M%S")) for name in self.collectors]
+		# Set the timestamp for all devices, which is the id of the measurement session
+		self.session_id = datetime.now().strftime("%d%m%y_%H%M%S")
+		[self.collectors[name].set_timestamp(self.session_id) for name in self.collectors]
 
 		# Sets the offset in case we are using the PerfWriter
 		temp_offset = time.perf_counter()
@@ -433,6 +593,11 @@ class CollectorManager(object):
 		# Initiates Writer classes
 		[self.collectors[name].set_writer_on_all_characteristics() for name in self.collectors]
 
+		# Records the measurement session in the catalog
+		if self.catalog is not None:
+			self.catalog.start_session(self.session_id, time.time())
+			[self._catalog_add_streams(name) for name in self.collectors]
+
 	def write_characteristic(self, name, characteristic, value):
 		"""
 		Additional modification for Jean Megret's bachelor project.
@@ -450,6 +615,114 @@ class CollectorManager(object):
 		except KeyError:
 			print("Could not find Collector instance of peripheral '{}'".format(name))
 
+	def admit_connection(self, arg_connection, arg_timeout_s = constants.DEFAULT_SUBSCRIBE_TIMEOUT_S):
+		"""
+		Adds a peripheral to the running measurement: discovers its services, creates its Writers and subscribes to its characteristics.
+		The target characteristics, the Writer type and the PerfWriter offset are taken over from a Collector of a peripheral with the same advertised name,
+		otherwise from any Collector. The streams of the other peripherals are not touched.
+
+		param arg_connection:	The connection of the new peripheral
+		type arg_connection:	connection.Connection
+		param arg_timeout_s:	The time in seconds to wait for the subscriptions to be confirmed
+		type arg_timeout_s:		float
+		"""
+		templates = [self.collectors[connection.name] for connection in self.connections if connection.name in self.collectors and connection.peer.name == arg_connection.peer.name]
+		templates += [self.collectors[name] for name in self.collectors]
+
+		# Only the characteristics the template subscribes to are discovered, with their services known from its target dict
+		targets = {service_uuid: list(templates[0].target_dict[service_uuid]) for service_uuid in templates[0].target_dict} if len(templates) > 0 and len(templates[0].target_characteristics) > 0 else None
+		arg_connection.discover_services(targets)
+		collector = arg_connection.collector
+		if len(templates) > 0:
+			collector.set_target_characteristics(templates[0].target_characteristics)
+			collector.set_writer_type(templates[0].writer_type)
+			collector.set_storage(templates[0].storage)
+			[collector.set_aggregation(characteristic_uuid, spec) for characteristic_uuid, spec in templates[0].aggregation_specs.items()]
+			collector.set_offset(templates[0].offset)
+		collector.get_subscribable_characteristics()
+		collector._apply_target_dict()
+		collector.set_directories()
+		collector.set_timestamp(self.session_id if self.session_id is not None else datetime.now().strftime("%d%m%y_%H%M%S"))
+		collector.set_writer_on_all_characteristics()
+
+		if arg_connection not in self.connections:
+			self.connections.append(arg_connection)
+		self.collectors[arg_connection.name] = collector
+		self._catalog_add_streams(arg_connection.name)
+
+		deadline = time.perf_counter() + arg_timeout_s
+		for writer, waitable in collector.subscribe_all_characteristic_async():
+			if waitable is not None:
+				writer.wait_for_subscription(waitable, max(deadline - time.perf_counter(), 0))
+		print("Admitted '{}' with {} characteristics into the measurement".format(arg_connection.name, len([writer for writer in collector.writer_list if writer.subscribed_time is not None])))
+
+	def set_catalog(self, arg_catalog):
+		"""
+		Records the measurement session in a catalog. Has to be set before set_writers_for_all_devices.
+
+		param arg_catalog:	The catalog
+		type arg_catalog:	catalog.SessionCatalog
+		"""
+		self.catalog = arg_catalog
+
+	def record_session_end(self, arg_comment = None, arg_ended = None):
+		"""
+		Stores the packet and byte counts of all Writers, the end and the comment of the measurement session in the catalog.
+		Called by unsubscribe_all_devices and shutdown.ShutdownCoordinator.
+
+		param arg_comment:	The comment of the measurement
+		type arg_comment:	str
+		param arg_ended:	The Unix timestamp when the measurement has been stopped. Per default now.
+		type arg_ended:		float
+		"""
+		if self.catalog is None or self.session_id is None:
+			return
+		ended = arg_ended if arg_ended is not None else time.time()
+		[self.catalog.end_stream(self.session_id, writer, ended) for name in self.collectors for writer in self.collectors[name].writer_list]
+		self.catalog.end_session(self.session_id, ended, arg_comment)
+
+	def write_characteristic_all(self, characteristic, value, arg_names = None, arg_timeout_s = constants.DEFAULT_WRITE_TIMEOUT_S):
+		"""
+		Writes a value to a characteristic of many devices at once, e.g. the start command of all sensor nodes.
+		The characteristic is looked up once per device and all writes are issued back-to-back before waiting for them together,
+		such that all devices receive the value within about one connection interval. Reports the completion latency of every device,
+		which is precise only with timestamping.install(), since the writes are waited for one after the other.
+
+		param characteristic:	The UUID of the characteristic
+		type characteristic:	str
+		param value:			Value which is going to be written
+		type value:				str or int
+		param arg_names:		Names of the peripherals, either their aliases or their advertised names. Per default all devices.
+		type arg_names:			list with str elements
+		param arg_timeout_s:	The time in seconds to wait for all writes to complete
+		type arg_timeout_s:		float
+		"""
+		names = list(self.collectors) if arg_names is None else [collector_name for name in arg_names for collector_name in self._resolve_names(name)]
+		completion = {}
+
+		def on_write_complete(arg_name):
+			def callback(characteristic, event_args):
+				completion[arg_name] = (timestamping.capture_time(event_args), event_args.status)
+			return callback
+
+		start_time = time.perf_counter()
+		pending = [(name, self.collectors[name].write_characteristic_async(characteristic, value)) for name in names]
+		pending = [(name, waitable.then(on_write_complete(name))) for name, waitable in pending if waitable is not None]
+
+		deadline = start_time + arg_timeout_s
+		for name, waitable in pending:
+			written_characteristic, event_args = waitable.wait(max(deadline - time.perf_counter(), 0), exception_on_timeout = False)
+			# The write may have completed before the callback has been registered
+			if event_args is not None and name not in completion:
+				completion[name] = (timestamping.capture_time(event_args), event_args.status)
+
+		print("Wrote '{}' to characteristic '{}' on {} of {} devices".format(value, characteristic, len(completion), len(names)))
+		[print("Device: {}: completed after {:.1f}ms, {}".format(name, (completion[name][0] - start_time) * 1000, completion[name][1])) for name, waitable in pending if name in completion]
+		[print("Device: {}: not completed within {}s".format(name, arg_timeout_s)) for name, waitable in pending if name not in completion]
+		if len(completion) > 1:
+			latencies = [completed_time for completed_time, status in completion.values()]
+			print("Spread between first and last completion: {:.1f}ms".format((max(latencies) - min(latencies)) * 1000))
+
 	def subscribe_all_devices(self):
 		"""
 		Subscribes to all devices
@@ -462,14 +735,47 @@ class CollectorManager(object):
 
 		[self.collectors[name].subscribe_all_characteristic() for name in self.collectors]
 
+	def subscribe_all_devices_pipelined(self, arg_timeout_s = constants.DEFAULT_SUBSCRIBE_TIMEOUT_S):
+		"""
+		Subscribes to all devices. Unlike subscribe_all_devices, which waits for every subscription before starting the next one,
+		all CCCD writes are issued at once: back-to-back per connection and in parallel across the connections. Afterwards it waits for all of them together
+		and reports the spread between the first and the last confirmed subscription.
+
+		param arg_timeout_s:	The time in seconds to wait for all subscriptions to be confirmed
+		type arg_timeout_s:		float
+		"""
+		# Asks for user input to confirm to start measurement.
+		input_val = input("Start measurement? (y/n)")
+		if input_val == 'n':
+			raise customexception.UserException("Stopped by User")
+
+		start_time = time.perf_counter()
+		pending = [pair for name in self.collectors for pair in self.collectors[name].subscribe_all_characteristic_async()]
+		deadline = start_time + arg_timeout_s
+
+		failed = []
+		for writer, waitable in pending:
+			if waitable is None:
+				continue
+			if not writer.wait_for_subscription(waitable, max(deadline - time.perf_counter(), 0)):
+				failed.append(writer)
+
+		subscribed_times = [writer.subscribed_time for writer, waitable in pending if writer.subscribed_time is not None]
+		if len(subscribed_times) > 0:
+			print("Subscribed to {} characteristics on {} devices within {:.3f}s, spread between first and last subscription: {:.3f}s".format(
+				len(subscribed_times), len(self.collectors), max(subscribed_times) - start_time, max(subscribed_times) - min(subscribed_times)))
+		[print("Device: {}: Subscription to characteristic {} has not been confirmed within {}s".format(writer.name, writer.characteristic_uuid, arg_timeout_s)) for writer in failed]
+
 	def unsubscribe_all_devices(self):
 		"""
-		Unsubscribes to all devices
+		Unsubscribes to all devices and closes the csv files
 		"""
 		[self.collectors[name].unsubscribe_all_characteristic() for name in self.collectors]
+		[writer.close_file() for name in self.collectors for writer in self.collectors[name].writer_list]
+		ended = time.time()
 		
 		# Comment the measurement
-		self._comment_data()
+		self.record_session_end(self._comment_data(), ended)
 	
 
 
@@ -0,0 +1,215 @@
+"""
+file name:			discovery.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for discovering only the target characteristics of a peripheral.
+					blatann.peer.Peer.discover_services walks every service, characteristic and descriptor of the database and reads the UUID
+					of every service and characteristic with an unknown 128-bit base. With many services most of these round trips are wasted.
+					blatann takes no filter for its discovery, so the discovery is driven here with the GATT client requests of the nrf driver.
+"""
+
+"""
+Import statement
+"""
+import customexception
+import queue
+
+from blatann.nrf import nrf_events
+from blatann.nrf.nrf_types import BLEGattService, BLEUUID
+from blatann.uuid import Uuid16, Uuid128
+
+
+class TargetedDiscovery(object):
+	"""
+	Discovers the services, characteristics and descriptors of the target characteristics of a single peripheral.
+	The steps are:
+		1. The 128-bit bases of the target UUIDs are registered, so that the SoftDevice resolves them without reading them
+		2. With known service UUIDs only these primary services are discovered, otherwise all primary services
+		3. The characteristics of the discovered services are discovered
+		4. The UUID of a service is read only if it holds a target characteristic and its base is unknown
+		5. The descriptors are discovered only for the target characteristics
+	The discovered services only hold the target characteristics and are added to the database of the peer.
+	"""
+	def __init__(self, arg_peer, arg_ble_device, arg_targets, arg_timeout_s = 10):
+		"""
+		INPUT PARAMETERS
+
+		param arg_peer: 		The connection/peer corresponding the peripheral
+		type arg_peer:			blatann.peer.Peer
+
+		param arg_ble_device: 	The nRF device which holds this connection
+		type arg_ble_device:	blatann.BleDevice
+
+		param arg_targets:		The UUIDs of the target characteristics, or the same keyed by the UUID of their services (format of datacollection.Collector.target_dict).
+		type arg_targets:		list with str elements or dict
+								Format: ['Characteristic UUID'] or {'Service UUID': ['Characteristic UUID']}
+
+		param arg_timeout_s:	The time in seconds to wait for each response of the peripheral
+		type arg_timeout_s:		float
+		"""
+		self.peer = arg_peer
+		self.ble_device = arg_ble_device
+		self.timeout_s = arg_timeout_s
+
+		if isinstance(arg_targets, dict):
+			self.service_uuids = [str(service_uuid).lower() for service_uuid in arg_targets]
+			self.characteristic_uuids = {str(characteristic_uuid).lower() for service_uuid in arg_targets for characteristic_uuid in arg_targets[service_uuid]}
+		else:
+			self.service_uuids = None
+			self.characteristic_uuids = {str(characteristic_uuid).lower() for characteristic_uuid in arg_targets}
+
+		self.round_trips = 0
+		self._responses = queue.Queue()
+		"""
+		OTHER PARAMETERS
+
+		param service_uuids:		The UUIDs of the services which are discovered. None if all primary services are discovered.
+		type service_uuids:			list with str elements
+
+		param characteristic_uuids:	The UUIDs of the target characteristics
+		type characteristic_uuids:	set with str elements
+
+		param round_trips:			The number of requests sent to the peripheral
+		type round_trips:			int
+
+		param _responses:			The discovery responses of the peripheral, put by the event thread
+		type _responses:			queue.Queue
+		"""
+
+	"""
+	Private functions
+	"""
+	def _on_response(self, driver, event):
+		"""
+		Runs within the event thread.
+		"""
+		self._responses.put(event)
+
+	def _request(self, arg_function, *args):
+		"""
+		Sends a request of the nrf driver and returns the response of the peripheral.
+		exception: If the peripheral does not respond within the timeout, raises InvalidStateException
+		"""
+		arg_function(self.peer.conn_handle, *args)
+		self.round_trips += 1
+		try:
+			return self._responses.get(timeout = self.timeout_s)
+		except queue.Empty:
+			raise customexception.InvalidStateException("Discovery of '{}' timed out".format(self.peer.name))
+
+	def _check_status(self, arg_event):
+		"""
+		Returns True if the response holds attributes, False if there are no more attributes in the requested range.
+		exception: On any other status, raises InvalidStateException
+		"""
+		if arg_event.status == nrf_events.BLEGattStatusCode.success:
+			return True
+		if arg_event.status == nrf_events.BLEGattStatusCode.attribute_not_found:
+			return False
+		raise customexception.InvalidStateException("Discovery of '{}' failed: {}".format(self.peer.name, arg_event.status))
+
+	def _register(self, arg_uuid):
+		"""
+		Registers the base of a UUID in the SoftDevice and returns the UUID.
+		"""
+		uuid = Uuid128(arg_uuid) if len(arg_uuid) > 8 else Uuid16(arg_uuid)
+		self.ble_device.uuid_manager.register_uuid(uuid)
+		return uuid
+
+	def _uuid_str(self, arg_nrf_uuid):
+		"""
+		Returns the UUID as string, None if its base is unknown to the SoftDevice.
+		"""
+		if arg_nrf_uuid.base.type == 0:
+			return None
+		return str(self.ble_device.uuid_manager.nrf_uuid_to_uuid(arg_nrf_uuid))
+
+	def _discover_primary_services(self, arg_nrf_uuid = None):
+		"""
+		Returns all primary services, or only those with the given UUID.
+		"""
+		services = []
+		start_handle = 0x0001
+		while True:
+			event = self._request(self.ble_device.ble_driver.ble_gattc_prim_srvc_disc, arg_nrf_uuid, start_handle)
+			if not self._check_status(event):
+				return services
+			services.extend(event.services)
+			if services[-1].end_handle == 0xFFFF:
+				return services
+			start_handle = services[-1].end_handle + 1
+
+	def _discover_characteristics(self, arg_service):
+		"""
+		Adds all characteristics of a service to it.
+		"""
+		start_handle = arg_service.start_handle
+		while True:
+			event = self._request(self.ble_device.ble_driver.ble_gattc_char_disc, start_handle, arg_service.end_handle)
+			if not self._check_status(event):
+				return
+			[arg_service.char_add(characteristic) for characteristic in event.characteristics]
+			if event.characteristics[-1].handle_value >= arg_service.end_handle:
+				return
+			start_handle = event.characteristics[-1].handle_value + 1
+
+	def _discover_service_uuid(self, arg_service):
+		"""
+		Reads the 128-bit UUID of a service whose base is unknown and registers it.
+		"""
+		event = self._request(self.ble_device.ble_driver.ble_gattc_read, arg_service.start_handle)
+		if self._check_status(event) and len(event.data) == 16:
+			arg_service.uuid = BLEUUID.from_array(event.data)
+			self.ble_device.uuid_manager.register_uuid(arg_service.uuid)
+
+	def _discover_descriptors(self, arg_characteristic):
+		"""
+		Adds all descriptors of a characteristic to it, e.g. its CCCD.
+		"""
+		start_handle = arg_characteristic.handle_value + 1
+		while start_handle <= arg_characteristic.end_handle:
+			event = self._request(self.ble_device.ble_driver.ble_gattc_desc_disc, start_handle, arg_characteristic.end_handle)
+			if not self._check_status(event):
+				return
+			arg_characteristic.descs.extend(descriptor for descriptor in event.descriptions if descriptor.uuid.base.type != 0)
+			start_handle = event.descriptions[-1].handle + 1
+
+	"""
+	Public functions
+	"""
+	def discover(self):
+		"""
+		Discovers the target characteristics and adds their services to the database of the peer. Returns the number of target characteristics found.
+		"""
+		response_types = (nrf_events.GattcEvtPrimaryServiceDiscoveryResponse, nrf_events.GattcEvtCharacteristicDiscoveryResponse,
+						  nrf_events.GattcEvtDescriptorDiscoveryResponse, nrf_events.GattcEvtReadResponse)
+		self.peer.driver_event_subscribe(self._on_response, *response_types)
+		try:
+			[self._register(characteristic_uuid) for characteristic_uuid in self.characteristic_uuids]
+			if self.service_uuids is None:
+				services = self._discover_primary_services()
+			else:
+				services = [service for service_uuid in self.service_uuids for service in self._discover_primary_services(self._register(service_uuid).nrf_uuid)]
+
+			target_services = []
+			for service in services:
+				self._discover_characteristics(service)
+				characteristics = [characteristic for characteristic in service.chars if self._uuid_str(characteristic.uuid) in self.characteristic_uuids]
+				if len(characteristics) == 0:
+					continue
+				if service.uuid.base.type == 0:
+					self._discover_service_uuid(service)
+					if service.uuid.base.type == 0:
+						continue
+
+				# Only the target characteristics are kept, their end handles are already set by char_add
+				target_service = BLEGattService(service.uuid, service.start_handle, service.end_handle)
+				target_service.chars = characteristics
+				[self._discover_descriptors(characteristic) for characteristic in characteristics]
+				target_services.append(target_service)
+		finally:
+			self.peer.driver_event_unsubscribe(self._on_response, *response_types)
+
+		self.peer.database.add_discovered_services(target_services)
+		return sum(len(service.chars) for service in target_services)
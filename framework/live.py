@@ -0,0 +1,238 @@
+"""
+file name:			live.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for showing the data during a measurement.
+					Every Writer hands its packets over to an in-memory ring, see ringstore.py, a plot refreshed at a fixed rate shows the arrival rate
+					per device and selected decoded channels. Every frame is downsampled to a fixed number of points, thus the drawing cost
+					does not grow with the data rate.
+"""
+
+"""
+Import statement
+"""
+import constants
+import customexception
+import payloadformat
+import time
+import numpy as np
+
+from ringstore import RingStore
+
+
+def downsample_minmax(arg_x, arg_y, arg_points):
+	"""
+	Returns at most arg_points points of the curve: the minimum and the maximum of arg_points / 2 equally sized buckets.
+	Unlike decimation, peaks are never dropped.
+
+	param arg_x:		The x values, sorted
+	type arg_x:			np.ndarray
+
+	param arg_y:		The y values
+	type arg_y:			np.ndarray
+
+	param arg_points:	The point budget
+	type arg_points:	int
+	"""
+	if arg_y.size <= arg_points:
+		return arg_x, arg_y
+	buckets = arg_points // 2
+	starts = np.linspace(0, arg_y.size, buckets + 1).astype(np.int64)
+	ends = starts[1:] - 1
+	starts = starts[:-1]
+	x = np.empty(2 * buckets)
+	y = np.empty(2 * buckets, dtype = np.result_type(arg_y.dtype, np.float64))
+	x[0::2] = arg_x[starts]
+	x[1::2] = arg_x[ends]
+	y[0::2] = np.minimum.reduceat(arg_y, starts)
+	y[1::2] = np.maximum.reduceat(arg_y, starts)
+	return x, y
+
+
+class LiveChannel(object):
+	"""
+	A decoded channel shown by the LiveView, e.g. one axis of the accelerometer of the P&SNode
+	"""
+	def __init__(self, arg_device, arg_characteristic_uuid, arg_format, arg_field, arg_label = None):
+		"""
+		INPUT PARAMETERS
+
+		param arg_device:				The name of the peripheral
+		type arg_device:				str
+
+		param arg_characteristic_uuid:	The UUID of the characteristic
+		type arg_characteristic_uuid:	str
+
+		param arg_format:				The struct format of the payload, with byte order, e.g. '<10h'
+		type arg_format:				str
+
+		param arg_field:				The position of the channel within the fields of the payload, pad bytes are no fields
+		type arg_field:					int
+
+		param arg_label:				The label of the channel, per default 'Device field'
+		type arg_label:					str
+		"""
+		self.device = arg_device
+		self.characteristic_uuid = arg_characteristic_uuid
+		self.field = arg_field
+		self.label = arg_label if arg_label is not None else "{} {}".format(arg_device, arg_field)
+
+		fields, _ = payloadformat.parse_format(arg_format)
+		if not 0 <= arg_field < len(fields):
+			raise customexception.InputException("The format '{}' has no numeric field {}".format(arg_format, arg_field))
+		self.offset, self.dtype = fields[arg_field]
+		"""
+		OTHER PARAMETERS
+
+		param offset:	The offset of the field within the payload in bytes
+		type offset:	int
+
+		param dtype:	The NumPy type of the field
+		type dtype:		np.dtype
+		"""
+
+	def decode(self, arg_payloads, arg_sizes):
+		"""
+		Returns the channel values of the payloads and a mask of the payloads which are long enough
+		"""
+		valid = arg_sizes >= self.offset + self.dtype.itemsize
+		values = np.ascontiguousarray(arg_payloads[valid, self.offset:self.offset + self.dtype.itemsize]).view(self.dtype).reshape(-1)
+		return values, valid
+
+
+class LiveView(object):
+	"""
+	Live plot of a running measurement: the arrival rate per device and the decoded channels of the last arg_window_s seconds.
+	The plot is refreshed every arg_refresh_s seconds in the calling thread, independent of the data rate.
+	The BLE event thread only appends to the rings of the RingStore, thus drawing never delays the notifications.
+	Peripherals admitted during the measurement are added at the next refresh.
+	NOTE:	Needs matplotlib.
+	"""
+	def __init__(self, arg_collector_manager, arg_channels = None, arg_window_s = constants.DEFAULT_LIVE_WINDOW_S, arg_refresh_s = constants.DEFAULT_LIVE_REFRESH_S,
+				 arg_points = constants.DEFAULT_LIVE_POINTS, arg_ring_store = None):
+		"""
+		INPUT PARAMETERS
+
+		param arg_collector_manager:	The CollectorManager of the measurement, its Writers have to be set
+		type arg_collector_manager:		datacollection.CollectorManager
+
+		param arg_channels:				The decoded channels to show
+		type arg_channels:				list with LiveChannel elements
+
+		param arg_window_s:				The time span shown in seconds
+		type arg_window_s:				float
+
+		param arg_refresh_s:			The time between two frames in seconds
+		type arg_refresh_s:				float
+
+		param arg_points:				The point budget of every curve
+		type arg_points:				int
+
+		param arg_ring_store:			The RingStore shared with other consumers, its retention has to cover the window. Per default an own one.
+		type arg_ring_store:			ringstore.RingStore
+		"""
+		self.collector_manager = arg_collector_manager
+		self.channels = arg_channels if arg_channels is not None else []
+		self.window_s = arg_window_s
+		self.refresh_s = arg_refresh_s
+		self.points = arg_points
+		self.own_ring_store = arg_ring_store is None
+		self.ring_store = arg_ring_store if arg_ring_store is not None else RingStore(arg_retention_s = arg_window_s)
+		self.ring_store.attach(arg_collector_manager)
+		"""
+		OTHER PARAMETERS
+
+		param own_ring_store:	True if the RingStore has been created by the LiveView, it is detached from the Writers when the view is closed
+		type own_ring_store:	bool
+
+		param ring_store:		The rings of all Writers
+		type ring_store:		ringstore.RingStore
+		"""
+
+	def __str__(self):
+		return("LiveView of {} streams, last {}s every {}s".format(len(self.ring_store.keys()), self.window_s, self.refresh_s))
+
+	def rates(self, arg_now):
+		"""
+		Returns the arrival rate per device in bins of DEFAULT_LIVE_RATE_BIN_S over the window ending at arg_now
+
+		returns:	tuple (np.ndarray with the bin starts relative to arg_now, dict {'Device': np.ndarray with packets/s})
+		"""
+		edges = np.arange(-self.window_s, constants.DEFAULT_LIVE_RATE_BIN_S / 2, constants.DEFAULT_LIVE_RATE_BIN_S)
+		rates = {}
+		for device, characteristic_uuid in self.ring_store.keys():
+			snapshot = self.ring_store.snapshot(device, characteristic_uuid, since = arg_now - self.window_s)
+			counts, _ = np.histogram(snapshot.timestamps - arg_now, bins = edges)
+			rates[device] = rates.get(device, 0) + counts / constants.DEFAULT_LIVE_RATE_BIN_S
+		return edges[:-1], rates
+
+	def channel(self, arg_channel, arg_now):
+		"""
+		Returns the downsampled values of a channel over the window ending at arg_now
+
+		returns:	tuple (np.ndarray with the times relative to arg_now, np.ndarray with the values)
+		"""
+		snapshot = self.ring_store.snapshot(arg_channel.device, arg_channel.characteristic_uuid, since = arg_now - self.window_s)
+		if snapshot is None:
+			return np.zeros(0), np.zeros(0)
+		values, valid = arg_channel.decode(snapshot.payloads, snapshot.sizes)
+		return downsample_minmax(snapshot.timestamps[valid] - arg_now, values, self.points)
+
+	"""
+	Public functions
+	"""
+	def show(self, arg_duration_s):
+		"""
+		Shows the live plot until the duration has passed or the window has been closed. Blocks the calling thread.
+
+		param arg_duration_s:	The maximum duration in seconds
+		type arg_duration_s:	float
+		"""
+		try:
+			import matplotlib.pyplot as plot
+		except ImportError:
+			raise customexception.UserException("The live view needs matplotlib: pip install matplotlib")
+
+		rows = 2 if self.channels else 1
+		fig, axes = plot.subplots(rows, 1, sharex = True, squeeze = False)
+		rate_axis = axes[0][0]
+		rate_axis.set_ylabel("Packets/s")
+		rate_axis.grid(True)
+		rate_lines = {}
+		channel_lines = []
+		if self.channels:
+			channel_axis = axes[1][0]
+			channel_axis.grid(True)
+			channel_lines = [channel_axis.plot([], [], label = channel.label)[0] for channel in self.channels]
+			channel_axis.legend(loc = 'upper left')
+		axes[rows - 1][0].set_xlabel("Time in seconds")
+		axes[rows - 1][0].set_xlim(-self.window_s, 0)
+
+		print("Showing {}".format(self))
+		end_time = time.perf_counter() + arg_duration_s
+		try:
+			while time.perf_counter() < end_time and plot.fignum_exists(fig.number):
+				frame_start = time.perf_counter()
+				self.ring_store.attach(self.collector_manager)
+				now = self.ring_store.last_timestamp()
+				if now is not None:
+					bins, rates = self.rates(now)
+					for device in sorted(rates):
+						if device not in rate_lines:
+							rate_lines[device] = rate_axis.plot([], [], label = device)[0]
+							rate_axis.legend(loc = 'upper left')
+						rate_lines[device].set_data(bins, rates[device])
+					rate_axis.relim()
+					rate_axis.autoscale_view(scalex = False)
+
+					for channel, line in zip(self.channels, channel_lines):
+						line.set_data(*self.channel(channel, now))
+					if channel_lines:
+						channel_axis.relim()
+						channel_axis.autoscale_view(scalex = False)
+				plot.pause(max(self.refresh_s - (time.perf_counter() - frame_start), 0.001))
+		finally:
+			if self.own_ring_store is True:
+				self.ring_store.detach(self.collector_manager)
+			plot.close(fig)
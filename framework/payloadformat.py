@@ -0,0 +1,53 @@
+"""
+file name:			payloadformat.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains the functions which are responsible for decoding payloads described by a struct format with NumPy.
+					Shared by the aggregation, the live view and the analysis, such that all of them accept the same formats.
+"""
+
+"""
+Import statement
+"""
+import customexception
+import numpy as np
+
+
+"""
+NumPy type codes of the supported struct field codes, standard sizes as with an explicit byte order
+"""
+NUMPY_TYPE_CODES = {'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8', 'e': 'f2', 'f': 'f4', 'd': 'f8'}
+
+
+def parse_format(arg_format):
+	"""
+	Returns the fields of a struct format with byte order and the size of the payload it describes, e.g. '<2hxI' -> ([(0, '<i2'), (2, '<i2'), (5, '<u4')], 9).
+	Pad bytes 'x' are skipped, they are no fields.
+	exception: If the format has no byte order or an unsupported field, raises InputException
+
+	param arg_format:	The struct format, e.g. '<10h'
+	type arg_format:	str
+
+	returns:	tuple (list with tuple (offset in bytes, np.dtype) elements, int)
+	"""
+	if len(arg_format) == 0 or arg_format[0] not in '<>=!':
+		raise customexception.InputException("The format needs a byte order, e.g. '<10h', got '{}'".format(arg_format))
+	byte_order = '>' if arg_format[0] == '!' else arg_format[0]
+	fields = []
+	offset = 0
+	count = ''
+	for code in arg_format[1:]:
+		if code.isdigit():
+			count += code
+			continue
+		if code == 'x':
+			offset += int(count or 1)
+		elif code in NUMPY_TYPE_CODES:
+			for _ in range(int(count or 1)):
+				fields.append((offset, np.dtype(byte_order + NUMPY_TYPE_CODES[code])))
+				offset += fields[-1][1].itemsize
+		else:
+			raise customexception.InputException("Unsupported field '{}' in the format '{}'".format(code, arg_format))
+		count = ''
+	return fields, offset
@@ -0,0 +1,152 @@
+"""
+file name:			ramsolver.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for choosing the SoftDevice configuration of the nRF device.
+					The candidate configurations are ranked by their expected notification throughput. The Setup class probes them in this order
+					with sd_ble_cfg_set and sd_ble_enable, which decide whether a configuration fits into the RAM of the nRF device.
+"""
+
+"""
+Import statement
+"""
+import constants
+import itertools
+
+
+"""
+Airtime on the LE 1M PHY in microseconds
+"""
+AIRTIME_PER_BYTE_US = 8
+AIRTIME_PACKET_OVERHEAD_BYTES = 10		# preamble, access address, header and CRC
+AIRTIME_EMPTY_ACK_US = 80
+AIRTIME_IFS_US = 150
+EVENT_LENGTH_UNIT_MS = 1.25
+MAX_DATA_LENGTH_BYTES = 251
+L2CAP_HEADER_BYTES = 4
+ATT_NOTIFICATION_HEADER_BYTES = 3
+
+"""
+Candidate values the solver tries
+"""
+ATT_MTU_CANDIDATES = [23, 65, 131, 185, 247]
+QUEUE_SIZE_CANDIDATES = [1, 2, 4, 8, 16]
+EVENT_LENGTH_CANDIDATES = [2, 3, 4, 6, 8]
+
+
+def estimate_throughput(arg_peripherals, arg_notification_queue_size, arg_att_mtu, arg_event_length):
+	"""
+	Returns the estimated aggregated notification throughput of all peripherals in bytes/s.
+	Every peripheral gets one connection event of the event length per connection interval,
+	which is (event length * number of peripherals) but at least DEFAULT_MIN_CONN_INT_MS.
+	Within a connection event at most one notification queue of full packets is sent.
+	"""
+	ll_payload = min(arg_att_mtu + L2CAP_HEADER_BYTES, MAX_DATA_LENGTH_BYTES)
+	packet_us = (ll_payload + AIRTIME_PACKET_OVERHEAD_BYTES) * AIRTIME_PER_BYTE_US + 2 * AIRTIME_IFS_US + AIRTIME_EMPTY_ACK_US
+	packets_per_event = min(arg_notification_queue_size, int(arg_event_length * EVENT_LENGTH_UNIT_MS * 1000 // packet_us))
+	conn_interval_ms = max(constants.DEFAULT_MIN_CONN_INT_MS, arg_peripherals * arg_event_length * EVENT_LENGTH_UNIT_MS)
+	return arg_peripherals * packets_per_event * (arg_att_mtu - ATT_NOTIFICATION_HEADER_BYTES) * 1000 / conn_interval_ms
+
+
+class SoftDeviceConfiguration(object):
+	"""
+	A candidate configuration of the SoftDevice
+	"""
+	def __init__(self, arg_peripherals, arg_notification_queue_size, arg_write_queue_size, arg_att_mtu, arg_event_length, arg_attribute_table_size, arg_vendor_specific_uuid_count):
+		self.max_connected_peripherals = arg_peripherals
+		self.hardware_notification_queue_size = arg_notification_queue_size
+		self.hardware_write_queue_size = arg_write_queue_size
+		self.att_mtu_max_size = arg_att_mtu
+		self.event_length = arg_event_length
+		self.attribute_table_size = arg_attribute_table_size
+		self.vendor_specific_uuid_count = arg_vendor_specific_uuid_count
+
+		self.throughput = estimate_throughput(arg_peripherals, arg_notification_queue_size, arg_att_mtu, arg_event_length)
+		"""
+		OTHER PARAMETERS
+
+		param throughput:	The estimated aggregated notification throughput in bytes/s
+		type throughput:	float
+		"""
+
+	def __str__(self):
+		return("{} peripherals, notification queue {}, write queue {}, ATT MTU {}, event length {} ({:.2f}ms): ~{:.1f} kB/s".format(
+			self.max_connected_peripherals, self.hardware_notification_queue_size, self.hardware_write_queue_size, self.att_mtu_max_size,
+			self.event_length, self.event_length * EVENT_LENGTH_UNIT_MS, self.throughput / 1000))
+
+	def covers(self, arg_other):
+		"""
+		Returns True if this configuration needs at least as much SoftDevice RAM as the other one, i.e. none of its values is smaller.
+		The RAM requirement of the SoftDevice grows with every one of these values, so a configuration covering one which failed with NO_MEM fails as well.
+		"""
+		return (self.max_connected_peripherals >= arg_other.max_connected_peripherals
+				and self.hardware_notification_queue_size >= arg_other.hardware_notification_queue_size
+				and self.hardware_write_queue_size >= arg_other.hardware_write_queue_size
+				and self.att_mtu_max_size >= arg_other.att_mtu_max_size
+				and self.event_length >= arg_other.event_length
+				and self.attribute_table_size >= arg_other.attribute_table_size
+				and self.vendor_specific_uuid_count >= arg_other.vendor_specific_uuid_count)
+
+	def apply(self, arg_parameters):
+		"""
+		Writes this configuration into the ConfigurationParameter object
+		"""
+		arg_parameters.max_connected_peripherals = self.max_connected_peripherals
+		arg_parameters.hardware_notification_queue_size = self.hardware_notification_queue_size
+		arg_parameters.hardware_write_queue_size = self.hardware_write_queue_size
+		arg_parameters.att_mtu_max_size = self.att_mtu_max_size
+		arg_parameters.event_length = self.event_length
+
+
+class RamSolver(object):
+	"""
+	Chooses the SoftDevice configuration for the target number of peripherals which maximizes the notification throughput.
+	The number of peripherals, the attribute table size and the vendor specific UUID count are taken from the ConfigurationParameter object,
+	the queue sizes are at most the configured ones.
+	Whether a configuration fits into the RAM of the nRF device is only known by probing it. Every configuration which failed is recorded with
+	reject, all configurations covering it are skipped afterwards.
+	"""
+	def __init__(self, arg_parameters):
+		"""
+		INPUT PARAMETERS
+
+		param arg_parameters:	The configuration parameters
+		type arg_parameters:	setup.ConfigurationParameter
+		"""
+		self.parameters = arg_parameters
+		self.rejected = []
+		"""
+		OTHER PARAMETERS
+
+		param rejected:		The configurations which failed with NO_MEM
+		type rejected:		list with SoftDeviceConfiguration elements
+		"""
+
+	"""
+	Public functions
+	"""
+	def candidates(self):
+		"""
+		Returns all candidate configurations
+		"""
+		notification_queue_sizes = [size for size in QUEUE_SIZE_CANDIDATES if size < self.parameters.hardware_notification_queue_size] + [self.parameters.hardware_notification_queue_size]
+		write_queue_sizes = [size for size in QUEUE_SIZE_CANDIDATES if size < self.parameters.hardware_write_queue_size] + [self.parameters.hardware_write_queue_size]
+		att_mtus = [mtu for mtu in ATT_MTU_CANDIDATES if mtu <= self.parameters.att_mtu_max_size]
+		return [SoftDeviceConfiguration(self.parameters.max_connected_peripherals, notification_queue_size, write_queue_size, att_mtu, event_length,
+										self.parameters.attribute_table_size, self.parameters.vendor_specific_uuid_count)
+				for notification_queue_size, write_queue_size, att_mtu, event_length in itertools.product(notification_queue_sizes, write_queue_sizes, att_mtus, EVENT_LENGTH_CANDIDATES)]
+
+	def reject(self, arg_candidate):
+		"""
+		Records a configuration which failed with NO_MEM
+		"""
+		self.rejected.append(arg_candidate)
+
+	def solve(self):
+		"""
+		Returns the candidate configurations not covering a rejected one, the best first.
+		Candidates are ranked by their throughput, then by their queue sizes, which buffer bursts, then by their smaller ATT MTU and event length.
+		"""
+		fitting = [candidate for candidate in self.candidates() if not any(candidate.covers(rejected) for rejected in self.rejected)]
+		return sorted(fitting, key = lambda candidate: (-candidate.throughput, -candidate.hardware_notification_queue_size, -candidate.hardware_write_queue_size, candidate.att_mtu_max_size, candidate.event_length))
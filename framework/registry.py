@@ -0,0 +1,270 @@
+"""
+file name:			registry.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for keeping track of scanned peripherals by their BLE address.
+					Several peripherals may advertise the same name, each of them gets its own alias which is used for the connection, the Collector and the data paths.
+"""
+
+"""
+Import statement
+"""
+import customexception
+import json
+
+from fnmatch import fnmatchcase
+from blatann.peer import PeerAddress
+
+
+class DeviceEntry(object):
+	"""
+	A single peripheral found while scanning
+	"""
+	def __init__(self, arg_address, arg_name, arg_service_uuids = None):
+		"""
+		INPUT PARAMETERS
+
+		param arg_address:			The address of the peripheral
+		type arg_address:			blatann.peer.PeerAddress
+
+		param arg_name:				The advertised name of the peripheral
+		type arg_name:				str
+
+		param arg_service_uuids:	The advertised service UUIDs of the peripheral
+		type arg_service_uuids:		list with str elements
+		"""
+		self.address = arg_address
+		self.name = arg_name
+		self.service_uuids = [str(uuid).lower() for uuid in arg_service_uuids] if arg_service_uuids else []
+
+		self.alias = None
+		"""
+		OTHER PARAMETERS
+
+		param alias:	The unique alias of the peripheral. Assigned by the DeviceRegistry
+		type alias:		str
+		"""
+
+	def __str__(self):
+		return("'{}' ({}) at address {}".format(self.alias, self.name, self.address_string))
+
+	@property
+	def address_string(self):
+		"""
+		Returns the address in the format e.g. 'C4:93:27:0A:5B:E1,s'
+		"""
+		return str(self.address)
+
+	@property
+	def address_suffix(self):
+		"""
+		Returns the last three bytes of the address, e.g. '0A5BE1'
+		"""
+		return self.address_string.split(',')[0].replace(':', '')[-6:].upper()
+
+
+class DeviceSelector(object):
+	"""
+	Selects peripherals from the DeviceRegistry. All given criteria have to match.
+	"""
+	def __init__(self, name_pattern = None, address = None, service_uuid = None):
+		"""
+		INPUT PARAMETERS
+
+		param name_pattern:		Shell-style pattern of the advertised name, e.g. 'P&SNode' or 'CounterTester*'
+		type name_pattern:		str
+
+		param address:			The address of the peripheral, e.g. 'C4:93:27:0A:5B:E1' (the address type flag is optional)
+		type address:			str
+
+		param service_uuid:		A service UUID the peripheral has to advertise
+		type service_uuid:		str
+		"""
+		if name_pattern is None and address is None and service_uuid is None:
+			raise customexception.InputException("A DeviceSelector requires a name pattern, an address or a service UUID")
+		self.name_pattern = name_pattern
+		self.address = address.split(',')[0].upper() if address is not None else None
+		self.service_uuid = str(service_uuid).lower() if service_uuid is not None else None
+
+	def __str__(self):
+		criteria = [(key, value) for key, value in [('name', self.name_pattern), ('address', self.address), ('service', self.service_uuid)] if value is not None]
+		return("DeviceSelector({})".format(", ".join("{}={}".format(key, value) for key, value in criteria)))
+
+	def matches(self, arg_entry):
+		"""
+		Returns True if the peripheral matches all criteria of this selector
+
+		param arg_entry:	The peripheral
+		type arg_entry:		DeviceEntry
+		"""
+		if self.name_pattern is not None and not fnmatchcase(arg_entry.name, self.name_pattern):
+			return False
+		if self.address is not None and arg_entry.address_string.split(',')[0].upper() != self.address:
+			return False
+		if self.service_uuid is not None and self.service_uuid not in arg_entry.service_uuids:
+			return False
+		return True
+
+
+class DeviceRegistry(object):
+	"""
+	Registry of all scanned peripherals, keyed by their BLE address.
+	Every peripheral gets a stable alias: an explicitly set alias, otherwise its name if no other peripheral advertises the same name,
+	otherwise its name followed by the last three bytes of its address, e.g. 'P&SNode_0A5BE1'.
+	An alias which has been assigned once is kept for the lifetime of the registry.
+	"""
+	def __init__(self):
+		self.devices = {}
+		self.explicit_aliases = {}
+		"""
+		OTHER PARAMETERS
+
+		param devices:			All scanned peripherals
+		type devices:			dict
+								Format: {'Address': DeviceEntry}
+
+		param explicit_aliases:	Aliases set by the user, which take precedence over the generated ones
+		type explicit_aliases:	dict
+								Format: {'Address': 'Alias'}
+		"""
+
+	def __len__(self):
+		return len(self.devices)
+
+	"""
+	Private functions
+	"""
+	def _assign_aliases(self):
+		"""
+		Assigns an alias to all peripherals which do not have one yet
+		"""
+		name_count = {}
+		for entry in self.devices.values():
+			name_count[entry.name] = name_count.get(entry.name, 0) + 1
+
+		used_aliases = {entry.alias for entry in self.devices.values() if entry.alias is not None}
+		for address, entry in sorted(self.devices.items()):
+			if entry.alias is not None:
+				continue
+			if address in self.explicit_aliases:
+				entry.alias = self.explicit_aliases[address]
+			elif name_count[entry.name] == 1 and entry.name not in used_aliases:
+				entry.alias = entry.name
+			else:
+				entry.alias = "{}_{}".format(entry.name, entry.address_suffix)
+			used_aliases.add(entry.alias)
+
+	"""
+	Public functions
+	"""
+	def add_device(self, arg_address, arg_name, arg_service_uuids = None):
+		"""
+		Adds a peripheral to the registry, or updates its name and services if it is already known.
+		Returns the DeviceEntry of the peripheral.
+		"""
+		address = str(arg_address)
+		entry = self.devices.get(address)
+		if entry is None:
+			entry = self.devices[address] = DeviceEntry(arg_address, arg_name, arg_service_uuids)
+		else:
+			entry.name = arg_name
+			if arg_service_uuids:
+				entry.service_uuids = [str(uuid).lower() for uuid in arg_service_uuids]
+		self._assign_aliases()
+		return entry
+
+	def update_from_scan_report(self, arg_scan_report):
+		"""
+		Adds all peripherals of a scan report to the registry.
+
+		param arg_scan_report: 	A collection of scanned devices
+		type arg_scan_report: 	blatann.gap.advertise_data.ScanReportCollection
+		"""
+		for report in arg_scan_report.advertising_peers_found:
+			address = str(report.peer_address)
+			entry = self.devices.get(address)
+			if entry is None:
+				entry = self.devices[address] = DeviceEntry(report.peer_address, report.device_name)
+			else:
+				entry.name = report.device_name
+			entry.service_uuids = [str(uuid).lower() for uuid in report.advertise_data.service_uuids]
+		self._assign_aliases()
+
+	def set_alias(self, arg_address, arg_alias):
+		"""
+		Sets the alias of a peripheral, which will be used for its connection and its data paths.
+
+		param arg_address:	The address of the peripheral, e.g. 'C4:93:27:0A:5B:E1,s'
+		type arg_address:	str
+
+		param arg_alias:	The alias
+		type arg_alias:		str
+		"""
+		if any(entry.alias == arg_alias and address != arg_address for address, entry in self.devices.items()):
+			raise customexception.InputException("Alias '{}' is already used by another device".format(arg_alias))
+		self.explicit_aliases[arg_address] = arg_alias
+		if arg_address in self.devices:
+			self.devices[arg_address].alias = arg_alias
+
+	def get(self, arg_alias):
+		"""
+		Returns the DeviceEntry with this alias or None
+		"""
+		for entry in self.devices.values():
+			if entry.alias == arg_alias:
+				return entry
+		return None
+
+	def select(self, arg_selectors):
+		"""
+		Returns all peripherals matching at least one of the selectors, sorted by their alias.
+
+		param arg_selectors:	The selectors
+		type arg_selectors:		list with DeviceSelector elements
+		"""
+		return sorted([entry for entry in self.devices.values() if any(selector.matches(entry) for selector in arg_selectors)], key = lambda entry: entry.alias)
+
+	def alias_dict(self):
+		"""
+		Returns the simplified scan report with format {'Alias': Address}
+		"""
+		return {entry.alias: entry.address for entry in self.devices.values()}
+
+	def save(self, arg_file_path, arg_aliases = None):
+		"""
+		Saves the peripherals as known devices, such that a later session can connect to them without scanning first.
+
+		param arg_file_path:	The path of the .json file
+		type arg_file_path:		str
+
+		param arg_aliases:		Only saves the peripherals with these aliases. Per default all peripherals.
+		type arg_aliases:		list with str elements
+		"""
+		entries = [entry for entry in sorted(self.devices.values(), key = lambda entry: entry.alias) if arg_aliases is None or entry.alias in arg_aliases]
+		with open(arg_file_path, 'w') as json_file:
+			json.dump({'devices': [{'address': entry.address_string, 'name': entry.name, 'alias': entry.alias, 'service_uuids': entry.service_uuids} for entry in entries]}, json_file, indent = 4)
+		print("Saved {} known devices to '{}'".format(len(entries), arg_file_path))
+
+	def load(self, arg_file_path):
+		"""
+		Loads known devices saved by DeviceRegistry.save or written by hand. The saved aliases are kept.
+		Format: {"devices": [{"address": "C4:93:27:0A:5B:E1,s", "name": "P&SNode", "alias": "P&SNode_Desk"}]}, "alias" and "service_uuids" are optional.
+
+		param arg_file_path:	The path of the .json file
+		type arg_file_path:		str
+		"""
+		with open(arg_file_path, 'r') as json_file:
+			devices = json.load(json_file)['devices']
+
+		for device in devices:
+			if device.get('alias'):
+				self.set_alias(device['address'], device['alias'])
+			self.add_device(PeerAddress.from_string(device['address']), device.get('name', ''), device.get('service_uuids'))
+		print("Loaded {} known devices from '{}'".format(len(devices), arg_file_path))
+
+	def show_devices(self):
+		"""
+		Shows all peripherals in the registry
+		"""
+		[print(entry) for entry in sorted(self.devices.values(), key = lambda entry: entry.alias)]
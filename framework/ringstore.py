@@ -0,0 +1,263 @@
+"""
+file name:			ringstore.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for keeping the recent data of every characteristic in memory.
+					Every Writer hands its packets over to a preallocated NumPy ring, consumers such as the live view, statistics or alerting
+					query zero-copy snapshots of the retention window instead of re-reading the files or adding callbacks to the event thread.
+"""
+
+"""
+Import statement
+"""
+import constants
+import numpy as np
+
+
+class RingSnapshot(object):
+	"""
+	Zero-copy view of the packets of a RingSeries. The arrays are views into the ring and are overwritten as soon as the ring wrapped around,
+	thus a consumer holding a snapshot for longer has to check valid() after using it or copy() it.
+	"""
+	def __init__(self, arg_series, arg_first, arg_end):
+		"""
+		INPUT PARAMETERS
+
+		param arg_series:	The ring of the snapshot
+		type arg_series:	RingSeries
+
+		param arg_first:	The sequence number of the first packet
+		type arg_first:		int
+
+		param arg_end:		The sequence number after the last packet
+		type arg_end:		int
+		"""
+		self.series = arg_series
+		self.first = arg_first
+		self.end = arg_end
+		start = arg_first % arg_series.slots
+		stop = start + (arg_end - arg_first)
+		self.timestamps = arg_series.timestamps[start:stop]
+		self.payloads = arg_series.payloads[start:stop]
+		self.sizes = arg_series.sizes[start:stop]
+		"""
+		OTHER PARAMETERS
+
+		param timestamps:	The timestamps of the packets, the oldest first
+		type timestamps:	np.ndarray
+
+		param payloads:		The payloads of the packets, zero padded to the payload width of the ring
+		type payloads:		np.ndarray with uint8 elements
+
+		param sizes:		The payload sizes, at most the payload width
+		type sizes:			np.ndarray
+		"""
+
+	def __len__(self):
+		return self.end - self.first
+
+	def valid(self):
+		"""
+		Returns True if no packet of the snapshot has been overwritten yet
+		"""
+		return self.series.count <= self.first + self.series.slots
+
+	def copy(self):
+		"""
+		Returns copies of the timestamps, payloads and payload sizes
+		"""
+		return self.timestamps.copy(), self.payloads.copy(), self.sizes.copy()
+
+
+class RingSeries(object):
+	"""
+	Ring of the latest packets of one characteristic. Used as tap of a Writer, see writer.GenericWriter.taps.
+	Every packet is stored twice, at its slot and at its slot + number of slots, thus the latest packets are always contiguous
+	and a snapshot is a slice instead of a copy. The ring has some slots more than its capacity, such that a snapshot stays valid while
+	the packets of the next few refreshes are appended.
+	A single writer appends within the event thread without locking. Payloads longer than the payload width are truncated.
+	"""
+	def __init__(self, arg_retention_s = constants.DEFAULT_RING_RETENTION_S, arg_capacity = constants.DEFAULT_RING_CAPACITY,
+				 arg_payload_width = constants.DEFAULT_RING_PAYLOAD_WIDTH):
+		"""
+		INPUT PARAMETERS
+
+		param arg_retention_s:		The time span of the packets kept in seconds
+		type arg_retention_s:		float
+
+		param arg_capacity:			The maximum number of packets kept, has to cover the retention at the maximum notification rate
+		type arg_capacity:			int
+
+		param arg_payload_width:	The number of bytes kept per payload
+		type arg_payload_width:		int
+		"""
+		self.retention_s = arg_retention_s
+		self.capacity = arg_capacity
+		self.slots = arg_capacity + max(arg_capacity // constants.DEFAULT_RING_HEADROOM_DIVISOR, 1)
+		self.payload_width = arg_payload_width
+		self.timestamps = np.zeros(2 * self.slots)
+		self.payloads = np.zeros((2 * self.slots, arg_payload_width), dtype = np.uint8)
+		self.sizes = np.zeros(2 * self.slots, dtype = np.int64)
+		self.count = 0
+		"""
+		OTHER PARAMETERS
+
+		param slots:		The number of slots, the capacity plus the headroom for readers
+		type slots:			int
+
+		param timestamps:	The timestamps, every packet at its slot and at its slot + slots
+		type timestamps:	np.ndarray
+
+		param payloads:		The payloads, zero padded
+		type payloads:		np.ndarray with uint8 elements
+
+		param sizes:		The payload sizes
+		type sizes:			np.ndarray
+
+		param count:		The number of packets appended so far, i.e. the sequence number of the next packet
+		type count:			int
+		"""
+
+	def __str__(self):
+		return("RingSeries of {} packets within {}s".format(min(self.count, self.capacity), self.retention_s))
+
+	def __len__(self):
+		return min(self.count, self.capacity)
+
+	"""
+	Public functions
+	"""
+	def append(self, arg_timestamp, arg_value):
+		"""
+		Appends a packet. The count is increased last, thus readers never see a partially written packet.
+		"""
+		slot = self.count % self.slots
+		value = np.frombuffer(bytes(arg_value[:self.payload_width]), dtype = np.uint8)
+		size = value.size
+		self.payloads[slot, :size] = value
+		self.payloads[slot + self.slots, :size] = value
+		# The slot may still hold a longer packet, the payloads are zero padded
+		self.payloads[slot, size:] = 0
+		self.payloads[slot + self.slots, size:] = 0
+		self.sizes[slot] = self.sizes[slot + self.slots] = size
+		self.timestamps[slot] = self.timestamps[slot + self.slots] = arg_timestamp
+		self.count += 1
+
+	def last_timestamp(self):
+		"""
+		Returns the timestamp of the latest packet, None if there is none
+		"""
+		count = self.count
+		return self.timestamps[(count - 1) % self.slots] if count > 0 else None
+
+	def snapshot(self, since = None):
+		"""
+		Returns a zero-copy snapshot of the packets within the retention window, and with a timestamp of at least since.
+		The timestamps of a Writer are increasing, thus the start is found by a binary search.
+
+		param since:	The earliest timestamp, None for the whole retention window
+		type since:		float
+		"""
+		end = self.count
+		first = max(end - self.capacity, 0)
+		snapshot = RingSnapshot(self, first, end)
+		if end == 0:
+			return snapshot
+		earliest = snapshot.timestamps[-1] - self.retention_s
+		if since is not None:
+			earliest = max(earliest, since)
+		return RingSnapshot(self, first + int(np.searchsorted(snapshot.timestamps, earliest, side = 'left')), end)
+
+
+class RingStore(object):
+	"""
+	The RingSeries of all characteristics of a measurement. attach adds a ring to every Writer of a CollectorManager,
+	snapshot queries the recent packets of a characteristic.
+	"""
+	def __init__(self, arg_retention_s = constants.DEFAULT_RING_RETENTION_S, arg_capacity = constants.DEFAULT_RING_CAPACITY,
+				 arg_payload_width = constants.DEFAULT_RING_PAYLOAD_WIDTH):
+		"""
+		INPUT PARAMETERS
+
+		param arg_retention_s:		The time span of the packets kept per characteristic in seconds
+		type arg_retention_s:		float
+
+		param arg_capacity:			The maximum number of packets kept per characteristic
+		type arg_capacity:			int
+
+		param arg_payload_width:	The number of bytes kept per payload
+		type arg_payload_width:		int
+		"""
+		self.retention_s = arg_retention_s
+		self.capacity = arg_capacity
+		self.payload_width = arg_payload_width
+		self.series = {}
+		"""
+		OTHER PARAMETERS
+
+		param series:	The rings of all characteristics
+		type series:	dict
+						Format: {('Device', 'Characteristic_UUID'): RingSeries}
+		"""
+
+	def __str__(self):
+		return("RingStore of {} characteristics, last {}s".format(len(self.series), self.retention_s))
+
+	"""
+	Public functions
+	"""
+	def attach(self, arg_collector_manager):
+		"""
+		Adds a ring to every Writer of the CollectorManager without one, e.g. also to the ones of peripherals admitted in the meantime.
+		Returns the number of added rings.
+
+		param arg_collector_manager:	The CollectorManager of the measurement, its Writers have to be set
+		type arg_collector_manager:		datacollection.CollectorManager
+		"""
+		added = 0
+		for name in list(arg_collector_manager.collectors):
+			for writer in arg_collector_manager.collectors[name].writer_list:
+				key = (writer.name, writer.characteristic_uuid)
+				if key not in self.series:
+					self.series[key] = RingSeries(self.retention_s, self.capacity, self.payload_width)
+				if self.series[key].append not in writer.taps:
+					writer.taps.append(self.series[key].append)
+					added += 1
+		return added
+
+	def detach(self, arg_collector_manager):
+		"""
+		Removes the rings from the Writers of the CollectorManager. The kept packets can still be queried.
+		"""
+		for name in list(arg_collector_manager.collectors):
+			for writer in arg_collector_manager.collectors[name].writer_list:
+				series = self.series.get((writer.name, writer.characteristic_uuid))
+				if series is not None and series.append in writer.taps:
+					writer.taps.remove(series.append)
+
+	def keys(self):
+		"""
+		Returns the device and characteristic UUID of all rings
+		"""
+		return list(self.series)
+
+	def get_series(self, arg_device, arg_characteristic_uuid):
+		"""
+		Returns the ring of a characteristic, None if there is none
+		"""
+		return self.series.get((arg_device, arg_characteristic_uuid))
+
+	def snapshot(self, arg_device, arg_characteristic_uuid, since = None):
+		"""
+		Returns a zero-copy snapshot of the recent packets of a characteristic, see RingSeries.snapshot. None if there is no ring of the characteristic.
+		"""
+		series = self.get_series(arg_device, arg_characteristic_uuid)
+		return series.snapshot(since) if series is not None else None
+
+	def last_timestamp(self):
+		"""
+		Returns the timestamp of the latest packet of all rings, None if there is none
+		"""
+		latest = [series.last_timestamp() for series in self.series.values() if series.count > 0]
+		return max(latest) if latest else None
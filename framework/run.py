@@ -26,11 +26,14 @@ def main():
 	### Configure here to set up the nRF52840 dongle ####
 	#####################################################
 	config.port = "COM6"
+	# config.port = ["COM6", "COM7", "COM8", "COM9"]		# Multi-adapter mode: the peripherals are sharded across all nRF52840 dongles
 	config.max_connected_peripherals = 8                     
 	config.vendor_specific_uuid_count = 20
 	config.hardware_notification_queue_size = 4
 	config.hardware_write_queue_size = 4
 	config.attribute_table_size = 4096
+	# config.att_mtu_max_size = 247
+	# config.event_length = 6									# In units of 1.25ms
 	#####################################################
 	#####################################################
 
@@ -41,14 +44,21 @@ def main():
 			try to reduce either number of maximum connected peripherals or queue sizes. 
 			Reducing vendor_specific_uuid_count or attribute_table_size can help as well, although you should keep it high enough 
 			to being able to properly discover your services.
+			init.solve_and_open_device() instead chooses the queue sizes, ATT MTU and event length with the highest throughput
+			for max_connected_peripherals which fits into the memory of the nRF device.
 	"""
+	# Records the time at which a notification arrived at blatann instead of when the writer handles it, has to be called before opening:
+	# timestamping.install()
 	init = Setup(config)
 	init.configure_and_open_device()
+	# init.solve_and_open_device()
 	"""
 	Scanning other devices
 	"""
 	scanner = init.createScanner()
 	scanner.scan_for_devices()
+	# Reconnecting to the devices of a previous session does not require scanning for all devices first:
+	# scanner.load_known_devices('known_devices.json')
 	scanner.show_scanned_devices()
 	"""
 	Connecting and handling peripheral devices
@@ -63,11 +73,31 @@ def main():
 	# target_devices = ['CounterTester1','CounterTester2','CounterTester3',
 	# 				  'CounterTester4','CounterTester5','CounterTester6',
 	# 				  'CounterTester7','CounterTester8']
+	# Several peripherals advertising the same name are all selected by it, each gets an alias with its address suffix, e.g. 'P&SNode_0A5BE1'
+	# target_devices = [DeviceSelector(name_pattern = 'P&SNode*'), DeviceSelector(address = 'C4:93:27:0A:5B:E1')]
+	# scanner.set_device_alias('C4:93:27:0A:5B:E1,s', 'P&SNode_Desk')
 
 	connectionManager.set_default_connection_parameters(min_conn_interval_ms = 30,
 														max_conn_interval_ms = 30,
 														timeout_ms = 4000,
 														slave_latency = 0)
+
+	# Multi-adapter mode: the target devices are assigned to the nRF52840 dongles by their expected notification rate (in Hz)
+	# connectionManager.set_expected_notification_rate('P&SNode', 200)
+
+	# Only the target characteristics are discovered and collected, peripherals without them are discovered and collected completely
+	connectionManager.set_target_characteristic_on_device('P&SNode',['00020000-0001-11e1-ac36-0002a5d5c51b',
+																	 '001d0000-0001-11e1-ac36-0002a5d5c51b'])
+
+	# connectionManager.set_target_characteristic_on_device('CounterTester', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester1', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester2', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester3', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester4', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester5', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester6', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester7', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# connectionManager.set_target_characteristic_on_device('CounterTester8', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
 	###############################################################################
 	###############################################################################
 
@@ -75,10 +105,14 @@ def main():
 
 	connectionManager.set_target_devices(target_devices)
 	connectionManager.connect_with_all_target_devices()
+	# connectionManager.connect_with_known_devices()						# Instead of connect_with_all_target_devices with known devices
+	# connectionManager.save_known_devices('known_devices.json')
 	"""
 	Collecting data from all connected peripherals
 	"""
 	dataCollector = connectionManager.create_collectorManager()
+	# Records the measurement in data/catalog.sqlite, see catalog.SessionCatalog.find_sessions for finding it again
+	# dataCollector.set_catalog(SessionCatalog())
 	dataCollector.show_base_dict_all()
 
 
@@ -87,18 +121,17 @@ def main():
 	### Configure here to select which Writer you want to use and which characteristic datas you want to collect ####
 	#################################################################################################################
 	dataCollector.set_all_writer_types("PerfWriter")
-	dataCollector.set_target_characteristic_on_device('P&SNode',['00020000-0001-11e1-ac36-0002a5d5c51b',
-																 '001d0000-0001-11e1-ac36-0002a5d5c51b'])
-
-	# dataCollector.set_target_characteristic_on_device('CounterTester', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester1', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester2', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester3', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester4', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester5', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester6', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester7', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
-	# dataCollector.set_target_characteristic_on_device('CounterTester8', ["ad4a4041-5562-4112-9aa8-0aa23d0ce57a"])
+	# For long measurements: rolls over to a new, compressed segment every 16 MB or hour, read it with read_recording('data/.../Time.csv')
+	# dataCollector.set_all_storage(SegmentedStorage(arg_max_bytes = 16 * 1024 * 1024, arg_max_seconds = 3600))
+	# Many devices: all characteristics in the single file data/'Time'.blec, read with ContainerReader('data/....blec').read('Name', 'UUID', arg_start, arg_end)
+	# dataCollector.set_all_storage(SessionContainer())
+	# Compact binary files data/.../Time.dlx with delta/XOR encoded timestamps and payloads, read with load_codec_recording('data/.../Time.dlx')
+	# from codec import CodecStorage														# requires numpy
+	# dataCollector.set_all_storage(CodecStorage())
+	# High-rate sensors: stores count/mean/min/max/last of every second instead of every packet, plus every 100th raw packet in data/.../Time_raw.csv
+	# from aggregation import AggregationSpec												# requires numpy
+	# dataCollector.set_all_writer_types("AggregationWriter")
+	# dataCollector.set_aggregation('P&SNode', '001d0000-0001-11e1-ac36-0002a5d5c51b', AggregationSpec('<10h', arg_window_s = 1, arg_raw_decimation = 100))
 
 	#################################################################################################################
 	#################################################################################################################
@@ -111,6 +144,8 @@ def main():
 	#########################################################################################
 
 	dataCollector.write_characteristic('P&SNode', '00000001-000e-11e1-ac36-0002a5d5c51b', 1)
+	# Writes to all selected devices at once, such that they receive the value within about one connection interval
+	# dataCollector.write_characteristic_all('00000001-000e-11e1-ac36-0002a5d5c51b', 1, ['P&SNode'])
 
 	#########################################################################################
 	#########################################################################################
@@ -130,21 +165,80 @@ def main():
 	#########################################################################################
 	#########################################################################################
 
-	dataCollector.subscribe_all_devices()
+	# Subscribes to all characteristics of all devices at once, such that all streams start within a few connection intervals
+	dataCollector.subscribe_all_devices_pipelined()
+	# dataCollector.subscribe_all_devices()					# One subscription after the other
+	# Target devices which start advertising during the measurement are connected and subscribed as well, using at most 5% of the radio time for scanning
+	# admissionLoop = AdmissionLoop(connectionManager, dataCollector, arg_scan_budget = 0.05)
+	# admissionLoop.start()
+
+	# Stops all streams at once, saves the data and disconnects all peripherals at once
+	shutdownCoordinator = ShutdownCoordinator(dataCollector, connectionManager)
+	# shutdownCoordinator = ShutdownCoordinator(dataCollector, connectionManager, admissionLoop)	# Stops the admission loop first
 	try:
 		print("Wait {} seconds...".format(measurement_max_duration))
 		time.sleep(measurement_max_duration)
-		dataCollector.unsubscribe_all_devices()
+		# Instead of waiting: shows the arrival rate per device and decoded channels of the last 10 seconds while measuring
+		# from live import LiveView, LiveChannel												# requires numpy and matplotlib
+		# LiveView(dataCollector, [LiveChannel('P&SNode', '001d0000-0001-11e1-ac36-0002a5d5c51b', '<10h', 1, 'P&SNode channel 1')]).show(measurement_max_duration)
+		shutdownCoordinator.shutdown()
+		# dataCollector.unsubscribe_all_devices()				# One characteristic after the other
 
 	# Press CTRL + C to stop measurement 
 	except KeyboardInterrupt:
 		print("Stopping measurement...")
-		dataCollector.unsubscribe_all_devices()
+		shutdownCoordinator.shutdown()
+		# dataCollector.unsubscribe_all_devices()
+
+
+
+
+def advertisement_main():
+	"""
+	Connectionless mode: collects data from the advertising packets of beacon-style peripherals.
+	Not limited by the maximum number of connected peripherals, a single nRF Dongle can collect from hundreds of low-rate sensors.
+	"""
+	config = ConfigurationParameter()
+	config.port = "COM6"
+
+	# Records the time at which a notification arrived at blatann instead of when the writer handles it, has to be called before opening:
+	# timestamping.install()
+	init = Setup(config)
+	init.configure_and_open_device()
 
+	advertisementCollector = init.createAdvertisementCollector()
+
+
+	#####################################################################################
+	### Configure here to select the payloads and the Writer you want to use ############
+	#####################################################################################
+	advertisementCollector.set_manufacturer_filter(0x0059)
+	# advertisementCollector.set_service_data_filter(0x181A)
+	advertisementCollector.set_counter_format('<H', 0)
+	# advertisementCollector.set_target_addresses(['C4:93:27:0A:5B:E1,s'])
+	# advertisementCollector.set_device_name('C4:93:27:0A:5B:E1,s', 'BeaconTester1')
+	advertisementCollector.set_writer_type("Writer")
+
+	measurement_max_duration = 300
+	#####################################################################################
+	#####################################################################################
+
+	advertisementCollector.start_collection()
+	try:
+		print("Wait {} seconds...".format(measurement_max_duration))
+		time.sleep(measurement_max_duration)
+		advertisementCollector.stop_collection()
+
+	# Press CTRL + C to stop measurement 
+	except KeyboardInterrupt:
+		print("Stopping measurement...")
+		advertisementCollector.stop_collection()
 
+	init.close_device()
 
 
 if __name__ == "__main__":
 	main()
+	# advertisement_main()
 
 
@@ -13,32 +13,46 @@ import timer
 import customexception
 
 from connection import ConnectionManager, Connection
+from registry import DeviceRegistry, DeviceSelector
 
 class Scanner(object):
 	"""
 	Main Class which is responsible for handling the nRF Device to scan other devices. 
 	"""
 
-	def __init__(self, arg_ble_device):
+	def __init__(self, arg_ble_device, arg_ble_devices = None, arg_max_connections_per_device = None):
 		"""
 		INPUT PARAMETERS 
 
-		param 	arg_ble_device: 	The nRF device
-		type	arg_ble_device: 	blatann.BleDevice
+		param 	arg_ble_device: 					The nRF device
+		type	arg_ble_device: 					blatann.BleDevice
+
+		param 	arg_ble_devices: 					All opened nRF devices in the multi-adapter mode. Per default only arg_ble_device.
+		type	arg_ble_devices: 					list with blatann.BleDevice elements
+
+		param 	arg_max_connections_per_device: 	The maximum number of peripherals a single nRF device can be connected to.
+		type	arg_max_connections_per_device: 	int
 		"""
 		self.ble_device = arg_ble_device
+		self.ble_devices = arg_ble_devices if arg_ble_devices else [arg_ble_device]
+		self.max_connections_per_device = arg_max_connections_per_device
 
 		self.scan_report_collection = None
 		self.scan_report_dict = None
+		self.registry = DeviceRegistry()
 		"""
 		OTHER PARAMETERS 
 
 		param scan_report_collection:	The scan report of the nRF device
 		type scan_report_collection: 	blatann.gap.advertise_data.ScanReportCollection
 
-		param scan_report_dict:			A simplified version of the scan report. Contains Name and Address of peripherals
+		param scan_report_dict:			A simplified version of the scan report. Contains Alias and Address of peripherals.
+										The alias is the name of the peripheral, unless several peripherals advertise the same name. See registry.DeviceRegistry
 		type scan_report_dict: 			dict
-										Format: {'Name': 'Address'}
+										Format: {'Alias': 'Address'}
+
+		param registry:					All scanned peripherals keyed by their address. Kept when re-scanning.
+		type registry:					registry.DeviceRegistry
 		"""
 
 	def __str__(self):
@@ -60,7 +74,8 @@ class Scanner(object):
 		param	arg_scan_report: 	A collection of scanned devices
 		type	arg_scan_report: 	blatann.gap.advertise_data.ScanReportCollection
 		"""
-		return_val = {report.device_name:report.peer_address for report in arg_scan_report.advertising_peers_found}
+		self.registry.update_from_scan_report(arg_scan_report)
+		return_val = self.registry.alias_dict()
 		
 		if not return_val:
 			print("No devices have been found.")
@@ -89,6 +104,29 @@ class Scanner(object):
 		"""
 		print(self.scan_report_dict)
 
+	def set_device_alias(self, arg_address, arg_alias):
+		"""
+		Sets the alias of a scanned peripheral, which will be used for its connection and its data paths.
+
+		param arg_address:	The address of the peripheral, e.g. 'C4:93:27:0A:5B:E1,s'
+		type arg_address:	str
+		param arg_alias:	The alias
+		type arg_alias:		str
+		"""
+		self.registry.set_alias(arg_address, arg_alias)
+		self.scan_report_dict = self.registry.alias_dict()
+
+	def load_known_devices(self, arg_file_path):
+		"""
+		Loads the known devices of a previous session instead of scanning for devices. 
+		Use connection.ConnectionManager.connect_with_known_devices to connect to them.
+
+		param arg_file_path:	The path of the .json file, see registry.DeviceRegistry.load
+		type arg_file_path:		str
+		"""
+		self.registry.load(arg_file_path)
+		self.scan_report_dict = self.registry.alias_dict()
+
 	def createConnectionManager(self):
 		"""
 		Returns an object of the ConnectionManager with the corresponding nRF device and the scan report.
@@ -97,4 +135,4 @@ class Scanner(object):
 		if self.scan_report_dict is None:
 			raise customexception.InvalidStateException("Cannot create ConnectionManager if scan report is empty")
 		else:
-			return ConnectionManager(self.ble_device, self.scan_report_dict)
\ No newline at end of file
+			return ConnectionManager(self.ble_devices, self.scan_report_dict, self.max_connections_per_device, self.registry)
\ No newline at end of file
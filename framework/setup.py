@@ -15,7 +15,20 @@ import customexception
 import constants
 import time
 import blatann
+import timestamping
 from scanner import Scanner
+from advertisement import AdvertisementCollector
+from registry import DeviceSelector
+from ramsolver import RamSolver
+from shutdown import ShutdownCoordinator
+from admission import AdmissionLoop
+from catalog import SessionCatalog
+from storage import SegmentedStorage
+from container import SessionContainer
+from pc_ble_driver_py.exceptions import NordicSemiException
+from blatann.nrf.nrf_types.enums import NrfError
+from blatann.nrf.nrf_types import BleConnConfig, BleEnableConfig
+from blatann.nrf.nrf_dll_load import driver
 
 
 class ConfigurationParameter(object):
@@ -30,18 +43,23 @@ class ConfigurationParameter(object):
 		self._hardware_notification_queue_size = constants.DEFAULT_HW_QUEUE_NOTIFICATION
 		self._hardware_write_queue_size = constants.DEFAULT_HW_QUEUE_WRITE_COMMANDS
 		self._attribute_table_size = constants.DEFAULT_ATTRIBUTE_TABLE_SIZE
+		self._att_mtu_max_size = constants.DEFAULT_ATT_MTU_MAX_SIZE
+		self._event_length = constants.DEFAULT_EVENT_LENGTH
 
 		"""
 		OTHER PARAMETERS 
 
-		param _port: 								The port in which the nRF device is connected to (e.g. "COM4" or "/dev/ttyUSB0")
-		type _port: 								str
+		param _port: 								The port in which the nRF device is connected to (e.g. "COM4" or "/dev/ttyUSB0").
+													A list of ports (e.g. ["COM4", "COM5"]) enables the multi-adapter mode, where every port
+													corresponds to one nRF device and the peripherals are sharded across all of them.
+		type _port: 								str or list with str elements
 
 		param _vendor_specific_uuid_count: 			The amount of vendor specific UUID the nRF device will allocate memory to. Increase this, if you have a lot of
 													vendor specific uuid in the peripherals
 		type _vendor_specific_uuid_count: 			int
 
 		param _max_connected_peripherals: 			The maximum number of connected peripherals the nRF device can connect to. (Per default 5 if other parameters are not changed)
+													In the multi-adapter mode this is the limit of each nRF device.
 		type _max_connected_peripherals: 			int
 
 		param _hardware_notification_queue_size: 	Hardware queue size used for notification which the nRF device needs to allocate memory to. 
@@ -54,6 +72,14 @@ class ConfigurationParameter(object):
 
 		param _attribute_table_size:				The maximum size of the attribute table. Increase this if you have a lot of characteristics and services to discover.
 		type _attribute_table_size:					int
+
+		param _att_mtu_max_size:					The maximum ATT MTU size. The default of 247 fits into a single packet with the maximum data length.
+													Decreasing this value will allow you to connect to more peripheral devices.
+		type _att_mtu_max_size:						int
+
+		param _event_length:						The length of a connection event in units of 1.25ms, which the nRF device needs to allocate packet buffers for.
+													Decreasing this value will allow you to connect to more peripheral devices.
+		type _event_length:							int
 		"""
 
 	"""
@@ -67,6 +93,15 @@ class ConfigurationParameter(object):
 	def port(self, arg_value):
 		self._port = arg_value
 
+	@property
+	def ports(self):
+		"""
+		Returns all configured ports as a list, also if only a single port has been configured.
+		"""
+		if isinstance(self._port, (list, tuple)):
+			return list(self._port)
+		return [self._port]
+
 	"""
 	vendor_specific_uuid_count setter and getter
 	"""	
@@ -122,6 +157,28 @@ class ConfigurationParameter(object):
 	def attribute_table_size(self, arg_value):
 		self._attribute_table_size = arg_value
 
+	"""
+	att_mtu_max_size setter and getter
+	"""
+	@property
+	def att_mtu_max_size(self):
+		return self._att_mtu_max_size
+
+	@att_mtu_max_size.setter
+	def att_mtu_max_size(self, arg_value):
+		self._att_mtu_max_size = arg_value
+
+	"""
+	event_length setter and getter
+	"""
+	@property
+	def event_length(self):
+		return self._event_length
+
+	@event_length.setter
+	def event_length(self, arg_value):
+		self._event_length = arg_value
+
 class Setup(object):
 	""" 
 	Main class for setting up the nRF dongle with the parameters from ConfigurationParameter
@@ -137,13 +194,17 @@ class Setup(object):
 		self.parameters = arg_parameters
 		
 		self.ble_device = None
+		self.ble_devices = []
 		self.open_status = False
 		"""
 		OTHER PARAMETERS
 
-		param ble_device: 	The BLE device. In this case the nRF Dongle.
+		param ble_device: 	The BLE device. In this case the nRF Dongle. In the multi-adapter mode the nRF Dongle of the first port.
 		type ble_device: 	blatann.BleDevice
 
+		param ble_devices: 	All opened BLE devices, one for each configured port.
+		type ble_devices: 	list with blatann.BleDevice elements
+
 		param open_status: 	Attribute which returns True if the device has been opened.
 		type open_status: 	boolean
 		"""
@@ -152,7 +213,39 @@ class Setup(object):
 		if self.open_status is False:
 			return("BLE device not opened yet")
 		if self.open_status is True:
-			return("BLE device at port: '{}'".format(self.parameters.port))
+			return("BLE device at port: '{}'".format("', '".join(self.parameters.ports)))
+
+	"""
+	Private functions
+	"""
+	def _open_port(self, arg_port):
+		"""
+		Configures and opens the nRF Device at the port. The nRF Device is closed again if opening fails.
+		"""
+		print("Opening nRF Device at port '{}'...".format(arg_port))
+		ble_device = blatann.BleDevice(arg_port,
+									   notification_hw_queue_size = self.parameters.hardware_notification_queue_size,
+									   write_command_hw_queue_size = self.parameters.hardware_write_queue_size,
+									   )
+
+		ble_device.configure(vendor_specific_uuid_count = self.parameters.vendor_specific_uuid_count,
+							 max_connected_peripherals = self.parameters.max_connected_peripherals,
+							 max_secured_peripherals = 0,
+							 max_connected_clients = 0,
+							 attribute_table_size= self.parameters.attribute_table_size,
+							 att_mtu_max_size = self.parameters.att_mtu_max_size
+							 )
+		# blatann limitation: BleDevice has no public setter for the event length. It is part of the private connection configuration
+		# which open() passes to ble_conn_configure, so it is written there directly until blatann exposes it in configure.
+		ble_device._default_conn_config.event_length = self.parameters.event_length
+
+		try:
+			ble_device.open()
+		except Exception:
+			ble_device.close()
+			raise
+		print("Successfully openend nRF Device at port '{}'.".format(arg_port))
+		return ble_device
 
 	"""
 	Public functions
@@ -168,25 +261,89 @@ class Setup(object):
 			raises pc_ble_driver_py.exceptions.NordicSemiException: Failed to ble_enable. Error code: NrfError.no_mem:
 				The nRF Dongle has not enough memory space to allocate. Reducing the notification & write_commands queue sizes, 
 				vendor_specific_uuid_count or the maximum number of peripherals can avoid this exception.
+				Setup.solve_and_open_device chooses a configuration which fits.
 		"""
 		
-		print("Opening nRF Device...")
-		self.ble_device = blatann.BleDevice(self.parameters.port,
-											notification_hw_queue_size = self.parameters.hardware_notification_queue_size,
-											write_command_hw_queue_size = self.parameters.hardware_write_queue_size,
-											)
-
-		self.ble_device.configure(vendor_specific_uuid_count = self.parameters.vendor_specific_uuid_count,
-								  max_connected_peripherals = self.parameters.max_connected_peripherals,
-								  max_secured_peripherals = 0,
-								  max_connected_clients = 0,
-								  attribute_table_size= self.parameters.attribute_table_size
-								  )
-
-		self.ble_device.open()
-		print("Successfully openend nRF Device.")
+		for port in self.parameters.ports:
+			self.ble_devices.append(self._open_port(port))
+
+		self.ble_device = self.ble_devices[0]
 		self.open_status = True
 
+	def _probe_configuration(self, arg_ble_device, arg_candidate):
+		"""
+		Sets the candidate configuration with sd_ble_cfg_set and enables the SoftDevice with sd_ble_enable on the opened transport of the nRF Device,
+		without opening the BleDevice. Returns the error code and the app_ram_base the SoftDevice requires, which is 0 if the connectivity firmware does not report it.
+		"""
+		conn_config = BleConnConfig(conn_count = arg_candidate.max_connected_peripherals,
+									event_length = arg_candidate.event_length,
+									write_cmd_tx_queue_size = arg_candidate.hardware_write_queue_size,
+									hvn_tx_queue_size = arg_candidate.hardware_notification_queue_size,
+									max_att_mtu = arg_candidate.att_mtu_max_size)
+		# Same roles as in configure_and_open_device: only central connections, no security
+		enable_config = BleEnableConfig(vs_uuid_count = arg_candidate.vendor_specific_uuid_count,
+										periph_role_count = 0,
+										central_role_count = arg_candidate.max_connected_peripherals,
+										central_sec_count = 0,
+										service_changed_char = False,
+										attr_table_size = arg_candidate.attribute_table_size)
+		rpc_adapter = arg_ble_device.ble_driver.rpc_adapter
+		for tag, cfg in list(conn_config.get_configs()) + list(enable_config.get_configs()):
+			err_code = driver.sd_ble_cfg_set(rpc_adapter, tag, cfg, 0)
+			if err_code != driver.NRF_SUCCESS:
+				return err_code, 0
+
+		app_ram_base = driver.new_uint32()
+		driver.uint32_assign(app_ram_base, 0)
+		err_code = driver.sd_ble_enable(rpc_adapter, app_ram_base)
+		required_app_ram_base = driver.uint32_value(app_ram_base)
+		driver.delete_uint32(app_ram_base)
+		return err_code, required_app_ram_base
+
+	def solve_and_open_device(self, arg_max_probes = constants.DEFAULT_SOLVER_MAX_PROBES):
+		"""
+		Chooses the queue sizes, the ATT MTU and the event length for the configured number of peripherals with the ramsolver.RamSolver
+		and opens the nRF Device with the best configuration the SoftDevice accepts. The configurations are probed in order of their throughput
+		on the nRF Device of the first port with sd_ble_cfg_set and sd_ble_enable, the nRF Device is opened only once with the chosen one.
+		Every configuration which fails with NrfError.no_mem rules out all configurations which need at least as much RAM.
+		The chosen values are written into the ConfigurationParameter object. Returns the chosen ramsolver.SoftDeviceConfiguration.
+
+		param arg_max_probes:	The maximum number of configurations which are probed
+		type arg_max_probes:	int
+		"""
+		solver = RamSolver(self.parameters)
+		print("Probing SoftDevice configurations at port '{}'...".format(self.parameters.ports[0]))
+		probe_device = blatann.BleDevice(self.parameters.ports[0])
+		probe_device.ble_driver.open()
+		chosen = None
+		try:
+			for _ in range(arg_max_probes):
+				candidates = solver.solve()
+				if not candidates:
+					break
+				print("Probing configuration: {}".format(candidates[0]))
+				err_code, required_app_ram_base = self._probe_configuration(probe_device, candidates[0])
+				if err_code == driver.NRF_SUCCESS:
+					chosen = candidates[0]
+					break
+				if err_code != NrfError.no_mem.value:
+					raise NordicSemiException("Failed to probe configuration. Error code: {}".format(err_code), err_code)
+				if required_app_ram_base != 0:
+					print("Not enough memory, the SoftDevice requires app_ram_base 0x{:08x}. Trying the next configuration.".format(required_app_ram_base))
+				else:
+					print("Not enough memory, trying the next configuration.")
+				solver.reject(candidates[0])
+		finally:
+			# Resets the connectivity firmware, so that the SoftDevice can be configured again when opening
+			probe_device.close()
+
+		if chosen is None:
+			raise customexception.InputException("No configuration for {} peripherals could be enabled within {} probes. Reduce max_connected_peripherals, vendor_specific_uuid_count or attribute_table_size.".format(self.parameters.max_connected_peripherals, arg_max_probes))
+
+		print("Chosen configuration: {}".format(chosen))
+		chosen.apply(self.parameters)
+		self.configure_and_open_device()
+		return chosen
 
 	def close_device(self):
 		"""
@@ -194,8 +351,10 @@ class Setup(object):
 		"""
 		if self.open_status == True:
 			print("Closing nRF Device...")
-			self.ble_device.close()
+			[ble_device.close() for ble_device in self.ble_devices]
 			print("Successfully closed Device.")
+			self.ble_devices = []
+			self.ble_device = None
 			self.open_status = False
 			# time.sleep(3)
 		else:
@@ -206,10 +365,20 @@ class Setup(object):
 	def createScanner(self):
 		"""
 		Returns an object of the scanner.Scanner class with the corresponding nRF Device. The scanner.Scanner class will handle tasks related to scanning peripheral devices.
+		In the multi-adapter mode the first nRF Device scans, while all nRF Devices are handed over for establishing the connections.
 		"""
 		if self.open_status is not True:
 			raise customexception.InvalidStateException("Cannot instantiate Scanner class if no nRF device has been opened yet.")
-		return Scanner(self.ble_device)
+		return Scanner(self.ble_device, self.ble_devices, self.parameters.max_connected_peripherals)
+
+	def createAdvertisementCollector(self):
+		"""
+		Returns an object of the advertisement.AdvertisementCollector class with the corresponding nRF Device. 
+		The advertisement.AdvertisementCollector class collects data from the advertising packets of beacon-style peripherals without connecting to them.
+		"""
+		if self.open_status is not True:
+			raise customexception.InvalidStateException("Cannot instantiate AdvertisementCollector class if no nRF device has been opened yet.")
+		return AdvertisementCollector(self.ble_device)
 
 
 
@@ -0,0 +1,110 @@
+"""
+file name:			shutdown.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for stopping a measurement session.
+					Every step is done for all characteristics and peripherals at once, instead of one characteristic after the other.
+"""
+
+"""
+Import statement
+"""
+import constants
+import time
+
+
+class ShutdownCoordinator(object):
+	"""
+	Stops all data streams of a CollectorManager and disconnects all peripherals of a ConnectionManager.
+	The steps are:
+		0. Stop the admission loop, such that no peripheral is added while the others are stopped
+		1. Unsubscribe all characteristics and stop all read requests at once and wait for the confirmations together
+		2. Drain the read requests which are still in flight
+		3. Flush all csv files, force them to the disk and close them
+		4. Disconnect all peripherals at once
+	Steps 1 and 2 share a common deadline, such that a peripheral which does not respond cannot stall the shutdown.
+	"""
+	def __init__(self, arg_collector_manager, arg_connection_manager, arg_admission_loop = None):
+		"""
+		INPUT PARAMETERS
+
+		param arg_collector_manager:	The CollectorManager of the measurement
+		type arg_collector_manager:		datacollection.CollectorManager
+
+		param arg_connection_manager:	The ConnectionManager of the connected peripherals
+		type arg_connection_manager:	connection.ConnectionManager
+
+		param arg_admission_loop:		The admission loop which adds peripherals to the measurement, None if there is none.
+										It has to be stopped before the Collectors and connections are iterated.
+		type arg_admission_loop:		admission.AdmissionLoop
+		"""
+		self.collector_manager = arg_collector_manager
+		self.connection_manager = arg_connection_manager
+		self.admission_loop = arg_admission_loop
+
+	"""
+	Private functions
+	"""
+	def _writers(self):
+		"""
+		Returns all Writers of all Collectors
+		"""
+		return [writer for name in self.collector_manager.collectors for writer in self.collector_manager.collectors[name].writer_list]
+
+	def _stop_streams(self, arg_writers, arg_deadline):
+		"""
+		Unsubscribes all characteristics at once. Returns the Writers whose unsubscription has not been confirmed before the deadline.
+		"""
+		pending = [(writer, writer.unsubscribe_to_characteristic_async()) for writer in arg_writers]
+		unconfirmed = []
+		for writer, waitable in pending:
+			if waitable is None:
+				continue
+			characteristic, event_args = waitable.wait(max(arg_deadline - time.perf_counter(), 0), exception_on_timeout = False)
+			if event_args is None:
+				unconfirmed.append(writer)
+		return unconfirmed
+
+	def _drain(self, arg_writers, arg_deadline):
+		"""
+		Waits for the data still in flight. Returns the Writers which have not been drained before the deadline.
+		"""
+		return [writer for writer in arg_writers if writer.drain(max(arg_deadline - time.perf_counter(), 0)) is False]
+
+	"""
+	Public functions
+	"""
+	def shutdown(self, arg_timeout_s = constants.DEFAULT_SHUTDOWN_TIMEOUT_S, arg_comment = True):
+		"""
+		Stops the measurement and disconnects all peripherals.
+
+		param arg_timeout_s:	The time in seconds for stopping and draining all streams
+		type arg_timeout_s:		float
+
+		param arg_comment:		Asks for a comment of the measurement after the files have been closed
+		type arg_comment:		bool
+		"""
+		start_time = time.perf_counter()
+		if self.admission_loop is not None:
+			self.admission_loop.stop()
+		deadline = start_time + arg_timeout_s
+		writers = self._writers()
+
+		print("Stopping {} streams...".format(len(writers)))
+		unconfirmed = self._stop_streams(writers, deadline)
+		[print("Device: {}: Unsubscription of characteristic {} has not been confirmed.".format(writer.name, writer.characteristic_uuid)) for writer in unconfirmed]
+
+		undrained = self._drain(writers, deadline)
+		[print("Device: {}: Characteristic {} still had data in flight.".format(writer.name, writer.characteristic_uuid)) for writer in undrained]
+
+		[writer.close_file() for writer in writers]
+		ended = time.time()
+		print("Stopped and saved {} streams within {:.3f}s".format(len(writers), time.perf_counter() - start_time))
+
+		self.connection_manager.disconnect_all()
+		print("Shutdown completed within {:.3f}s".format(time.perf_counter() - start_time))
+
+		# Comment the measurement
+		comment = self.collector_manager._comment_data() if arg_comment is True else None
+		self.collector_manager.record_session_end(comment, ended)
@@ -0,0 +1,315 @@
+"""
+file name:			storage.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file contains classes which are responsible for storing the recordings of the Writers in segments.
+					Instead of a single csv file per session, the rows are written into a directory of segments, which are rolled over
+					at a size or time limit and compressed in the background. A manifest lists all segments, read_recording streams across them.
+"""
+
+"""
+Import statement
+"""
+import constants
+import csv
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+
+MANIFEST_FILE_NAME = 'manifest.json'
+
+
+class SegmentedStorage(object):
+	"""
+	Storage settings handed over to the Writers, see datacollection.CollectorManager.set_all_storage.
+	The recording 'data/Peripheral/Service/Characteristic_UUID/Session id.csv' becomes the directory
+	'data/Peripheral/Service/Characteristic_UUID/Session id/' with the segments 'segment_00000.csv.gz', ... and 'manifest.json'.
+	"""
+	per_stream_directories = True
+
+	def __init__(self, arg_max_bytes = constants.DEFAULT_SEGMENT_MAX_BYTES, arg_max_seconds = constants.DEFAULT_SEGMENT_MAX_S, arg_compress = True):
+		"""
+		INPUT PARAMETERS
+
+		param arg_max_bytes:	A segment is closed as soon as it exceeds this size in bytes
+		type arg_max_bytes:		int
+
+		param arg_max_seconds:	A segment is closed as soon as it is older than this duration in seconds. None for no time limit.
+		type arg_max_seconds:	float
+
+		param arg_compress:		Compresses closed segments with gzip in the background
+		type arg_compress:		bool
+		"""
+		self.max_bytes = arg_max_bytes
+		self.max_seconds = arg_max_seconds
+		self.compress = arg_compress
+		self.files = {}
+		"""
+		OTHER PARAMETERS
+
+		param files:	The opened segmented files per recording
+		type files:		dict
+						Format: {'Directory of the segments': SegmentedFile}
+		"""
+
+	def __str__(self):
+		return("SegmentedStorage with segments of at most {} bytes and {} seconds{}".format(self.max_bytes, self.max_seconds, ", compressed" if self.compress else ""))
+
+	"""
+	Public functions
+	"""
+	def open(self, arg_path, arg_header):
+		"""
+		Returns a SegmentedFile for the recording which would otherwise be stored in arg_path
+
+		param arg_path:		The path of the csv file, e.g. 'data/P&SNode/Service/Characteristic_UUID/150521_104646.csv'
+		type arg_path:		str
+
+		param arg_header:	The header row, written at the beginning of every segment
+		type arg_header:	list
+		"""
+		directory = os.path.splitext(arg_path)[0]
+		segmented_file = SegmentedFile(directory, arg_header, self.max_bytes, self.max_seconds, self.compress)
+		self.files[directory] = segmented_file
+		return segmented_file
+
+	def comment(self, arg_path, arg_comment):
+		"""
+		Adds a comment to the manifest of the recording. The SegmentedFile of the recording keeps its own manifest,
+		which replaces the one on the disk whenever it changes, thus the comment is added through it.
+		Only recordings which have not been opened by this storage are commented on the disk.
+
+		param arg_path:		The path of the csv file, as given to open
+		type arg_path:		str
+
+		param arg_comment:	The comment
+		type arg_comment:	str
+		"""
+		directory = os.path.splitext(arg_path)[0]
+		segmented_file = self.files.get(directory)
+		if segmented_file is not None:
+			segmented_file.comment(arg_comment)
+			return
+		manifest = _read_manifest(directory)
+		manifest['comments'].append(arg_comment)
+		_write_manifest(directory, manifest)
+
+
+class SegmentedFile(object):
+	"""
+	Replacement for the csv file and the csv writer of a Writer, which writes the rows into rolling segments.
+	Only the Writer thread writes rows, the compression of closed segments runs in background threads.
+	"""
+	def __init__(self, arg_directory, arg_header, arg_max_bytes, arg_max_seconds, arg_compress):
+		"""
+		INPUT PARAMETERS
+
+		param arg_directory:	The directory of the segments
+		type arg_directory:		str
+
+		param arg_header:		The header row, written at the beginning of every segment
+		type arg_header:		list
+
+		param arg_max_bytes:	A segment is closed as soon as it exceeds this size in bytes
+		type arg_max_bytes:		int
+
+		param arg_max_seconds:	A segment is closed as soon as it is older than this duration in seconds. None for no time limit.
+		type arg_max_seconds:	float
+
+		param arg_compress:		Compresses closed segments with gzip in the background
+		type arg_compress:		bool
+		"""
+		self.name = arg_directory
+		self.header = arg_header
+		self.max_bytes = arg_max_bytes
+		self.max_seconds = arg_max_seconds
+		self.compress = arg_compress
+
+		self.closed = False
+		self.segment_file = None
+		self.segment_writer = None
+		self.segment = None
+		self.rotate_time = None
+		self.compressions = []
+		self.lock = threading.Lock()
+
+		os.makedirs(arg_directory, exist_ok = True)
+		self.manifest = _read_manifest(arg_directory)
+		self._open_segment()
+		"""
+		OTHER PARAMETERS
+
+		param closed:			True if the SegmentedFile has been closed
+		type closed:			bool
+
+		param segment_file:		The file of the current segment
+		type segment_file:		file object
+
+		param segment_writer:	The csv writer of the current segment
+		type segment_writer:	csv.writer
+
+		param segment:			The manifest entry of the current segment
+		type segment:			dict
+								Format: {'file': str, 'rows': int, 'bytes': int, 'first_timestamp': float, 'last_timestamp': float, 'compressed': bool}
+
+		param rotate_time:		The time.monotonic() value at which the current segment is closed
+		type rotate_time:		float
+
+		param compressions:		The running compression threads
+		type compressions:		list with threading.Thread elements
+
+		param lock:				Serializes the updates of the manifest by the Writer and the compression threads
+		type lock:				threading.Lock
+
+		param manifest:			The manifest of the recording
+		type manifest:			dict
+								Format: {'header': list, 'segments': list with dict elements, 'comments': list with str elements}
+		"""
+
+	"""
+	Private functions
+	"""
+	def _save_manifest(self):
+		"""
+		Writes the manifest. Has to be called with the lock held.
+		"""
+		_write_manifest(self.name, self.manifest)
+
+	def _open_segment(self):
+		"""
+		Opens a new segment and writes the header into it
+		"""
+		with self.lock:
+			file_name = 'segment_{:05d}.csv'.format(len(self.manifest['segments']))
+			self.segment = {'file': file_name, 'rows': 0, 'bytes': 0, 'first_timestamp': None, 'last_timestamp': None, 'compressed': False}
+			self.manifest['header'] = self.header
+			self.manifest['segments'].append(self.segment)
+			self._save_manifest()
+
+		self.segment_file = open(os.path.join(self.name, file_name), 'a', newline = '')
+		self.segment_writer = csv.writer(self.segment_file)
+		self.segment_writer.writerow(self.header)
+		self.rotate_time = time.monotonic() + self.max_seconds if self.max_seconds is not None else None
+
+	def _close_segment(self):
+		"""
+		Closes the current segment and compresses it in the background
+		"""
+		self.segment_file.close()
+		segment = self.segment
+		with self.lock:
+			segment['bytes'] = os.path.getsize(os.path.join(self.name, segment['file']))
+			self._save_manifest()
+
+		if self.compress is True:
+			compression = threading.Thread(target = self._compress_segment, args = (segment,), name = "Compress {}".format(segment['file']), daemon = True)
+			compression.start()
+			self.compressions = [thread for thread in self.compressions if thread.is_alive()] + [compression]
+
+	def _compress_segment(self, arg_segment):
+		"""
+		Compresses a closed segment with gzip and replaces it in the manifest
+		"""
+		path = os.path.join(self.name, arg_segment['file'])
+		with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+			shutil.copyfileobj(source, target)
+		with self.lock:
+			arg_segment['file'] = arg_segment['file'] + '.gz'
+			arg_segment['compressed'] = True
+			self._save_manifest()
+		os.remove(path)
+
+	"""
+	Public functions
+	"""
+	def writerow(self, arg_row):
+		"""
+		Writes a row into the current segment and rolls over to a new segment at the size or time limit
+		"""
+		self.segment_writer.writerow(arg_row)
+		segment = self.segment
+		if segment['rows'] == 0:
+			segment['first_timestamp'] = arg_row[0]
+		segment['last_timestamp'] = arg_row[0]
+		segment['rows'] += 1
+
+		if self.segment_file.tell() >= self.max_bytes or (self.rotate_time is not None and time.monotonic() >= self.rotate_time):
+			self._close_segment()
+			self._open_segment()
+
+	def comment(self, arg_comment):
+		"""
+		Adds a comment to the manifest, also after the SegmentedFile has been closed
+		"""
+		with self.lock:
+			self.manifest['comments'].append(arg_comment)
+			self._save_manifest()
+
+	def flush(self):
+		self.segment_file.flush()
+
+	def fileno(self):
+		return self.segment_file.fileno()
+
+	def close(self):
+		"""
+		Closes the last segment and waits until all segments have been compressed, such that the manifest is complete
+		"""
+		if self.closed is True:
+			return
+		self._close_segment()
+		[thread.join() for thread in self.compressions]
+		self.compressions = []
+		self.closed = True
+
+
+def _read_manifest(arg_directory):
+	"""
+	Returns the manifest of the recording in the directory, or an empty manifest
+	"""
+	path = os.path.join(arg_directory, MANIFEST_FILE_NAME)
+	if not os.path.exists(path):
+		return {'header': None, 'segments': [], 'comments': []}
+	with open(path, 'r') as manifest_file:
+		return json.load(manifest_file)
+
+
+def _write_manifest(arg_directory, arg_manifest):
+	"""
+	Replaces the manifest of the recording in the directory atomically
+	"""
+	path = os.path.join(arg_directory, MANIFEST_FILE_NAME)
+	with open(path + '.tmp', 'w') as manifest_file:
+		json.dump(arg_manifest, manifest_file, indent = 4)
+	os.replace(path + '.tmp', path)
+
+
+def read_recording(arg_path):
+	"""
+	Streams the rows of a recording. Works for the segmented recordings of a SegmentedStorage as well as for plain csv files.
+	The segments are read one after the other and decompressed on the fly, thus a recording never has to fit into the memory.
+	The header row of every segment is skipped. Plain csv files are streamed as they are, since not all of them have a header row.
+
+	param arg_path:		The path of the csv file or of the directory of the segments
+	type arg_path:		str
+	"""
+	directory = os.path.splitext(arg_path)[0] if arg_path.endswith('.csv') else arg_path
+	if not os.path.isdir(directory):
+		with open(arg_path, 'r', newline = '') as csv_file:
+			yield from csv.reader(csv_file)
+		return
+
+	for segment in _read_manifest(directory)['segments']:
+		path = os.path.join(directory, segment['file'])
+		# The segment may have been compressed after reading the manifest
+		if not os.path.exists(path) and os.path.exists(path + '.gz'):
+			path = path + '.gz'
+		with (gzip.open(path, 'rt', newline = '') if path.endswith('.gz') else open(path, 'r', newline = '')) as segment_file:
+			reader = csv.reader(segment_file)
+			next(reader, None)
+			yield from reader
@@ -0,0 +1,18 @@
+"""
+file name:			conftest.py
+author:				agent
+created:			19. October 2026
+
+brief:				pytest configuration of the framework tests.
+					The framework modules import each other as top-level modules, as when run.py is started within framework/,
+					thus framework/ is put on the module search path.
+"""
+
+"""
+Import statement
+"""
+import os
+import sys
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+"""
+file name:			test_codec.py
+author:				agent
+created:			19. October 2026
+
+brief:				Round trip tests of the blocks of codec.encode_block and of the codec files of codec.CodecStorage:
+					single rows, empty payloads, wrapping counters and lossless timestamps.
+"""
+
+"""
+Import statement
+"""
+import numpy as np
+import os
+import tempfile
+import unittest
+
+from codec import encode_block, decode_block, CodecStorage, load_codec_recording, read_codec_comments, CODEC_FILE_EXTENSION
+
+
+class TestBlock(unittest.TestCase):
+	def _round_trip(self, arg_timestamps, arg_payloads, arg_ticks_per_second = 1000000):
+		timestamps, sizes, payload_data = decode_block(encode_block(np.array(arg_timestamps, dtype = np.float64), arg_payloads, arg_ticks_per_second), arg_ticks_per_second)
+		self.assertEqual(sizes.tolist(), [len(payload) for payload in arg_payloads])
+		self.assertEqual(payload_data.tobytes(), b''.join(arg_payloads))
+		return timestamps
+
+	def test_single_row(self):
+		timestamps = self._round_trip([12.345678], [b'\x01\x02\x03\x04'])
+		self.assertEqual(timestamps.tolist(), [12.345678])
+
+	def test_empty_payloads(self):
+		self._round_trip([0.0, 0.5, 1.0], [b'', b'', b''])
+		self._round_trip([0.0, 0.5, 1.0], [b'', b'\xff', b''])
+
+	def test_payloads_of_different_sizes_are_stored_raw(self):
+		self._round_trip([0.0, 0.5, 1.0], [b'\x01', b'\x02\x03\x04', b'\x05\x06'])
+
+	def test_wrapping_counters(self):
+		counter_32 = (2 ** 32 - 5 + np.arange(64, dtype = np.uint64)) % 2 ** 32
+		counter_16 = (2 ** 16 - 3 + np.arange(64, dtype = np.uint64)) % 2 ** 16
+		payloads_32 = [int(value).to_bytes(4, 'little') for value in counter_32]
+		payloads_16 = [int(value).to_bytes(2, 'little') + b'\x00\x00' for value in counter_16]
+		timestamps = np.arange(64) * 0.0075
+
+		self._round_trip(timestamps, payloads_32)
+		self._round_trip(timestamps, payloads_16)
+		# A counting column compresses to far less than the raw payload
+		self.assertLess(len(encode_block(timestamps, payloads_32)), len(b''.join(payloads_32)) // 2)
+
+	def test_timestamps_in_ticks(self):
+		timestamps = self._round_trip([1.0000004, 1.0075006], [b'\x00', b'\x01'])
+		self.assertEqual(timestamps.tolist(), [1.0, 1.007501])
+
+	def test_lossless_timestamps(self):
+		expected = np.array([0.1, 1e-9, 1234567.891011, -3.5, np.nextafter(1.0, 2.0), 0.30000000000000004])
+		timestamps = self._round_trip(expected, [b'\x00\x01'] * expected.size, None)
+		self.assertEqual(timestamps.tobytes(), expected.tobytes())
+
+
+class TestCodecStorage(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, '150521_104646.csv')
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_round_trip_with_comments(self):
+		storage = CodecStorage(arg_ticks_per_second = None, arg_block_rows = 4)
+		codec_file = storage.open(self.path, ['Timestamp', 'Value'])
+		rows = [[position * 0.0075, bytes([position, 0])] for position in range(10)]
+		for row in rows:
+			codec_file.writerow(row)
+		storage.comment(self.path, 'while measuring')
+		codec_file.close()
+		storage.comment(self.path, 'after close')
+
+		path = os.path.splitext(self.path)[0] + CODEC_FILE_EXTENSION
+		timestamps, payload_data, payload_offsets = load_codec_recording(path)
+		self.assertEqual(timestamps.tolist(), [row[0] for row in rows])
+		self.assertEqual([payload_data[start:end].tobytes() for start, end in zip(payload_offsets[:-1], payload_offsets[1:])], [row[1] for row in rows])
+		self.assertEqual(read_codec_comments(path), ['while measuring', 'after close'])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,124 @@
+"""
+file name:			test_container.py
+author:				agent
+created:			19. October 2026
+
+brief:				Round trip tests of the session container files of container.SessionContainer: time range reads,
+					appending after the file has been completed and reading a file without footer.
+"""
+
+"""
+Import statement
+"""
+import customexception
+import os
+import shutil
+import tempfile
+import unittest
+
+from container import SessionContainer, ContainerReader, CONTAINER_FILE_EXTENSION
+
+
+SESSION_ID = '150521_104646'
+HEADER = ['Timestamp', 'Value']
+
+
+class TestSessionContainer(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.container = SessionContainer(self.directory.name, arg_index_interval = 4)
+		self.path = os.path.join(self.directory.name, SESSION_ID + CONTAINER_FILE_EXTENSION)
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def _csv_path(self, arg_device, arg_characteristic):
+		return os.path.join(self.directory.name, arg_device, 'Service', arg_characteristic, SESSION_ID + '.csv')
+
+	def _record(self, arg_rows_per_stream):
+		"""
+		Writes the rows of all streams interleaved, as the Writers of a session do. Returns the streams.
+		"""
+		streams = {key: self.container.open(self._csv_path(*key), HEADER) for key in arg_rows_per_stream}
+		for position in range(max(len(rows) for rows in arg_rows_per_stream.values())):
+			for key, rows in arg_rows_per_stream.items():
+				if position < len(rows):
+					streams[key].writerow(rows[position])
+		return streams
+
+	def test_round_trip_of_interleaved_streams(self):
+		rows = {('A', 'UUID1'): [[position * 0.5, 'a{}'.format(position)] for position in range(30)],
+				('B', 'UUID2'): [[position * 0.25, 'b,{}'.format(position), 'x'] for position in range(17)]}
+		[stream.close() for stream in self._record(rows).values()]
+
+		with ContainerReader(self.path) as reader:
+			self.assertTrue(reader.complete)
+			self.assertEqual([stream['rows'] for stream in reader.streams], [30, 17])
+			for (device, characteristic), expected in rows.items():
+				self.assertEqual(list(reader.read(device, characteristic)), [[row[0]] + [str(value) for value in row[1:]] for row in expected])
+
+	def test_time_range_read(self):
+		rows = {('A', 'UUID1'): [[float(position), str(position)] for position in range(50)],
+				('B', 'UUID2'): [[float(position) + 0.5, str(position)] for position in range(50)]}
+		[stream.close() for stream in self._record(rows).values()]
+
+		with ContainerReader(self.path) as reader:
+			# Start and end between the index entries and exactly on a row
+			self.assertEqual([row[0] for row in reader.read('A', 'UUID1', 9.5, 21.0)], [float(position) for position in range(10, 22)])
+			self.assertEqual([row[0] for row in reader.read('B', 'UUID2', 8.0, 8.9)], [8.5])
+			self.assertEqual([row[0] for row in reader.read('A', 'UUID1', None, 2.0)], [0.0, 1.0, 2.0])
+			self.assertEqual([row[0] for row in reader.read('A', 'UUID1', 48.0)], [48.0, 49.0])
+			self.assertEqual(list(reader.read('A', 'UUID1', 60.0)), [])
+
+	def test_comment_after_the_file_has_been_completed(self):
+		stream = self._record({('A', 'UUID1'): [[0.0, 'a'], [1.0, 'b']]})[('A', 'UUID1')]
+		self.container.comment(self._csv_path('A', 'UUID1'), 'before close')
+		stream.close()
+		self.container.comment(self._csv_path('A', 'UUID1'), 'after close')
+
+		with ContainerReader(self.path) as reader:
+			self.assertTrue(reader.complete)
+			self.assertEqual(reader.comments('A', 'UUID1'), ['before close', 'after close'])
+			self.assertEqual(list(reader.read('A', 'UUID1')), [[0.0, 'a'], [1.0, 'b']])
+
+	def test_stream_continues_after_the_file_has_been_completed(self):
+		self._record({('A', 'UUID1'): [[0.0, 'a'], [1.0, 'b']]})[('A', 'UUID1')].close()
+		size = os.path.getsize(self.path)
+
+		streams = self._record({('A', 'UUID1'): [[2.0, 'c']], ('B', 'UUID2'): [[2.5, 'd']]})
+		[stream.close() for stream in streams.values()]
+		self.assertGreater(os.path.getsize(self.path), size)
+
+		with ContainerReader(self.path) as reader:
+			self.assertTrue(reader.complete)
+			self.assertEqual([stream['rows'] for stream in reader.streams], [3, 1])
+			self.assertEqual(list(reader.read('A', 'UUID1')), [[0.0, 'a'], [1.0, 'b'], [2.0, 'c']])
+			self.assertEqual(list(reader.read('B', 'UUID2')), [[2.5, 'd']])
+
+	def test_existing_file_of_another_storage_is_not_overwritten(self):
+		self._record({('A', 'UUID1'): [[0.0, 'a']]})[('A', 'UUID1')].close()
+		with self.assertRaises(customexception.InvalidStateException):
+			SessionContainer(self.directory.name).open(self._csv_path('A', 'UUID1'), HEADER)
+
+	def test_file_without_footer_is_scanned(self):
+		rows = {('A', 'UUID1'): [[float(position), str(position)] for position in range(10)],
+				('B', 'UUID2'): [[float(position), str(position)] for position in range(7)]}
+		streams = self._record(rows)
+		streams[('A', 'UUID1')].flush()
+
+		# A copy of the file as it is on the disk while measuring, with a truncated last record as after a crash
+		crashed_path = os.path.join(self.directory.name, 'crashed' + CONTAINER_FILE_EXTENSION)
+		shutil.copyfile(self.path, crashed_path)
+		with open(crashed_path, 'ab') as crashed_file:
+			crashed_file.write(b'\x02\x00')
+
+		with ContainerReader(crashed_path, arg_index_interval = 4) as reader:
+			self.assertFalse(reader.complete)
+			self.assertEqual([stream['rows'] for stream in reader.streams], [10, 7])
+			self.assertEqual(list(reader.read('B', 'UUID2')), [[row[0], row[1]] for row in rows[('B', 'UUID2')]])
+			self.assertEqual([row[0] for row in reader.read('A', 'UUID1', 5.0, 6.0)], [5.0, 6.0])
+		[stream.close() for stream in streams.values()]
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,89 @@
+"""
+file name:			test_storage.py
+author:				agent
+created:			19. October 2026
+
+brief:				Round trip tests of the segmented recordings of storage.SegmentedStorage: rotation, compression and comments.
+"""
+
+"""
+Import statement
+"""
+import os
+import tempfile
+import unittest
+
+from storage import SegmentedStorage, read_recording, _read_manifest
+
+
+HEADER = ['Timestamp', 'Value']
+
+
+class TestSegmentedStorage(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, 'P&SNode', 'Service', 'UUID', '150521_104646.csv')
+		self.segments = os.path.splitext(self.path)[0]
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def _record(self, arg_storage, arg_rows):
+		segmented_file = arg_storage.open(self.path, HEADER)
+		for row in arg_rows:
+			segmented_file.writerow(row)
+		return segmented_file
+
+	def test_rotation_keeps_all_rows_in_order(self):
+		rows = [[str(float(position)), 'value {}'.format(position)] for position in range(200)]
+		self._record(SegmentedStorage(arg_max_bytes = 256, arg_compress = False), rows).close()
+
+		manifest = _read_manifest(self.segments)
+		self.assertGreater(len(manifest['segments']), 1)
+		self.assertEqual(manifest['header'], HEADER)
+		self.assertEqual(sum(segment['rows'] for segment in manifest['segments']), len(rows))
+		self.assertEqual(list(read_recording(self.path)), rows)
+
+	def test_rotation_by_time(self):
+		rows = [[str(float(position)), 'x'] for position in range(5)]
+		self._record(SegmentedStorage(arg_max_seconds = 0, arg_compress = False), rows).close()
+
+		manifest = _read_manifest(self.segments)
+		self.assertEqual([segment['rows'] for segment in manifest['segments']], [1, 1, 1, 1, 1, 0])
+		self.assertEqual(list(read_recording(self.path)), rows)
+
+	def test_closed_segments_are_compressed(self):
+		rows = [[str(float(position)), 'value {}'.format(position)] for position in range(200)]
+		self._record(SegmentedStorage(arg_max_bytes = 256), rows).close()
+
+		segments = _read_manifest(self.segments)['segments']
+		self.assertTrue(all(segment['compressed'] for segment in segments))
+		self.assertEqual(sorted(segment['file'] for segment in segments), sorted(file_name for file_name in os.listdir(self.segments) if file_name.endswith('.gz')))
+		self.assertFalse(any(file_name.endswith('.csv') for file_name in os.listdir(self.segments)))
+		self.assertEqual(list(read_recording(self.path)), rows)
+
+	def test_comment_of_an_open_recording_survives_rotation_and_close(self):
+		storage = SegmentedStorage(arg_max_bytes = 50)
+		segmented_file = self._record(storage, [[str(float(position)), 'x'] for position in range(10)])
+		storage.comment(self.path, 'first')
+		self.assertEqual(_read_manifest(self.segments)['comments'], ['first'])
+
+		[segmented_file.writerow([str(float(position)), 'x']) for position in range(10, 20)]
+		segmented_file.close()
+		storage.comment(self.path, 'second')
+		self.assertEqual(_read_manifest(self.segments)['comments'], ['first', 'second'])
+
+	def test_comment_of_a_recording_of_another_storage(self):
+		self._record(SegmentedStorage(), [['0.0', 'x']]).close()
+		SegmentedStorage().comment(self.path, 'later')
+		self.assertEqual(_read_manifest(self.segments)['comments'], ['later'])
+
+	def test_plain_csv_file_keeps_its_first_row(self):
+		os.makedirs(os.path.dirname(self.path))
+		with open(self.path, 'w', newline = '') as csv_file:
+			csv_file.write('1.0,a\n2.0,b\n')
+		self.assertEqual(list(read_recording(self.path)), [['1.0', 'a'], ['2.0', 'b']])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,125 @@
+"""
+file name:			timestamping.py
+author:				agent
+created:			19. October 2026
+
+brief:				This file stamps every BLE event with the time at which it entered blatann.
+					blatann does not expose the arrival time of an event: the native callback of the nrf driver only queues the event,
+					and the event thread decodes and dispatches it later. The timestamp is therefore taken in the native callback
+					(blatann.nrf.nrf_driver.NrfDriver.ble_evt_handler) and attached to every event argument that is created while
+					the event is dispatched, e.g. blatann.event_args.NotificationReceivedEventArgs.
+					blatann offers no hook for this, so install() patches the functions below. Importing this module changes nothing,
+					install() has to be called explicitly before a blatann.BleDevice is opened.
+					Without install(), event arguments carry no timestamp and the writers take the time when they handle the event.
+"""
+
+"""
+Import statement
+"""
+import threading
+import time
+import customexception
+
+from blatann.nrf import nrf_driver
+from blatann import event_args
+
+
+class _StampedEvent(object):
+	"""
+	A native BLE event together with the time.perf_counter() value at which it entered the native callback.
+	"""
+	__slots__ = ('ble_event', 'timestamp')
+
+	def __init__(self, arg_ble_event, arg_timestamp):
+		"""
+		INPUT PARAMETERS
+
+		param arg_ble_event:	The native event passed to the native callback
+		type arg_ble_event:		ble_evt_t
+
+		param arg_timestamp:	The time.perf_counter() value at which the event entered the native callback
+		type arg_timestamp:		float
+		"""
+		self.ble_event = arg_ble_event
+		self.timestamp = arg_timestamp
+
+	@property
+	def header(self):
+		"""
+		Used by blatann to log the id of events it can not decode.
+		"""
+		return self.ble_event.header
+
+
+"""
+The timestamp of the event which is currently dispatched, per event thread. Every blatann.BleDevice has its own event thread.
+The original blatann.nrf.nrf_driver.event_decode, None until install() has been called.
+"""
+_current = threading.local()
+_event_decode = None
+
+
+def _ble_evt_handler(self, adapter, ble_event):
+	"""
+	Replaces blatann.nrf.nrf_driver.NrfDriver.ble_evt_handler. Runs within the native callback.
+	"""
+	self._events.put(_StampedEvent(ble_event, time.perf_counter()))
+
+def _stamped_event_decode(stamped_event):
+	"""
+	Replaces blatann.nrf.nrf_driver.event_decode. Runs within the event thread of the blatann.BleDevice, before the event
+	is dispatched to the observers and event handlers.
+	"""
+	_current.timestamp = stamped_event.timestamp
+	event = _event_decode(stamped_event.ble_event)
+	if event is not None:
+		event.timestamp = stamped_event.timestamp
+	return event
+
+def _event_args_new(cls, *args, **kwargs):
+	"""
+	Replaces blatann.event_args.EventArgs.__new__. Event arguments created within an event thread carry the timestamp
+	of the event which is currently dispatched, all others carry None.
+	"""
+	instance = object.__new__(cls)
+	instance.timestamp = getattr(_current, 'timestamp', None)
+	return instance
+
+def capture_time(arg_event_args):
+	"""
+	Returns the time.perf_counter() value at which the event of the event arguments entered the native callback.
+	Without a timestamp, i.e. if install() has not been called or the event arguments have not been created by an event, it is the current time.
+
+	param arg_event_args:	The event arguments
+	type arg_event_args:	blatann.event_args.EventArgs
+	"""
+	timestamp = getattr(arg_event_args, 'timestamp', None)
+	return timestamp if timestamp is not None else time.perf_counter()
+
+def installed():
+	"""
+	Returns True if install() has been called.
+	"""
+	return _event_decode is not None
+
+def install():
+	"""
+	Patches blatann, so that every event argument carries the time.perf_counter() value at which its event entered the native callback.
+	Has to be called before blatann.BleDevice.open(), which registers the native callback. Calling it again has no effect.
+	exceptions:
+		raises customexception.InvalidStateException: The installed blatann version does not provide one of the patched functions.
+	"""
+	global _event_decode
+
+	if installed():
+		return
+	for owner, attribute in ((nrf_driver.NrfDriver, 'ble_evt_handler'), (nrf_driver, 'event_decode'), (event_args, 'EventArgs')):
+		if not hasattr(owner, attribute):
+			raise customexception.InvalidStateException("Can not stamp BLE events: the installed blatann version has no {}.{}".format(owner.__name__, attribute))
+	if event_args.EventArgs.__new__ is not object.__new__:
+		raise customexception.InvalidStateException("Can not stamp BLE events: blatann.event_args.EventArgs already overrides __new__")
+
+	_event_decode = nrf_driver.event_decode
+	nrf_driver.NrfDriver.ble_evt_handler = _ble_evt_handler
+	nrf_driver.event_decode = _stamped_event_decode
+	event_args.EventArgs.__new__ = _event_args_new
@@ -10,11 +10,14 @@ brief:				This file contains classes which are responsible for acquiring and pro
 Import statement
 """
 import timer
+import timestamping
 import customexception
+import constants
 import os
 import csv
 import time
 import struct
+import threading
 
 class GenericWriter(object):
 	"""
@@ -22,7 +25,7 @@ class GenericWriter(object):
 	Contains all basic attributes for setting up the acquisition of data.
 	"""
 	
-	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time):
+	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage = None):
 		"""
 		INPUT PARAMETERS
 
@@ -41,25 +44,157 @@ class GenericWriter(object):
 		param arg_time: 		The time when the Writers are instantiated
 		type arg_time: 			str
 								Format: e.g. '030821_081500' corresponds to 03. August 2021 at 08:15:00
+
+		param arg_storage:		Stores the csv file in rolling, compressed segments. None for a single csv file.
+		type arg_storage:		storage.SegmentedStorage
 		"""
 		self.name = arg_name
 		self.service = arg_service
 		self.characteristic_uuid = arg_cha_uuid
 		self.characteristic = arg_cha
 		self.time = arg_time
-	
+		self.storage = arg_storage
+		self.clock_offset = time.time() - time.perf_counter()
+		self.subscribed_time = None
+		self.packet_count = 0
+		self.byte_count = 0
+		self.taps = []
+		"""
+		OTHER PARAMETERS
+
+		param clock_offset:		Offset between time.time() and time.perf_counter(), used to convert capture times into Unix timestamps
+		type clock_offset:		float
+
+		param subscribed_time:	The time.perf_counter() value at which the peripheral confirmed the subscription
+		type subscribed_time:	float
+
+		param packet_count:		The number of received notifications or read responses, stored in the catalog.SessionCatalog
+		type packet_count:		int
+
+		param byte_count:		The number of received bytes, stored in the catalog.SessionCatalog
+		type byte_count:		int
+
+		param taps:				Functions called with the timestamp and the value of every received packet, e.g. ringstore.RingSeries.append.
+								They run within the event thread and must not block.
+		type taps:				list with function elements
+		"""
+
+	"""
+	Private function
+	"""
+	def _capture_time(self, event_args):
+		"""
+		Returns the time.perf_counter() value at which the notification has been captured.
+		Uses the timestamp stamped on the event when it entered blatann's native callback (see timestamping.install), so that the
+		queueing and dispatching delay of the event thread is not part of it. Without a timestamp it is the current time.
+
+		param event_args:	The event arguments of the notification or read response
+		type event_args:	blatann.event_args.EventArgs
+		"""
+		return timestamping.capture_time(event_args)
+
+	def _publish(self, arg_timestamp, arg_value):
+		"""
+		Hands a received packet over to the taps
+		"""
+		for tap in self.taps:
+			tap(arg_timestamp, arg_value)
+
+	def _csv_path(self):
+		"""
+		Returns the path of the csv file: data/'Peripheral'/'Services'/'Characteristic_UUID'/'Time'.csv
+		"""
+		return os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time))
+
+	def _open_csv(self, arg_header = ['Timestamp', 'Value', 'Comments']):
+		"""
+		Opens the csv file in append mode and writes the header. With a storage.SegmentedStorage the csv_writer writes into rolling segments instead.
+		"""
+		self.csv_file, self.csv_writer = self._open_csv_at(self._csv_path(), arg_header)
+
+	def _open_csv_at(self, arg_path, arg_header):
+		"""
+		Returns the opened csv file and its csv writer, see _open_csv
+		"""
+		if self.storage is not None:
+			csv_file = self.storage.open(arg_path, arg_header)
+			return csv_file, csv_file
+		csv_file = open(arg_path, 'a', newline='')
+		csv_writer = csv.writer(csv_file)
+		csv_writer.writerow(arg_header)
+		return csv_file, csv_writer
+
+	def _on_subscribed(self, characteristic, event_args):
+		"""
+		Callback function when the peripheral confirmed the subscription
+		"""
+		self.subscribed_time = self._capture_time(event_args)
+
+	"""
+	Public functions
+	"""
+	def wait_for_subscription(self, arg_waitable, arg_timeout_s = None):
+		"""
+		Waits for the subscription returned by subscribe_to_characteristic_async to be confirmed. Returns True if it has been confirmed.
+		blatann's Waitable.then does not call _on_subscribed if the confirmation arrived before it has been registered,
+		in that case the time of the confirmation is taken from the result of the waitable.
+
+		param arg_waitable:		The waitable of the subscription
+		type arg_waitable:		blatann.waitables.EventWaitable
+
+		param arg_timeout_s:	The time in seconds to wait for the confirmation. None waits indefinitely.
+		type arg_timeout_s:		float
+		"""
+		characteristic, event_args = arg_waitable.wait(arg_timeout_s, exception_on_timeout = False)
+		if event_args is not None and self.subscribed_time is None:
+			self._on_subscribed(characteristic, event_args)
+		return self.subscribed_time is not None
+
+	def unsubscribe_to_characteristic_async(self):
+		"""
+		Unsubscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the unsubscription,
+		or None if there is nothing to wait for. Used by the shutdown.ShutdownCoordinator, the csv file stays open until close_file.
+		"""
+		return self.characteristic.unsubscribe()
+
+	def drain(self, arg_timeout_s):
+		"""
+		Waits until no more data of this characteristic is in flight. Returns True if drained within the timeout.
+		"""
+		return True
+
+	def close_file(self):
+		"""
+		Flushes the csv file, forces it to the disk and closes it. Does nothing if the Writer has no csv file.
+		"""
+		csv_file = getattr(self, 'csv_file', None)
+		if csv_file is None or csv_file.closed:
+			return
+		csv_file.flush()
+		os.fsync(csv_file.fileno())
+		csv_file.close()
+
+	def writer_comment(self, arg_comment):
+		"""
+		Appends a comment to the csv file, or to the manifest of the segments
+		"""
+		if self.storage is not None:
+			self.storage.comment(self._csv_path(), arg_comment)
+			return
+		with open(self._csv_path(), 'a', newline='') as csv_file:
+			csv_writer = csv.writer(csv_file)
+			csv_writer.writerow(['', '', arg_comment])
+
 
 class Writer(GenericWriter):
 	"""
 	Subclass of the GenericWriter class which subscribes to a characteristic and writes them in the corresponding csv file.
 	The csv file has the format: 'Unix timestamp', 'Data'
 	"""
-	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time):
-		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time)
+	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage = None):
+		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage)
 
-		self.csv_file = open(os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time)), 'a', newline='')
-		self.csv_writer = csv.writer(self.csv_file)
-		self.csv_writer.writerow(['Timestamp', 'Value', 'Comments'])
+		self._open_csv()
 		"""
 		OTHER PARAMETERS
 
@@ -78,13 +213,16 @@ class Writer(GenericWriter):
 		"""
 		Callback function if the nRF Dongle receives a notification
 		"""
-		temp_time = time.time()
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
+		temp_time = self._capture_time(event_args) + self.clock_offset
 
 		# For debugging purposes
 		# value = struct.unpack("<5I", characteristic.value)
 		# print("{}; {}; {}; {}".format(self.name, self.characteristic_uuid, temp_time, value))
 
 		self.csv_writer.writerow([temp_time, characteristic.value])
+		self._publish(temp_time, characteristic.value)
 
 	# def subscribe_and_write_Writer(self):
 	# 	"""
@@ -109,11 +247,17 @@ class Writer(GenericWriter):
 			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
 
 
+	def subscribe_to_characteristic_async(self):
+		"""
+		Subscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the subscription.
+		"""
+		return self.characteristic.subscribe(self.on_subscribe_notification_Writer).then(self._on_subscribed)
+
 	def subscribe_to_characteristic(self):
 		"""
 		Subscribes the characteristic
 		"""
-		self.characteristic.subscribe(self.on_subscribe_notification_Writer).wait()
+		self.wait_for_subscription(self.subscribe_to_characteristic_async())
 		print("Device: {}: Subscribed to characteristic: {}".format(self.name, self.characteristic_uuid))
 
 
@@ -125,11 +269,6 @@ class Writer(GenericWriter):
 		self.characteristic.unsubscribe().wait()
 		self.csv_file.close()
 
-	def writer_comment(self, arg_comment):
-		with open(os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time)), 'a', newline='') as csv_file:
-			csv_writer = csv.writer(csv_file)
-			csv_writer.writerow(['', '', arg_comment])
-
 
 class PerfWriter(GenericWriter):
 	"""
@@ -138,13 +277,11 @@ class PerfWriter(GenericWriter):
 	The PerfWriter uses an offset given by the Collector & DataCollector classes and the timestamp will start at 0.
 	The csv file has the format: 'Timestamp', 'Data'	
 	"""
-	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_offset):
-		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time)
+	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_offset, arg_storage = None):
+		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage)
 
 		self.offset = arg_offset
-		self.csv_file = open(os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time)), 'a', newline='')
-		self.csv_writer = csv.writer(self.csv_file)	
-		self.csv_writer.writerow(['Timestamp', 'Value', 'Comments'])
+		self._open_csv()
 		
 
 		"""
@@ -166,7 +303,9 @@ class PerfWriter(GenericWriter):
 		"""
 		Callback function if the nRF Dongle receives a notification
 		"""
-		temp_time = time.perf_counter()
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
+		temp_time = self._capture_time(event_args)
 
 		# value = struct.unpack("<10h", characteristic.value)
 		# self.csv_writer.writerow([temp_time - self.offset, value])
@@ -177,6 +316,7 @@ class PerfWriter(GenericWriter):
 		# print("{}; {}; {}; {}".format(self.name, self.characteristic_uuid, temp_time - self.offset, value))
 
 		self.csv_writer.writerow([temp_time - self.offset, characteristic.value])
+		self._publish(temp_time - self.offset, characteristic.value)
 
 	# def subscribe_and_write_PerfWriter(self):
 	# 	"""
@@ -201,11 +341,17 @@ class PerfWriter(GenericWriter):
 			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
 
 
+	def subscribe_to_characteristic_async(self):
+		"""
+		Subscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the subscription.
+		"""
+		return self.characteristic.subscribe(self.on_subscribe_notification_PerfWriter).then(self._on_subscribed)
+
 	def subscribe_to_characteristic(self):
 		"""
 		Subscribes the characteristic
 		"""
-		self.characteristic.subscribe(self.on_subscribe_notification_PerfWriter).wait()
+		self.wait_for_subscription(self.subscribe_to_characteristic_async())
 		print("Device: {}: Subscribed to characteristic: {}".format(self.name, self.characteristic_uuid))	
 
 	def unsubscribe_to_characteristic(self):
@@ -215,10 +361,99 @@ class PerfWriter(GenericWriter):
 		self.characteristic.unsubscribe().wait()
 		self.csv_file.close()
 
-	def writer_comment(self, arg_comment):
-		with open(os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time)), 'a', newline='') as csv_file:
-			csv_writer = csv.writer(csv_file)
-			csv_writer.writerow(['', '', arg_comment])
+
+class AggregationWriter(GenericWriter):
+	"""
+	Subclass of the GenericWriter class which stores only the statistics of every time window instead of every packet, see aggregation.AggregationSpec.
+	The timestamps are relative to the offset, as the ones of the PerfWriter.
+	The csv file has the format: 'Window start', 'Count', 'Field_aggregate', ...
+	With a raw decimation, every n-th raw packet is stored alongside in 'Time'_raw.csv with the format of the PerfWriter.
+	"""
+	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_offset, arg_spec, arg_storage = None):
+		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage)
+
+		import aggregation								# NumPy is only required when aggregating
+
+		self.offset = arg_offset
+		self.aggregator = aggregation.WindowAggregator(arg_spec)
+		self._open_csv(arg_spec.header())
+		self.raw_file = None
+		self.raw_writer = None
+		if arg_spec.raw_decimation > 0:
+			self.raw_file, self.raw_writer = self._open_csv_at(os.path.join(os.path.dirname(self._csv_path()), '{}_raw.csv'.format(self.time)), ['Timestamp', 'Value', 'Comments'])
+		"""
+		OTHER PARAMETERS
+
+		param aggregator:	Buffers the packets and computes the statistics of every window
+		type aggregator:	aggregation.WindowAggregator
+
+		param csv_file:		The .csv file of the statistics
+		param csv_writer:	The writer corresponding to the csv file
+
+		param raw_file:		The .csv file of the decimated raw packets, None without raw decimation
+		param raw_writer:	The writer corresponding to the raw csv file
+		"""
+
+	def on_subscribe_notification_AggregationWriter(self, characteristic, event_args):
+		"""
+		Callback function if the nRF Dongle receives a notification
+		"""
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
+		temp_time = self._capture_time(event_args) - self.offset
+
+		[self.csv_writer.writerow(row) for row in self.aggregator.add(temp_time, characteristic.value)]
+		if self.raw_writer is not None and self.packet_count % self.aggregator.spec.raw_decimation == 1 % self.aggregator.spec.raw_decimation:
+			self.raw_writer.writerow([temp_time, characteristic.value])
+		self._publish(temp_time, characteristic.value)
+
+	def write_characteristic(self, value):
+		"""
+		Writes a value to the characteristic
+
+		param value:	The value to be written
+		type:			str or int
+		"""
+		if self.characteristic.writable is False:
+			print("Characteristic '{}' in device '{}' is not writable".format(self.characteristic_uuid, self.name))
+			return
+		else:
+			self.characteristic.write(value)
+			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
+
+	def subscribe_to_characteristic_async(self):
+		"""
+		Subscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the subscription.
+		"""
+		return self.characteristic.subscribe(self.on_subscribe_notification_AggregationWriter).then(self._on_subscribed)
+
+	def subscribe_to_characteristic(self):
+		"""
+		Subscribes the characteristic
+		"""
+		self.wait_for_subscription(self.subscribe_to_characteristic_async())
+		print("Device: {}: Subscribed to characteristic: {}, {}".format(self.name, self.characteristic_uuid, self.aggregator.spec))
+
+	def close_file(self):
+		"""
+		Stores the statistics of the last, incomplete window and closes the csv files
+		"""
+		if self.csv_file is not None and not self.csv_file.closed:
+			[self.csv_writer.writerow(row) for row in self.aggregator.process()]
+			if self.aggregator.skipped > 0:
+				print("Device: {}: {} packets of characteristic {} were shorter than the format and have not been aggregated".format(self.name, self.aggregator.skipped, self.characteristic_uuid))
+		if self.raw_file is not None and not self.raw_file.closed:
+			self.raw_file.flush()
+			os.fsync(self.raw_file.fileno())
+			self.raw_file.close()
+		super().close_file()
+
+	def unsubscribe_to_characteristic(self):
+		"""
+		Unsubscribes the characteristic and closes the csv files.
+		"""
+		self.characteristic.unsubscribe().wait()
+		self.close_file()
 
 
 class PrinterWriter(GenericWriter):
@@ -242,14 +477,17 @@ class PrinterWriter(GenericWriter):
 		"""
 		Callback function if the nRF Dongle receives a notification
 		"""
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
 		self.counter += 1
-		temp_time = time.time()
+		temp_time = self._capture_time(event_args) + self.clock_offset
 
 		# For debugging purposes
 		# value = struct.unpack("<5I", characteristic.value)
 		# print("{}; {}; {}; {}; {}".format(self.name, self.characteristic_uuid, self.counter, temp_time, value))
 
 		print("{}; {}; {}; {}; {}".format(self.name, self.characteristic_uuid, self.counter, temp_time, characteristic.value))
+		self._publish(temp_time, characteristic.value)
 
 	# def subscribe_and_print_Printer(self):
 	# 	"""
@@ -272,11 +510,17 @@ class PrinterWriter(GenericWriter):
 			self.characteristic.write(value)
 			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
 
+	def subscribe_to_characteristic_async(self):
+		"""
+		Subscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the subscription.
+		"""
+		return self.characteristic.subscribe(self.on_subscribe_notification_PrinterWriter).then(self._on_subscribed)
+
 	def subscribe_to_characteristic(self):
 		"""
 		Subscribes the characteristic
 		"""
-		self.characteristic.subscribe(self.on_subscribe_notification_PrinterWriter).wait()
+		self.wait_for_subscription(self.subscribe_to_characteristic_async())
 		print("Device: {}: Subscribed to characteristic: {}".format(self.name, self.characteristic_uuid))	
 
 	def unsubscribe_to_characteristic(self):
@@ -291,13 +535,13 @@ class ReadRequestWriter(GenericWriter):
 	Writer class which periodically does read requests to the characteristic.
 	NOTE: Will not work and will raise exception if the characteristic is not readable!
 	"""
-	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time):
-		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time)
+	def __init__(self, arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage = None):
+		super().__init__(arg_name, arg_service, arg_cha_uuid, arg_cha, arg_time, arg_storage)
 
-		self.csv_file = open(os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time)), 'a', newline='')
-		self.csv_writer = csv.writer(self.csv_file)
-		self.csv_writer.writerow(['Timestamp', 'Value', 'Comments'])
+		self._open_csv()
 		self.request_status = False
+		self.read_idle = threading.Event()
+		self.read_idle.set()
 		# self.delay = 0.3
 		"""
 		OTHER PARAMETERS
@@ -308,6 +552,9 @@ class ReadRequestWriter(GenericWriter):
 		param request_status:	An attribute for checking whether the nRF dongle should continue with read requests or not. True if it should continue read requests.
 		type request_status:	bool
 
+		param read_idle:		Set as soon as no read request is in flight anymore
+		type read_idle:			threading.Event
+
 		param delay:			An attribute for delaying the time between two consecutive read request
 		type delay:				float
 		"""
@@ -325,10 +572,15 @@ class ReadRequestWriter(GenericWriter):
 		"""
 		Callback function whenever a read request succeeds.
 		"""
-		temp_time = time.time()
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
+		temp_time = self._capture_time(event_args) + self.clock_offset
 		# value = struct.unpack("<5I", characteristic.value)
 		# print("{}; {}; {}; {}; {}".format(self.name, self.characteristic_uuid, self.counter, temp_time, value))
+		if self.csv_file.closed:
+			return
 		self.csv_writer.writerow([temp_time, characteristic.value])
+		self._publish(temp_time, characteristic.value)
 
 		# self.end_time = time.perf_counter()
 		
@@ -336,6 +588,8 @@ class ReadRequestWriter(GenericWriter):
 		if self.request_status is True:
 			# time.sleep(self.delay)
 			self.characteristic.read().then(self.on_read_request)
+		else:
+			self.read_idle.set()
 
 	# def initiate_read_request(self):
 	# 	"""
@@ -360,29 +614,46 @@ class ReadRequestWriter(GenericWriter):
 			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
 
 
+	def subscribe_to_characteristic_async(self):
+		"""
+		"Subscribes" the characteristic. Read requests need no confirmation of the peripheral, thus there is nothing to wait for and None is returned.
+		"""
+		self.subscribe_to_characteristic()
+		self.subscribed_time = time.perf_counter()
+		return None
+
 	def subscribe_to_characteristic(self):
 		"""
 		"Subscribes" the characteristic
 		"""
 		self.request_status = True
+		self.read_idle.clear()
 		self.characteristic.read().then(self.on_read_request)
 		print("Device: {}: Initiating read requests to characteristic: {}".format(self.name, self.characteristic_uuid))
 	
+	def unsubscribe_to_characteristic_async(self):
+		"""
+		Stops the periodic read request. The read request which is still in flight is awaited by drain.
+		"""
+		self.request_status = False
+		return None
+
+	def drain(self, arg_timeout_s):
+		"""
+		Waits until the read request which is still in flight has been written into the csv file. Returns True if drained within the timeout.
+		"""
+		return self.read_idle.wait(arg_timeout_s)
+
 	def unsubscribe_to_characteristic(self):
 		"""
 		Stops the periodic read request
 		"""
-		self.request_status = False
-		# Sleep for a short duration so that the remaining on going on_read_request can still write the values within the csv file.
-		time.sleep(3)
-		self.csv_file.close()
+		self.unsubscribe_to_characteristic_async()
+		# Wait until the remaining on going on_read_request has written its value within the csv file.
+		self.drain(constants.DEFAULT_READ_DRAIN_TIMEOUT_S)
+		self.close_file()
 		# print("Requested in total: {} read requests to characteristic '{}' within {}".format(self.counter, self.characteristic_uuid, self.end_time - self.start_time))
 
-	def writer_comment(self, arg_comment):
-		with open(os.path.join('data', str(self.name), str(self.service), str(self.characteristic_uuid), '{}.csv'.format(self.time)), 'a', newline='') as csv_file:
-			csv_writer = csv.writer(csv_file)
-			csv_writer.writerow(['', '', arg_comment])
-
 
 
 """
@@ -412,6 +683,10 @@ class CounterWriter(GenericWriter):
 	# @timer.csv_timer
 	def on_subscribe_notification_CounterWriter(self, characteristic, event_args):
 		self.counter += 1
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
+		if self.taps:
+			self._publish(self._capture_time(event_args) + self.clock_offset, characteristic.value)
 
 	# @timer.csv_timer
 	# def subscribe_and_count_CounterWriter(self):
@@ -434,14 +709,24 @@ class CounterWriter(GenericWriter):
 			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
 
 
+	def subscribe_to_characteristic_async(self):
+		"""
+		Subscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the subscription.
+		"""
+		self.start_time = time.perf_counter()
+		return self.characteristic.subscribe(self.on_subscribe_notification_CounterWriter).then(self._on_subscribed)
+
 	def subscribe_to_characteristic(self):
 		"""
 		Subscribes the characteristic
 		"""
-		self.start_time = time.perf_counter()
-		self.characteristic.subscribe(self.on_subscribe_notification_CounterWriter).wait()
+		self.wait_for_subscription(self.subscribe_to_characteristic_async())
 		print("Device: {}: Subscribed to characteristic: {}".format(self.name, self.characteristic_uuid))
 
+	def unsubscribe_to_characteristic_async(self):
+		print("Received in total: {} notifications from characteristic '{}' within {} seconds".format(self.counter, self.characteristic_uuid, time.perf_counter() - self.start_time))
+		return self.characteristic.unsubscribe()
+
 	def unsubscribe_to_characteristic(self):
 		self.characteristic.unsubscribe().wait()
 		print("Received in total: {} notifications from characteristic '{}' within {} seconds".format(self.counter, self.characteristic_uuid, time.perf_counter() - self.start_time))
@@ -462,7 +747,9 @@ class DummyWriter(GenericWriter):
 		"""
 		Callback function if the nRF Dongle receives a notification
 		"""
-		temp_time = time.time()
+		self.packet_count += 1
+		self.byte_count += len(characteristic.value)
+		temp_time = self._capture_time(event_args) + self.clock_offset
 		print("Received Notification at time {}".format(temp_time))
 		print("Waiting for {} seconds".format(self.delay))
 		time.sleep(self.delay)
@@ -498,11 +785,17 @@ class DummyWriter(GenericWriter):
 			print("Wrote '{}' to characteristic '{}' to device '{}'".format(value, self.characteristic_uuid, self.name))
 
 
+	def subscribe_to_characteristic_async(self):
+		"""
+		Subscribes the characteristic without waiting for the confirmation of the peripheral. Returns the waitable of the subscription.
+		"""
+		return self.characteristic.subscribe(self.on_subscribe_notification_DummyWriter).then(self._on_subscribed)
+
 	def subscribe_to_characteristic(self):
 		"""
 		Subscribes the characteristic
 		"""
-		self.characteristic.subscribe(self.on_subscribe_notification_DummyWriter).wait()
+		self.wait_for_subscription(self.subscribe_to_characteristic_async())
 		print("Device: {}: Subscribed to characteristic: {}".format(self.name, self.characteristic_uuid))
 
 	# @timer.csv_timer
@@ -163,28 +163,56 @@ class EvtSync(object):
 
 
 class BLEAdapter(BLEDriverObserver):
-    observer_lock = Lock()
+    """Convenience layer on top of one BLEDriver.
+
+    observer_lock is per instance and only serializes (un)registration of
+    observers of this adapter. Observers are an immutable tuple replaced as a
+    whole, so dispatch iterates a snapshot without taking the lock.
+
+    Instead of the observers, which receive every other notification,
+    callbacks can subscribe to a single (conn_handle, attr_handle) through
+    notification_subscribe. Notifications of a routed attribute go to its
+    callbacks only, with one call each, and are not broadcast to the
+    observers. The routing table is copy-on-write as well.
+
+    Routed callbacks and on_notification_timestamped receive the capture time
+    the driver stamped on the event (see BLEDriver.event_timestamp) rather than
+    the time they run.
+
+    Vendor specific UUID bases registered in the SoftDevice are kept in an
+    adapter-wide registry shared by all connections. Discovery resolves
+    services of a known base locally instead of reading and rediscovering
+    them. Bases passed to open() are registered on the first discovery.
+    """
 
     def __init__(self, ble_driver):
         super(BLEAdapter, self).__init__()
+        self.observer_lock = Lock()
         self.driver = ble_driver
         self.driver.observer_register(self)
 
         self.conn_in_progress = False
-        self.observers = list()
+        self.observers = tuple()
+        self.notification_routes = dict()
         self.db_conns = dict()
         self.evt_sync = dict()
         self.default_mtu = ATT_MTU_DEFAULT
+        self.uuid_bases = dict()
+        self.uuid_bases_pending = list()
 
     def get_version(self):
         return self.driver.ble_version_get()
 
-    def open(self):
+    def open(self, uuid_bases=None):
         self.driver.open()
+        self.uuid_bases_pending = list(uuid_bases or [])
 
     def close(self):
         self.driver.close()
         self.conn_in_progress = False
+        self.uuid_bases = dict()
+        self.uuid_bases_pending = list()
+        self.notification_routes = dict()
         self.db_conns = dict()
         self.evt_sync = dict()
 
@@ -207,13 +235,98 @@ class BLEAdapter(BLEDriverObserver):
     def disconnect(self, conn_handle):
         self.driver.ble_gap_disconnect(conn_handle)
 
-    @wrapt.synchronized(observer_lock)
+    @staticmethod
+    def _uuid_base_key(base):
+        # The SoftDevice ignores the 16-bit UUID bytes of a 128-bit base
+        return tuple(base[:2]) + (0, 0) + tuple(base[4:])
+
+    def uuid_base_register(self, uuid_base):
+        """Register uuid_base in the SoftDevice unless the registry knows it.
+
+        Sets uuid_base.type and returns the registered BLEUUIDBase.
+        """
+        key = self._uuid_base_key(uuid_base.base)
+        known = self.uuid_bases.get(key)
+        if known is None:
+            self.driver.ble_vs_uuid_add(uuid_base)
+            known = self.uuid_bases[key] = uuid_base
+        uuid_base.type = known.type
+        return known
+
+    def uuid_base_get(self, uuid_type):
+        for uuid_base in self.uuid_bases.values():
+            if uuid_base.type == uuid_type:
+                return uuid_base
+        return None
+
+    def _uuid_bases_register_pending(self):
+        pending, self.uuid_bases_pending = self.uuid_bases_pending, list()
+        for uuid_base in pending:
+            if not isinstance(uuid_base, BLEUUIDBase):
+                uuid_base = BLEUUIDBase(list(uuid_base), driver.BLE_UUID_TYPE_VENDOR_BEGIN)
+            self.uuid_base_register(uuid_base)
+
+    def _uuid_resolve(self, uuid):
+        # Services and characteristics of a registered base are reported
+        # with its type only, fill in the base bytes from the registry.
+        if uuid.base.base is None and uuid.base.type is not None:
+            uuid_base = self.uuid_base_get(uuid.base.type)
+            if uuid_base is not None:
+                uuid.base = uuid_base
+
+    @synchronized_on("observer_lock")
     def observer_register(self, observer):
-        self.observers.append(observer)
+        self.observers = self.observers + (observer,)
 
-    @wrapt.synchronized(observer_lock)
+    @synchronized_on("observer_lock")
     def observer_unregister(self, observer):
-        self.observers.remove(observer)
+        observers = list(self.observers)
+        observers.remove(observer)
+        self.observers = tuple(observers)
+
+    def _char_uuid_get(self, conn_handle, attr_handle):
+        db = self.db_conns.get(conn_handle)
+        uuid = None if db is None else db.get_char_uuid(attr_handle)
+        if uuid is None:
+            logger.info(f"Not able to look up UUID for attr_handle {attr_handle}")
+        return uuid
+
+    @synchronized_on("observer_lock")
+    def notification_subscribe(self, conn_handle, attr_handle, callback):
+        """Route the notifications of attr_handle on conn_handle to
+        callback(ble_adapter, conn_handle, uuid, attr_handle, data, timestamp)
+        instead of broadcasting them to the observers.
+
+        uuid is None if the connection has not been discovered."""
+        key = (conn_handle, attr_handle)
+        routes = dict(self.notification_routes)
+        if key in routes:
+            uuid, callbacks = routes[key]
+        else:
+            uuid, callbacks = self._char_uuid_get(conn_handle, attr_handle), tuple()
+        routes[key] = (uuid, callbacks + (callback,))
+        self.notification_routes = routes
+
+    @synchronized_on("observer_lock")
+    def notification_unsubscribe(self, conn_handle, attr_handle, callback):
+        key = (conn_handle, attr_handle)
+        routes = dict(self.notification_routes)
+        uuid, callbacks = routes[key]
+        callbacks = list(callbacks)
+        callbacks.remove(callback)
+        if callbacks:
+            routes[key] = (uuid, tuple(callbacks))
+        else:
+            del routes[key]
+        self.notification_routes = routes
+
+    @synchronized_on("observer_lock")
+    def _notification_routes_remove(self, conn_handle):
+        self.notification_routes = {
+            key: route
+            for key, route in self.notification_routes.items()
+            if key[0] != conn_handle
+        }
 
     def att_mtu_exchange(self, conn_handle, mtu):
         try:
@@ -270,34 +383,32 @@ class BLEAdapter(BLEDriverObserver):
         return response["data_length_params"]
 
     @NordicSemiErrorCheck(expected=BLEGattStatusCode.success)
-    def service_discovery(self, conn_handle, uuid=None):
-        vendor_services = []
-        self.driver.ble_gattc_prim_srvc_disc(conn_handle, uuid, 0x0001)
+    def service_discovery(
+        self, conn_handle, uuid=None, service_uuids=None, char_uuids=None
+    ):
+        """Discover the GATT database of the peer into db_conns[conn_handle].
+
+        By default every primary service, characteristic and descriptor is
+        discovered. uuid, or several service_uuids, restrict the discovery to
+        those primary services. With char_uuids, descriptors are discovered
+        only for those characteristics; the others keep their declaration and
+        value handles but have no descriptors (hence no CCCD).
+        """
+        if service_uuids is None:
+            service_uuids = [uuid]
+        self._uuid_bases_register_pending()
 
-        while True:
-            response = self.evt_sync[conn_handle].wait(
-                evt=BLEEvtID.gattc_evt_prim_srvc_disc_rsp
+        vendor_services = []
+        for service_uuid in service_uuids:
+            if service_uuid is not None and service_uuid.base.type is None:
+                self.uuid_base_register(service_uuid.base)
+            status = self._primary_service_discovery(
+                conn_handle, service_uuid, vendor_services
             )
+            if status != BLEGattStatusCode.success:
+                return status
 
-            if response["status"] == BLEGattStatusCode.success:
-                for s in response["services"]:
-                    if s.uuid.value == BLEUUID.Standard.unknown:
-                        vendor_services.append(s)
-                    else:
-                        self.db_conns[conn_handle].services.append(s)
-            elif response["status"] == BLEGattStatusCode.attribute_not_found:
-                break
-            else:
-                return response["status"]
-
-            if response["services"][-1].end_handle == 0xFFFF:
-                break
-            else:
-                self.driver.ble_gattc_prim_srvc_disc(
-                    conn_handle, uuid, response["services"][-1].end_handle + 1
-                )
-
-        for s in vendor_services:
+        for service_uuid, s in vendor_services:
             # Read service handle to obtain full 128-bit UUID.
             self.driver.ble_gattc_read(conn_handle, s.start_handle, 0)
             response = self.evt_sync[conn_handle].wait(evt=BLEEvtID.gattc_evt_read_rsp)
@@ -308,25 +419,36 @@ class BLEAdapter(BLEDriverObserver):
             if len(response["data"]) != 16:
                 continue
 
-            # Create UUIDBase object and register it in softdevice
-            base = BLEUUIDBase(
-                response["data"][::-1], driver.BLE_UUID_TYPE_VENDOR_BEGIN
+            # Register the UUIDBase in softdevice, unless it is known already
+            uuid_128 = response["data"][::-1]
+            base = self.uuid_base_register(
+                BLEUUIDBase(uuid_128, driver.BLE_UUID_TYPE_VENDOR_BEGIN)
             )
-            self.driver.ble_vs_uuid_add(base)
 
-            # Rediscover this service.
-            self.driver.ble_gattc_prim_srvc_disc(conn_handle, uuid, s.start_handle)
-            response = self.evt_sync[conn_handle].wait(
-                evt=BLEEvtID.gattc_evt_prim_srvc_disc_rsp
-            )
-            if response["status"] == BLEGattStatusCode.success:
-                # Assign UUIDBase manually
-                # See:
-                #  https://github.com/NordicSemiconductor/pc-ble-driver-py/issues/38
-                for s in response["services"]:
-                    if s.uuid.value != BLEUUID.Standard.unknown:
-                        s.uuid.base = base
-                        self.db_conns[conn_handle].services.append(s)
+            # The 128-bit UUID is known, so the service needs no rediscovery.
+            # Assign UUIDBase manually
+            # See:
+            #  https://github.com/NordicSemiconductor/pc-ble-driver-py/issues/38
+            s.uuid = BLEUUID((uuid_128[2] << 8) | uuid_128[3], base)
+            self.db_conns[conn_handle].services.append(s)
+
+        for s in self.db_conns[conn_handle].services:
+            self._uuid_resolve(s.uuid)
+
+        if char_uuids is not None:
+            # Vendor specific bases are registered by now, resolve their types
+            for char_uuid in char_uuids:
+                if char_uuid.base.base is None or char_uuid.base.type is not None:
+                    continue
+                known = self.uuid_bases.get(self._uuid_base_key(char_uuid.base.base))
+                if known is not None:
+                    char_uuid.base.type = known.type
+                    continue
+                try:
+                    self.driver.ble_uuid_decode(char_uuid.base.base, char_uuid)
+                except NordicSemiException:
+                    logger.info(f"UUID base of {char_uuid} is not registered")
+            char_targets = {(u.value, u.base.type) for u in char_uuids}
 
         for s in self.db_conns[conn_handle].services:
             self.driver.ble_gattc_char_disc(conn_handle, s.start_handle, s.end_handle)
@@ -336,6 +458,7 @@ class BLEAdapter(BLEDriverObserver):
                 )
                 if response["status"] == BLEGattStatusCode.success:
                     for char in response["characteristics"]:
+                        self._uuid_resolve(char.uuid)
                         s.char_add(char)
                 elif response["status"] == BLEGattStatusCode.attribute_not_found:
                     break
@@ -349,6 +472,11 @@ class BLEAdapter(BLEDriverObserver):
                 )
 
             for ch in s.chars:
+                if (
+                    char_uuids is not None
+                    and (ch.uuid.value, ch.uuid.base.type) not in char_targets
+                ):
+                    continue
                 self.driver.ble_gattc_desc_disc(
                     conn_handle, ch.handle_value, ch.end_handle
                 )
@@ -373,6 +501,33 @@ class BLEAdapter(BLEDriverObserver):
                         )
         return BLEGattStatusCode.success
 
+    def _primary_service_discovery(self, conn_handle, uuid, vendor_services):
+        self.driver.ble_gattc_prim_srvc_disc(conn_handle, uuid, 0x0001)
+
+        while True:
+            response = self.evt_sync[conn_handle].wait(
+                evt=BLEEvtID.gattc_evt_prim_srvc_disc_rsp
+            )
+
+            if response["status"] == BLEGattStatusCode.success:
+                for s in response["services"]:
+                    if s.uuid.value == BLEUUID.Standard.unknown:
+                        vendor_services.append((uuid, s))
+                    else:
+                        self.db_conns[conn_handle].services.append(s)
+            elif response["status"] == BLEGattStatusCode.attribute_not_found:
+                break
+            else:
+                return response["status"]
+
+            if response["services"][-1].end_handle == 0xFFFF:
+                break
+            else:
+                self.driver.ble_gattc_prim_srvc_disc(
+                    conn_handle, uuid, response["services"][-1].end_handle + 1
+                )
+        return BLEGattStatusCode.success
+
     @NordicSemiErrorCheck(expected=BLEGattStatusCode.success)
     def enable_notification(self, conn_handle, uuid, attr_handle=None):
         assert isinstance(uuid, BLEUUID), "Invalid argument type"
@@ -657,6 +812,7 @@ class BLEAdapter(BLEDriverObserver):
         self.conn_in_progress = False
 
     def on_gap_evt_disconnected(self, ble_driver, conn_handle, reason):
+        self._notification_routes_remove(conn_handle)
         try:
             del self.db_conns[conn_handle]
         except KeyError:
@@ -788,7 +944,6 @@ class BLEAdapter(BLEDriverObserver):
     def on_rpc_status(self, ble_driver, code, message):
         logger.debug("{}: {}".format(code, message))
 
-    @wrapt.synchronized(observer_lock)
     def on_gap_evt_conn_param_update_request(
         self, ble_driver, conn_handle, conn_params
     ):
@@ -797,10 +952,10 @@ class BLEAdapter(BLEDriverObserver):
                 ble_adapter=self, conn_handle=conn_handle, conn_params=conn_params
             )
 
-    @wrapt.synchronized(observer_lock)
     def on_gattc_evt_hvx(
         self, ble_driver, conn_handle, status, error_handle, attr_handle, hvx_type, data
     ):
+        observers = self.observers
         if status != BLEGattStatusCode.success:
             logger.error(
                 "Handle value notification failed. Status {}.".format(status)
@@ -808,20 +963,28 @@ class BLEAdapter(BLEDriverObserver):
             return
 
         if hvx_type == BLEGattHVXType.notification:
-            uuid = self.db_conns[conn_handle].get_char_uuid(attr_handle)
-            if uuid is None:
-                logger.info(f"Not able to look up UUID for attr_handle {attr_handle}")
+            timestamp = ble_driver.event_timestamp
+            route = self.notification_routes.get((conn_handle, attr_handle))
+            if route is not None:
+                uuid, callbacks = route
+                for callback in callbacks:
+                    callback(self, conn_handle, uuid, attr_handle, data, timestamp)
+                return
 
-            for obs in self.observers:
+            if not observers:
+                return
+
+            uuid = self._char_uuid_get(conn_handle, attr_handle)
+            for obs in observers:
                 obs.on_notification(self, conn_handle, uuid, data)
                 obs.on_notification_handle(self, conn_handle, uuid, attr_handle, data)
+                obs.on_notification_timestamped(
+                    self, conn_handle, uuid, attr_handle, data, timestamp
+                )
 
         elif hvx_type == BLEGattHVXType.indication:
-            uuid = self.db_conns[conn_handle].get_char_uuid(attr_handle)
-            if uuid is None:
-                logger.info(f"Not able to look up UUID for attr_handle {attr_handle}")
-
-            for obs in self.observers:
+            uuid = self._char_uuid_get(conn_handle, attr_handle)
+            for obs in observers:
                 obs.on_indication(self, conn_handle, uuid, data)
                 obs.on_indication_handle(self, conn_handle, uuid, attr_handle, data)
 
@@ -47,7 +47,7 @@ from abc import abstractmethod
 from threading import Thread, Lock
 
 from enum import Enum
-from typing import List
+from typing import List, Optional, Tuple, Union
 
 import wrapt
 
@@ -110,6 +110,18 @@ def NordicSemiErrorCheck(wrapped=None, expected=driver.NRF_SUCCESS):
     return wrapper(wrapped)
 
 
+def synchronized_on(lock_name):
+    """Serialize calls of the decorated method on the lock stored in the
+    instance attribute `lock_name`, so instances only contend with themselves."""
+
+    @wrapt.decorator
+    def wrapper(wrapped, instance, args, kwargs):
+        with getattr(instance, lock_name):
+            return wrapped(*args, **kwargs)
+
+    return wrapper
+
+
 class EnumWithOffsets(Enum):
     """An extesion of Enum allowing lookup of intermediary values. The
     intermediary values must directly follow a member with a name that ends with
@@ -849,6 +861,10 @@ class BLEAdvData(object):
     @classmethod
     def from_c(cls, adv_report_evt):
         ad_list = util.uint8_array_to_list(adv_report_evt.data, adv_report_evt.dlen)
+        return cls.from_list(ad_list)
+
+    @classmethod
+    def from_list(cls, ad_list):
         ble_adv_data = cls()
         index = 0
 
@@ -883,6 +899,70 @@ class BLEAdvData(object):
         return ble_adv_data
 
 
+class BLEAdvReport(object):
+    """Compact, lazily decoded alternative to BLEAdvData for received reports.
+
+    Only the raw bytes of the report are kept. The AD structures are located
+    on first access as (ad_type, start, end) offsets into the buffer, and a
+    field is sliced out of it only when it is asked for. Unknown AD types are
+    kept instead of being logged and dropped.
+    """
+
+    __slots__ = ("raw", "_offsets")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._offsets = None
+
+    @classmethod
+    def from_c(cls, adv_report_evt):
+        return cls(util.uint8_array_to_bytes(adv_report_evt.data, adv_report_evt.dlen))
+
+    @property
+    def offsets(self):
+        # type: () -> Tuple[Tuple[int, int, int], ...]
+        if self._offsets is None:
+            raw = self.raw
+            raw_len = len(raw)
+            offsets = []
+            index = 0
+            while index + 1 < raw_len:
+                ad_len = raw[index]
+                if ad_len == 0:
+                    break
+                end = index + ad_len + 1
+                if end > raw_len:
+                    break
+                offsets.append((raw[index + 1], index + 2, end))
+                index = end
+            self._offsets = tuple(offsets)
+        return self._offsets
+
+    @property
+    def types(self):
+        return [ad_type for ad_type, _, _ in self.offsets]
+
+    def get(self, ad_type, default=None):
+        # type: (Union[int, BLEAdvData.Types], Optional[bytes]) -> Optional[bytes]
+        if isinstance(ad_type, BLEAdvData.Types):
+            ad_type = ad_type.value
+        for record_type, start, end in self.offsets:
+            if record_type == ad_type:
+                return self.raw[start:end]
+        return default
+
+    def __contains__(self, ad_type):
+        return self.get(ad_type) is not None
+
+    @property
+    def records(self):
+        """Decodes the whole report the way BLEAdvData.records does."""
+        return BLEAdvData.from_list(list(self.raw)).records
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.raw)
+
+
 class BLEGattWriteOperation(Enum):
     invalid = driver.BLE_GATT_OP_INVALID
     write_req = driver.BLE_GATT_OP_WRITE_REQ
@@ -1658,8 +1738,28 @@ class RpcLogSeverity(Enum):
 
 
 class BLEDriver(object):
-    observer_lock = Lock()
-    api_lock = Lock()
+    """Wrapper around one connectivity adapter.
+
+    Locking is per instance: api_lock serializes the SoftDevice API calls and
+    observer_lock serializes observer (un)registration of this adapter only, so
+    several adapters in one process do not block each other. The serial port
+    enumeration is not bound to an adapter and uses the class-wide enum_lock.
+
+    Observers are kept in an immutable tuple which (un)registration replaces
+    as a whole. Event dispatch iterates a snapshot of that tuple without
+    taking a lock, so a slow observer never blocks (un)registration.
+
+    Every BLE event is stamped with time.perf_counter() as soon as the native
+    callback hands it over, before the hop to the EventThread. While an event
+    is being dispatched its capture time is available to the observers as
+    event_timestamp; clock_offset converts it to Unix time.
+
+    With fast_adv_reports, advertising reports are handed to the observers as
+    BLEAdvReport instead of BLEAdvData, which defers the decoding of the AD
+    structures until a field is accessed.
+    """
+
+    enum_lock = Lock()
 
     def __init__(
         self,
@@ -1669,9 +1769,15 @@ class BLEDriver(object):
         retransmission_interval=300,  # type: int
         response_timeout=1500,  # type: int
         log_severity_level="info",  # type: str
+        fast_adv_reports=False,  # type: bool
     ):
         super(BLEDriver, self).__init__()
-        self.observers = list()  # type: List[BLEDriverObserver]
+        self.observer_lock = Lock()
+        self.api_lock = Lock()
+        self.observers = tuple()  # type: Tuple[BLEDriverObserver, ...]
+        self.event_timestamp = None  # type: Optional[float]
+        self.clock_offset = time.time() - time.perf_counter()
+        self.adv_data_type = BLEAdvReport if fast_adv_reports else BLEAdvData
 
         if auto_flash:
             try:
@@ -1712,7 +1818,7 @@ class BLEDriver(object):
         self.ble_event_queue = queue.Queue()
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def rpc_log_severity_filter(self, severity):
         # type: (RpcLogSeverity) -> ()
         return driver.sd_rpc_log_handler_severity_filter_set(
@@ -1720,7 +1826,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_cfg_set(self, cfg_id, cfg):
         app_ram_base = 0
         assert isinstance(cfg, BLEConfigBase)
@@ -1729,7 +1835,7 @@ class BLEDriver(object):
             self.rpc_adapter, cfg_id.value, cfg.to_c(), app_ram_base
         )
 
-    @wrapt.synchronized(api_lock)
+    @wrapt.synchronized(enum_lock)
     @classmethod
     def enum_serial_ports(cls):
         MAX_SERIAL_PORTS = 64
@@ -1753,7 +1859,7 @@ class BLEDriver(object):
         return list(map(SerialPortDescriptor.from_c, descs))
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def open(self):
         self.run_workers = True
 
@@ -1783,7 +1889,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def close(self):
         result = driver.sd_rpc_close(self.rpc_adapter)
         logger.debug("close result %s", result)
@@ -1825,13 +1931,15 @@ class BLEDriver(object):
 
         return result
 
-    @wrapt.synchronized(observer_lock)
+    @synchronized_on("observer_lock")
     def observer_register(self, observer):
-        self.observers.append(observer)
+        self.observers = self.observers + (observer,)
 
-    @wrapt.synchronized(observer_lock)
+    @synchronized_on("observer_lock")
     def observer_unregister(self, observer):
-        self.observers.remove(observer)
+        observers = list(self.observers)
+        observers.remove(observer)
+        self.observers = tuple(observers)
 
     @staticmethod
     def adv_params_setup():
@@ -1851,7 +1959,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_enable(self, ble_enable_params=None):
         app_ram_base = driver.new_uint32()
         if nrf_sd_ble_api_ver == 2:
@@ -1867,7 +1975,7 @@ class BLEDriver(object):
             err_code = driver.sd_ble_enable(self.rpc_adapter, app_ram_base)
         return err_code
 
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_version_get(self):
         version = driver.ble_version_t()
         err_code = driver.sd_ble_version_get(self.rpc_adapter, version)
@@ -1880,7 +1988,7 @@ class BLEDriver(object):
         return BLEVersion.from_c(version)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_addr_set(self, gap_addr):
         assert isinstance(gap_addr, BLEGapAddr), "Invalid argument type"
         if gap_addr:
@@ -1890,7 +1998,7 @@ class BLEDriver(object):
         elif nrf_sd_ble_api_ver == 5:
             return driver.sd_ble_gap_addr_set(self.rpc_adapter, gap_addr)
 
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_addr_get(self):
         address = BLEGapAddr(BLEGapAddr.Types.public, [0] * 6)
         addr = address.to_c()
@@ -1905,14 +2013,14 @@ class BLEDriver(object):
         return BLEGapAddr.from_c(addr)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_privacy_set(self, privacy_params):
         assert isinstance(privacy_params, BLEGapPrivacyParams), "Invalid argument type"
         privacy_params = privacy_params.to_c()
         return driver.sd_ble_gap_privacy_set(self.rpc_adapter, privacy_params)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_adv_start(self, adv_params=None, tag=0):
         if not adv_params:
             adv_params = self.adv_params_setup()
@@ -1923,7 +2031,7 @@ class BLEDriver(object):
             return driver.sd_ble_gap_adv_start(self.rpc_adapter, adv_params.to_c())
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_conn_param_update(self, conn_handle, conn_params):
         assert isinstance(
             conn_params, (BLEGapConnParams, type(None))
@@ -1935,12 +2043,12 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_adv_stop(self):
         return driver.sd_ble_gap_adv_stop(self.rpc_adapter)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_scan_start(self, scan_params=None):
         if not scan_params:
             scan_params = self.scan_params_setup()
@@ -1948,12 +2056,12 @@ class BLEDriver(object):
         return driver.sd_ble_gap_scan_start(self.rpc_adapter, scan_params.to_c())
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_scan_stop(self):
         return driver.sd_ble_gap_scan_stop(self.rpc_adapter)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_connect(self, address, scan_params=None, conn_params=None, tag=0):
         assert isinstance(address, BLEGapAddr), "Invalid argument type"
 
@@ -1979,7 +2087,7 @@ class BLEDriver(object):
             )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_disconnect(
         self, conn_handle, hci_status_code=BLEHci.remote_user_terminated_connection
     ):
@@ -1989,7 +2097,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_adv_data_set(self, adv_data=BLEAdvData(), scan_data=BLEAdvData()):
         assert isinstance(adv_data, BLEAdvData), "Invalid argument type"
         assert isinstance(scan_data, BLEAdvData), "Invalid argument type"
@@ -2001,7 +2109,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_authenticate(self, conn_handle, sec_params):
         assert isinstance(
             sec_params, (BLEGapSecParams, type(None))
@@ -2011,7 +2119,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_sec_params_reply(
         self, conn_handle, sec_status, sec_params, own_keys=None, peer_keys=None
     ):
@@ -2045,13 +2153,13 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_sec_info_reply(self, conn_handle, enc_info, id_info, sign_info):
         return driver.sd_ble_gap_sec_info_reply(
             self.rpc_adapter, conn_handle, enc_info, id_info, sign_info
         )
 
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_conn_sec_get(self, conn_handle):
         conn_sec = driver.ble_gap_conn_sec_t()
         conn_sec.sec_mode = driver.ble_gap_conn_sec_mode_t()
@@ -2065,7 +2173,7 @@ class BLEDriver(object):
         return conn_sec
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_encrypt(self, conn_handle, master_id, enc_info):
         assert isinstance(master_id, BLEGapMasterId), "Invalid argument type"
         assert isinstance(enc_info, BLEGapEncInfo), "Invalid argument type"
@@ -2074,7 +2182,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_data_length_update(
         self, conn_handle, data_length_params, data_length_limitation
     ):
@@ -2096,19 +2204,19 @@ class BLEDriver(object):
         return err_code
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_rssi_start(self, conn_handle, threshold_dbm, skip_count):
         return driver.sd_ble_gap_rssi_start(
             self.rpc_adapter, conn_handle, threshold_dbm, skip_count
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_rssi_stop(self, conn_handle):
         return driver.sd_ble_gap_rssi_stop(self.rpc_adapter, conn_handle)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gap_phy_update(self, conn_handle, gap_phys):
         assert isinstance(gap_phys, BLEGapPhys)
         gap_phys_c = gap_phys.to_c()
@@ -2120,7 +2228,7 @@ class BLEDriver(object):
         return err_code
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_vs_uuid_add(self, uuid_base):
         assert isinstance(uuid_base, BLEUUIDBase), "Invalid argument type"
         uuid_type = driver.new_uint8()
@@ -2133,7 +2241,7 @@ class BLEDriver(object):
         return err_code
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_uuid_decode(self, uuid_list, uuid):
         uuid_len = len(uuid_list)
         assert isinstance(uuid_list, list), "Invalid argument type"
@@ -2155,7 +2263,7 @@ class BLEDriver(object):
         return err_code
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_write(self, conn_handle, write_params):
         assert isinstance(write_params, BLEGattcWriteParams), "Invalid argument type"
         return driver.sd_ble_gattc_write(
@@ -2163,12 +2271,12 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_read(self, conn_handle, handle, offset):
         return driver.sd_ble_gattc_read(self.rpc_adapter, conn_handle, handle, offset)
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_prim_srvc_disc(self, conn_handle, srvc_uuid, start_handle):
         assert isinstance(srvc_uuid, (BLEUUID, type(None))), "Invalid argument type"
         return driver.sd_ble_gattc_primary_services_discover(
@@ -2179,7 +2287,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_char_disc(self, conn_handle, start_handle, end_handle):
         handle_range = driver.ble_gattc_handle_range_t()
         handle_range.start_handle = start_handle
@@ -2189,7 +2297,7 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_desc_disc(self, conn_handle, start_handle, end_handle):
         handle_range = driver.ble_gattc_handle_range_t()
         handle_range.start_handle = start_handle
@@ -2199,21 +2307,21 @@ class BLEDriver(object):
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_exchange_mtu_req(self, conn_handle, mtu):
         return driver.sd_ble_gattc_exchange_mtu_request(
             self.rpc_adapter, conn_handle, mtu
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gattc_hv_confirm(self, conn_handle, attr_handle):
         return driver.sd_ble_gattc_hv_confirm(
             self.rpc_adapter, conn_handle, attr_handle
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gatts_service_add(self, service_type, uuid, service_handle):
         assert isinstance(service_handle, BLEGattHandle)
         assert isinstance(uuid, BLEUUID)
@@ -2227,7 +2335,7 @@ class BLEDriver(object):
         return err_code
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gatts_characteristic_add(
         self, service_handle, char_md, attr_char_value, char_handle
     ):
@@ -2246,14 +2354,14 @@ class BLEDriver(object):
         return err_code
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gatts_exchange_mtu_reply(self, conn_handle, mtu):
         return driver.sd_ble_gatts_exchange_mtu_reply(
             self.rpc_adapter, conn_handle, mtu
         )
 
     @NordicSemiErrorCheck
-    @wrapt.synchronized(api_lock)
+    @synchronized_on("api_lock")
     def ble_gatts_hvx(self, conn_handle, hvx_params):
         assert isinstance(hvx_params, BLEGattsHVXParams), "Invalid argument type"
         hvx_params = hvx_params.to_c()
@@ -2274,11 +2382,11 @@ class BLEDriver(object):
         else:
             logger.error("status_handler")
 
-    @wrapt.synchronized(observer_lock)
     def status_handler_sync(self, adapter, status_code, status_message):
+        observers = self.observers
         statusEnum = RpcAppStatus(status_code)
 
-        for obs in self.observers:
+        for obs in observers:
             obs.on_rpc_status(adapter, statusEnum, status_message)
 
     def status_handler_thread(self):
@@ -2301,8 +2409,8 @@ class BLEDriver(object):
         else:
             logger.error("log_message_handler")
 
-    @wrapt.synchronized(observer_lock)
     def log_message_handler_sync(self, adapter, severity, log_message):
+        observers = self.observers
         severityEnum = RpcLogSeverity(severity)
         logLevel = None  # type: int
 
@@ -2317,7 +2425,7 @@ class BLEDriver(object):
         elif severityEnum == RpcLogSeverity.fatal:
             logLevel = logging.FATAL
 
-        for obs in self.observers:
+        for obs in observers:
             obs.on_rpc_log_entry(adapter, logLevel, log_message)
 
     def log_message_handler_thread(self):
@@ -2341,8 +2449,9 @@ class BLEDriver(object):
                 logger.exception("Exception in event handler: {}".format(ex))
 
     def ble_event_handler(self, adapter, ble_event):
+        timestamp = time.perf_counter()
         if self.rpc_adapter.internal == adapter.internal:
-            self.ble_event_queue.put([adapter, ble_event])
+            self.ble_event_queue.put([adapter, ble_event, timestamp])
         else:
             logger.error(
                 "ble_event_handler, event for adapter %d, current adapter is %d",
@@ -2350,8 +2459,11 @@ class BLEDriver(object):
                 self.rpc_adapter.internal,
             )
 
-    @wrapt.synchronized(observer_lock)
-    def ble_event_handler_sync(self, _adapter, ble_event):
+    def ble_event_handler_sync(self, _adapter, ble_event, timestamp=None):
+        observers = self.observers
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self.event_timestamp = timestamp
 
         try:
             evt_id = BLEEvtID(ble_event.header.evt_id)
@@ -2367,7 +2479,7 @@ class BLEDriver(object):
             if evt_id == BLEEvtID.gap_evt_connected:
                 connected_evt = ble_event.evt.gap_evt.params.connected
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_connected(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2382,7 +2494,7 @@ class BLEDriver(object):
                     reason = BLEHci(disconnected_evt.reason)
                 except ValueError:
                     reason = disconnected_evt.reason
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_disconnected(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2392,7 +2504,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_sec_params_request:
                 sec_params_request_evt = ble_event.evt.gap_evt.params.sec_params_request
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_sec_params_request(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2404,7 +2516,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_sec_info_request:
                 seq_info_evt = ble_event.evt.gap_evt.params.sec_info_request
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_sec_info_request(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2418,7 +2530,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_sec_request:
                 seq_req_evt = ble_event.evt.gap_evt.params.sec_request
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_sec_request(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2428,7 +2540,7 @@ class BLEDriver(object):
                         keypress=seq_req_evt.keypress,
                     )
             elif evt_id == BLEEvtID.gap_evt_passkey_display:
-                for obs in self.observers:
+                for obs in observers:
                     passkey = BLEGapPasskeyDisplay.from_c(ble_event.evt.gap_evt.params.passkey_display)
 
                     obs.on_gap_evt_passkey_display(
@@ -2442,7 +2554,7 @@ class BLEDriver(object):
                     src = BLEGapTimeoutSrc(timeout_evt.src)
                 except ValueError:
                     src = timeout_evt.src
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_timeout(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2454,15 +2566,16 @@ class BLEDriver(object):
                 adv_type = None
                 if not adv_report_evt.scan_rsp:
                     adv_type = BLEGapAdvType(adv_report_evt.type)
+                adv_data = self.adv_data_type.from_c(adv_report_evt)
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_adv_report(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gap_evt.conn_handle,
                         peer_addr=BLEGapAddr.from_c(adv_report_evt.peer_addr),
                         rssi=adv_report_evt.rssi,
                         adv_type=adv_type,
-                        adv_data=BLEAdvData.from_c(adv_report_evt),
+                        adv_data=adv_data,
                     )
 
             elif evt_id == BLEEvtID.gap_evt_conn_param_update_request:
@@ -2470,7 +2583,7 @@ class BLEDriver(object):
                     ble_event.evt.gap_evt.params.conn_param_update_request.conn_params
                 )
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_conn_param_update_request(
                         ble_driver=self,
                         conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2479,7 +2592,7 @@ class BLEDriver(object):
 
             elif evt_id == BLEEvtID.gap_evt_conn_param_update:
                 conn_params = ble_event.evt.gap_evt.params.conn_param_update.conn_params
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_conn_param_update(
                         ble_driver=self,
                         conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2489,7 +2602,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_auth_status:
                 auth_status_evt = ble_event.evt.gap_evt.params.auth_status
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_auth_status(
                         ble_driver=self,
                         conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2505,7 +2618,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_auth_key_request:
                 auth_key_request_evt = ble_event.evt.gap_evt.params.auth_key_request
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_auth_key_request(
                         ble_driver=self,
                         conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2515,7 +2628,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_conn_sec_update:
                 conn_sec_update_evt = ble_event.evt.gap_evt.params.conn_sec_update
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_conn_sec_update(
                         ble_driver=self,
                         conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2524,7 +2637,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gap_evt_rssi_changed:
                 rssi_changed_evt = ble_event.evt.gap_evt.params.rssi_changed
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gap_evt_rssi_changed(
                         ble_driver=self,
                         conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2534,7 +2647,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gattc_evt_write_rsp:
                 write_rsp_evt = ble_event.evt.gattc_evt.params.write_rsp
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gattc_evt_write_rsp(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2550,7 +2663,7 @@ class BLEDriver(object):
 
             elif evt_id == BLEEvtID.gattc_evt_read_rsp:
                 read_rsp_evt = ble_event.evt.gattc_evt.params.read_rsp
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gattc_evt_read_rsp(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2565,7 +2678,7 @@ class BLEDriver(object):
 
             elif evt_id == BLEEvtID.gattc_evt_hvx:
                 hvx_evt = ble_event.evt.gattc_evt.params.hvx
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gattc_evt_hvx(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2587,7 +2700,7 @@ class BLEDriver(object):
                 ):
                     services.append(BLEService.from_c(s))
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gattc_evt_prim_srvc_disc_rsp(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2604,7 +2717,7 @@ class BLEDriver(object):
                 ):
                     characteristics.append(BLECharacteristic.from_c(ch))
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gattc_evt_char_disc_rsp(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2621,7 +2734,7 @@ class BLEDriver(object):
                 ):
                     descriptors.append(BLEDescriptor.from_c(d))
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gattc_evt_desc_disc_rsp(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2632,7 +2745,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gatts_evt_hvc:
                 hvc_evt = ble_event.evt.gatts_evt.params.hvc
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gatts_evt_hvc(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gatts_evt.conn_handle,
@@ -2642,7 +2755,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gatts_evt_write:
                 write_evt = ble_event.evt.gatts_evt.params.write
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gatts_evt_write(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gatts_evt.conn_handle,
@@ -2658,7 +2771,7 @@ class BLEDriver(object):
             elif evt_id == BLEEvtID.gatts_evt_sys_attr_missing:
                 sys_attr_missing_evt = ble_event.evt.gatts_evt.params.sys_attr_missing
 
-                for obs in self.observers:
+                for obs in observers:
                     obs.on_gatts_evt_sys_attr_missing(
                         ble_driver=self,
                         conn_handle=ble_event.evt.gatts_evt.conn_handle,
@@ -2667,7 +2780,7 @@ class BLEDriver(object):
 
             elif nrf_sd_ble_api_ver == 2:
                 if evt_id == BLEEvtID.evt_tx_complete:
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_evt_tx_complete(
                             ble_driver=self,
                             conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2680,7 +2793,7 @@ class BLEDriver(object):
                         ble_event.evt.gattc_evt.params.write_cmd_tx_complete
                     )
 
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gattc_evt_write_cmd_tx_complete(
                             ble_driver=self,
                             conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2690,14 +2803,14 @@ class BLEDriver(object):
                 elif evt_id == BLEEvtID.gatts_evt_hvn_tx_complete:
                     tx_complete_evt = ble_event.evt.gatts_evt.params.hvn_tx_complete
 
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gatts_evt_hvn_tx_complete(
                             ble_driver=self,
                             conn_handle=ble_event.evt.gatts_evt.conn_handle,
                             count=tx_complete_evt.count,
                         )
                 elif evt_id == BLEEvtID.gatts_evt_exchange_mtu_request:
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gatts_evt_exchange_mtu_request(
                             ble_driver=self,
                             conn_handle=ble_event.evt.gatts_evt.conn_handle,
@@ -2714,7 +2827,7 @@ class BLEDriver(object):
                     else:
                         _server_rx_mtu = ATT_MTU_DEFAULT
 
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gattc_evt_exchange_mtu_rsp(
                             ble_driver=self,
                             conn_handle=ble_event.evt.gattc_evt.conn_handle,
@@ -2728,7 +2841,7 @@ class BLEDriver(object):
                     params = (
                         ble_event.evt.gap_evt.params.data_length_update.effective_params
                     )
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gap_evt_data_length_update(
                             ble_driver=self,
                             conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2739,7 +2852,7 @@ class BLEDriver(object):
                     params = (
                         ble_event.evt.gap_evt.params.data_length_update_request.peer_params
                     )
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gap_evt_data_length_update_request(
                             ble_driver=self,
                             conn_handle=ble_event.evt.gap_evt.conn_handle,
@@ -2749,7 +2862,7 @@ class BLEDriver(object):
                 elif evt_id == BLEEvtID.gap_evt_phy_update_request:
                     requested_phy_update = ble_event.evt.gap_evt.params.phy_update_request
 
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gap_evt_phy_update_request(
                             ble_driver=self,
                             conn_handle=ble_event.evt.common_evt.conn_handle,
@@ -2759,7 +2872,7 @@ class BLEDriver(object):
                 elif evt_id == BLEEvtID.gap_evt_phy_update:
                     updated_phy = ble_event.evt.gap_evt.params.phy_update
 
-                    for obs in self.observers:
+                    for obs in observers:
                         obs.on_gap_evt_phy_update(
                             ble_driver=self,
                             conn_handle=ble_event.evt.common_evt.conn_handle,
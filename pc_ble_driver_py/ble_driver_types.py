@@ -80,6 +80,12 @@ def uint8_array_to_list(array_pointer, length):
     return data_list
 
 
+def uint8_array_to_bytes(array_pointer, length):
+    """Convert uint8_array to python bytes."""
+    data_array = ble_driver.uint8_array.frompointer(array_pointer)
+    return bytes(data_array[i] for i in range(length))
+
+
 def uint16_array_to_list(array_pointer, length):
     """Convert uint16_array to python list."""
     data_array = ble_driver.uint16_array.frompointer(array_pointer)
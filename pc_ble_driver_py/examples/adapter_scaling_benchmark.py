@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2016 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Shows that several adapters in one process scale: every simulated adapter
+# issues GATT reads from its own thread, each read holding the adapter's
+# api_lock for a simulated round trip to the connectivity IC. With the
+# per-instance locks the throughput grows with the number of adapters; the
+# "shared lock" rows reproduce the former class-wide api_lock.
+#
+# Runs without hardware, the native driver is replaced by
+# pc_ble_driver_py.tests.stub_driver.
+
+import sys
+import threading
+import time
+
+from pc_ble_driver_py.tests import stub_driver
+
+
+def run(adapter_count, calls, shared_lock):
+    _, ble_driver, _ = stub_driver.install()
+    drivers = [
+        ble_driver.BLEDriver(serial_port="SIM{}".format(i))
+        for i in range(adapter_count)
+    ]
+    if shared_lock:
+        for d in drivers[1:]:
+            d.api_lock = drivers[0].api_lock
+
+    def worker(d):
+        for _ in range(calls):
+            d.ble_gattc_read(0, 1, 0)
+
+    threads = [threading.Thread(target=worker, args=(d,)) for d in drivers]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return adapter_count * calls / elapsed
+
+
+def main(latency_ms=1.0, calls=200, max_adapters=4):
+    stub, _, _ = stub_driver.install()
+    stub.latency_s = latency_ms / 1000.0
+    print(
+        "{} GATT reads per adapter, {:.1f} ms simulated round trip".format(
+            calls, latency_ms
+        )
+    )
+    print("{:<10} {:>18} {:>18}".format("Adapters", "Per-instance /s", "Shared lock /s"))
+    for adapter_count in range(1, max_adapters + 1):
+        print(
+            "{:<10} {:>18.0f} {:>18.0f}".format(
+                adapter_count,
+                run(adapter_count, calls, shared_lock=False),
+                run(adapter_count, calls, shared_lock=True),
+            )
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3:
+        print("Invalid arguments. Parameters: [latency_ms] [calls_per_adapter]")
+        quit()
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(latency, count)
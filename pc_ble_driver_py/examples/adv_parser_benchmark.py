@@ -0,0 +1,134 @@
+#
+# Copyright (c) 2016 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Records the advertising reports received in a dense environment and
+# compares BLEAdvData with BLEAdvReport on the recorded stream.
+
+import sys
+import time
+from pc_ble_driver_py.observers import BLEDriverObserver
+
+
+def init(conn_ic_id):
+    # noinspection PyGlobalUndefined
+    global BLEDriver, BLEAdvData, BLEAdvReport, BLEGapScanParams, config
+    from pc_ble_driver_py import config
+
+    config.__conn_ic_id__ = conn_ic_id
+    # noinspection PyUnresolvedReferences
+    from pc_ble_driver_py.ble_driver import (
+        BLEDriver,
+        BLEAdvData,
+        BLEAdvReport,
+        BLEGapScanParams,
+    )
+
+
+class AdvRecorder(BLEDriverObserver):
+    def __init__(self, *args, **kwargs):
+        super(AdvRecorder, self).__init__(*args, **kwargs)
+        self.reports = []
+
+    def on_gap_evt_adv_report(
+        self, ble_driver, conn_handle, peer_addr, rssi, adv_type, adv_data
+    ):
+        self.reports.append(adv_data.raw)
+
+
+def record(serial_port, file_name, duration_s):
+    driver = BLEDriver(serial_port=serial_port, fast_adv_reports=True)
+    recorder = AdvRecorder()
+    driver.observer_register(recorder)
+    driver.open()
+    driver.ble_enable()
+
+    params = BLEGapScanParams(interval_ms=100, window_ms=100, timeout_s=duration_s)
+    driver.ble_gap_scan_start(scan_params=params)
+    time.sleep(duration_s)
+    driver.close()
+
+    with open(file_name, "w") as f:
+        f.writelines(raw.hex() + "\n" for raw in recorder.reports)
+    print(
+        "Recorded {} advertising reports ({:.0f}/s) to {}".format(
+            len(recorder.reports), len(recorder.reports) / duration_s, file_name
+        )
+    )
+
+
+def replay(file_name, repeat=10):
+    with open(file_name) as f:
+        reports = [bytes.fromhex(line.strip()) for line in f if line.strip()]
+    if not reports:
+        print("No advertising reports in {}".format(file_name))
+        return
+    # Both parsers start from the bytes; from_c additionally copies them out
+    # of the SWIG array, which costs the same for both.
+    ad_lists = [list(raw) for raw in reports]
+    name = BLEAdvData.Types.complete_local_name
+
+    def bench(label, parse):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse()
+        elapsed = (time.perf_counter() - start) / (repeat * len(reports))
+        print("{:<36} {:8.2f} us/report".format(label, elapsed * 1e6))
+
+    print("{} reports, {} rounds".format(len(reports), repeat))
+    bench("BLEAdvData.from_list", lambda: [BLEAdvData.from_list(a) for a in ad_lists])
+    bench("BLEAdvReport", lambda: [BLEAdvReport(r) for r in reports])
+    bench(
+        "BLEAdvData.from_list + name",
+        lambda: [BLEAdvData.from_list(a).records.get(name) for a in ad_lists],
+    )
+    bench("BLEAdvReport + name", lambda: [BLEAdvReport(r).get(name) for r in reports])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (5, 6) and sys.argv[1] == "record":
+        init(sys.argv[2])
+        duration = int(sys.argv[5]) if len(sys.argv) == 6 else 10
+        record(sys.argv[3], sys.argv[4], duration)
+    elif len(sys.argv) == 4 and sys.argv[1] == "replay":
+        init(sys.argv[2])
+        replay(sys.argv[3])
+    else:
+        print("Invalid arguments. Parameters:")
+        print("  record <conn_ic_id> <serial_port> <file> [duration_s]")
+        print("  replay <conn_ic_id> <file>")
+        print("conn_ic_id: NRF51, NRF52")
+    quit()
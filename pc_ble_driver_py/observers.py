@@ -364,6 +364,11 @@ class BLEAdapterObserver(object):
     def on_notification_handle(self, ble_adapter, conn_handle, uuid, attr_handle, data):
         pass
 
+    def on_notification_timestamped(
+        self, ble_adapter, conn_handle, uuid, attr_handle, data, timestamp
+    ):
+        pass
+
     def on_conn_param_update_request(self, ble_adapter, conn_handle, conn_params):
         logger.debug(
             "evt> conn_param_update_request conn({})\n conn_params({})".format(
@@ -0,0 +1,139 @@
+#
+# Copyright (c) 2016 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Stand-in for the native nrf_ble_driver module, so that BLEDriver and
+# BLEAdapter can be exercised without a connectivity dongle.
+#
+# Constants (upper case names) get distinct integer values, NRF_SUCCESS is 0,
+# SWIG structs (mixed case names) are empty classes and sd_* functions return
+# NRF_SUCCESS. Array helpers hand Python lists through unchanged, so events
+# can carry plain lists as their data.
+
+import importlib
+import itertools
+import sys
+import types
+
+
+class _uint8_array(object):
+    @staticmethod
+    def frompointer(pointer):
+        return pointer
+
+
+class StubDriverModule(types.ModuleType):
+    def __init__(self, name):
+        super(StubDriverModule, self).__init__(name)
+        self._values = itertools.count(1)
+        self.NRF_SUCCESS = 0
+        self.uint8_array = _uint8_array
+        self.char_array = _uint8_array
+        self.latency_s = 0.0
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name.isupper():
+            value = next(self._values)
+        elif name[:1].isupper() or name.endswith("_t"):
+            value = type(name, (), {"__init__": lambda self, *args, **kwargs: None})
+        else:
+            value = self._call
+        setattr(self, name, value)
+        return value
+
+    def _call(self, *args, **kwargs):
+        # Simulated round trip to the connectivity IC; sleeping releases the
+        # GIL like the native call does.
+        if self.latency_s:
+            import time
+
+            time.sleep(self.latency_s)
+        return self.NRF_SUCCESS
+
+
+def install(conn_ic_id="NRF52"):
+    """Install the stub as the native module and import the driver.
+
+    Returns (stub, ble_driver module, ble_adapter module). If the driver has
+    been imported already, that import is reused as it is.
+    """
+    import pc_ble_driver_py.config as config
+
+    if config.__conn_ic_id__ is None:
+        config.__conn_ic_id__ = conn_ic_id
+    name = "pc_ble_driver_py.lib.nrf_ble_driver_sd_api_v{}".format(
+        config.sd_api_ver_get()
+    )
+    if name not in sys.modules:
+        lib = sys.modules.get("pc_ble_driver_py.lib")
+        if lib is None:
+            lib = types.ModuleType("pc_ble_driver_py.lib")
+            lib.__path__ = []
+            sys.modules["pc_ble_driver_py.lib"] = lib
+        stub = StubDriverModule(name)
+        sys.modules[name] = stub
+        setattr(lib, name.rsplit(".", 1)[1], stub)
+    ble_driver = importlib.import_module("pc_ble_driver_py.ble_driver")
+    ble_adapter = importlib.import_module("pc_ble_driver_py.ble_adapter")
+    return sys.modules[name], ble_driver, ble_adapter
+
+
+class Struct(object):
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def hvx_event(ble_driver, conn_handle, attr_handle, data):
+    """A native-looking BLE_GATTC_EVT_HVX notification event."""
+    stub = ble_driver.driver
+    hvx = Struct(
+        handle=attr_handle,
+        type=stub.BLE_GATT_HVX_NOTIFICATION,
+        data=list(data),
+        len=len(data),
+    )
+    gattc_evt = Struct(
+        conn_handle=conn_handle,
+        gatt_status=stub.BLE_GATT_STATUS_SUCCESS,
+        error_handle=0,
+        params=Struct(hvx=hvx),
+    )
+    return Struct(
+        header=Struct(evt_id=stub.BLE_GATTC_EVT_HVX),
+        evt=Struct(gattc_evt=gattc_evt),
+    )
@@ -0,0 +1,102 @@
+#
+# Copyright (c) 2016 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Concurrency guarantees of the per-instance locks: API calls and observer
+# (un)registration of one adapter serialize, different adapters do not
+# contend with each other.
+
+import threading
+import unittest
+
+from pc_ble_driver_py.tests import stub_driver
+
+stub, ble_driver, ble_adapter = stub_driver.install()
+
+
+def _call_in_thread(function, *args):
+    done = threading.Event()
+
+    def run():
+        function(*args)
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return done
+
+
+class TestPerInstanceLocks(unittest.TestCase):
+    def setUp(self):
+        self.drivers = [
+            ble_driver.BLEDriver(serial_port=port) for port in ("COM1", "COM2")
+        ]
+        self.adapters = [ble_adapter.BLEAdapter(d) for d in self.drivers]
+
+    def test_drivers_do_not_share_locks(self):
+        first, second = self.drivers
+        self.assertIsNot(first.api_lock, second.api_lock)
+        self.assertIsNot(first.observer_lock, second.observer_lock)
+
+    def test_adapters_do_not_share_locks(self):
+        first, second = self.adapters
+        self.assertIsNot(first.observer_lock, second.observer_lock)
+        self.assertIsNot(first.observer_lock, first.driver.observer_lock)
+
+    def test_api_calls_of_other_adapter_do_not_wait(self):
+        first, second = self.drivers
+        with first.api_lock:
+            done = _call_in_thread(second.ble_gattc_read, 0, 1, 0)
+            self.assertTrue(done.wait(1.0))
+
+    def test_api_calls_of_same_adapter_serialize(self):
+        first, _ = self.drivers
+        with first.api_lock:
+            done = _call_in_thread(first.ble_gattc_read, 0, 1, 0)
+            self.assertFalse(done.wait(0.2))
+        self.assertTrue(done.wait(1.0))
+
+    def test_observer_registration_of_other_adapter_does_not_wait(self):
+        first, second = self.adapters
+        observer = ble_adapter.BLEAdapterObserver()
+        with first.observer_lock:
+            done = _call_in_thread(second.observer_register, observer)
+            self.assertTrue(done.wait(1.0))
+        self.assertEqual(list(second.observers), [observer])
+        self.assertEqual(list(first.observers), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
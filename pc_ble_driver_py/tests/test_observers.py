@@ -0,0 +1,202 @@
+#
+# Copyright (c) 2016 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Stress test of the copy-on-write observer tuples: observers and
+# notification routes are (un)registered from several threads while
+# notifications are dispatched at full speed from the event thread.
+
+import logging
+import threading
+import unittest
+
+from pc_ble_driver_py.tests import stub_driver
+
+stub, ble_driver, ble_adapter = stub_driver.install()
+
+PACKETS = 20000
+CHURN_THREADS = 4
+CONN_HANDLE = 0
+ATTR_HANDLE = 0x0E
+ROUTED_HANDLE = 0x11
+
+
+class _ErrorLog(logging.Handler):
+    def __init__(self):
+        super(_ErrorLog, self).__init__(logging.ERROR)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _Database(object):
+    def get_char_uuid(self, attr_handle):
+        return "uuid-{}".format(attr_handle)
+
+
+class _DriverCounter(ble_driver.BLEDriverObserver):
+    def __init__(self):
+        super(_DriverCounter, self).__init__()
+        self.packets = 0
+
+    def on_gattc_evt_hvx(self, ble_driver, conn_handle, status, error_handle,
+                         attr_handle, hvx_type, data):
+        self.packets += 1
+
+
+class _AdapterCounter(ble_adapter.BLEAdapterObserver):
+    def __init__(self):
+        super(_AdapterCounter, self).__init__()
+        self.packets = 0
+        self.timestamps = set()
+
+    def on_notification_handle(self, ble_adapter, conn_handle, uuid, attr_handle, data):
+        self.packets += 1
+
+    def on_notification_timestamped(
+        self, ble_adapter, conn_handle, uuid, attr_handle, data, timestamp
+    ):
+        self.timestamps.add(timestamp)
+
+
+class TestObserverChurn(unittest.TestCase):
+    def setUp(self):
+        self.errors = _ErrorLog()
+        for name in (ble_driver.__name__, ble_adapter.__name__):
+            logging.getLogger(name).addHandler(self.errors)
+        self.driver = ble_driver.BLEDriver(serial_port="COM1")
+        self.adapter = ble_adapter.BLEAdapter(self.driver)
+        self.adapter.db_conns[CONN_HANDLE] = _Database()
+
+    def tearDown(self):
+        for name in (ble_driver.__name__, ble_adapter.__name__):
+            logging.getLogger(name).removeHandler(self.errors)
+
+    def test_register_and_unregister_during_notifications(self):
+        driver_counter = _DriverCounter()
+        adapter_counter = _AdapterCounter()
+        routed = []
+        self.driver.observer_register(driver_counter)
+        self.adapter.observer_register(adapter_counter)
+        self.adapter.notification_subscribe(
+            CONN_HANDLE, ROUTED_HANDLE, lambda *args: routed.append(args[-1])
+        )
+
+        event = stub_driver.hvx_event(ble_driver, CONN_HANDLE, ATTR_HANDLE, b"\x01\x02")
+        routed_event = stub_driver.hvx_event(
+            ble_driver, CONN_HANDLE, ROUTED_HANDLE, b"\x03\x04"
+        )
+        stop = threading.Event()
+        failures = []
+
+        def churn():
+            try:
+                while not stop.is_set():
+                    driver_observer = _DriverCounter()
+                    adapter_observer = _AdapterCounter()
+                    route = lambda *args: None
+                    self.driver.observer_register(driver_observer)
+                    self.adapter.observer_register(adapter_observer)
+                    self.adapter.notification_subscribe(CONN_HANDLE, ROUTED_HANDLE, route)
+                    self.adapter.notification_unsubscribe(CONN_HANDLE, ROUTED_HANDLE, route)
+                    self.adapter.observer_unregister(adapter_observer)
+                    self.driver.observer_unregister(driver_observer)
+            except Exception as ex:
+                failures.append(ex)
+
+        def feed():
+            try:
+                for _ in range(PACKETS):
+                    self.driver.ble_event_handler_sync(None, event, 1.0)
+                    self.driver.ble_event_handler_sync(None, routed_event, 1.0)
+            except Exception as ex:
+                failures.append(ex)
+
+        churners = [threading.Thread(target=churn) for _ in range(CHURN_THREADS)]
+        feeder = threading.Thread(target=feed)
+        for thread in churners:
+            thread.start()
+        feeder.start()
+        feeder.join()
+        stop.set()
+        for thread in churners:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(self.errors.records, [])
+        self.assertEqual(driver_counter.packets, 2 * PACKETS)
+        self.assertEqual(adapter_counter.packets, PACKETS)
+        self.assertEqual(adapter_counter.timestamps, {1.0})
+        self.assertEqual(routed, [1.0] * PACKETS)
+        self.assertEqual(self.driver.observers, (self.adapter, driver_counter))
+        self.assertEqual(self.adapter.observers, (adapter_counter,))
+
+
+class TestNotificationRoutes(unittest.TestCase):
+    def setUp(self):
+        self.driver = ble_driver.BLEDriver(serial_port="COM1")
+        self.adapter = ble_adapter.BLEAdapter(self.driver)
+        self.counter = _AdapterCounter()
+        self.adapter.observer_register(self.counter)
+
+    def test_routed_notifications_are_not_broadcast(self):
+        self.adapter.db_conns[CONN_HANDLE] = _Database()
+        routed = []
+        self.adapter.notification_subscribe(
+            CONN_HANDLE, ROUTED_HANDLE, lambda *args: routed.append(args[2])
+        )
+        for attr_handle in (ATTR_HANDLE, ROUTED_HANDLE, ATTR_HANDLE):
+            event = stub_driver.hvx_event(ble_driver, CONN_HANDLE, attr_handle, b"\x01")
+            self.driver.ble_event_handler_sync(None, event, 1.0)
+
+        self.assertEqual(routed, ["uuid-{}".format(ROUTED_HANDLE)])
+        self.assertEqual(self.counter.packets, 2)
+
+    def test_route_without_discovered_database(self):
+        routed = []
+        self.adapter.notification_subscribe(
+            CONN_HANDLE, ROUTED_HANDLE, lambda *args: routed.append(args[2:5])
+        )
+        event = stub_driver.hvx_event(ble_driver, CONN_HANDLE, ROUTED_HANDLE, b"\x01")
+        self.driver.ble_event_handler_sync(None, event, 1.0)
+
+        self.assertEqual(routed, [(None, ROUTED_HANDLE, [1])])
+        self.assertEqual(self.counter.packets, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()